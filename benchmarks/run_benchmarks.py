@@ -0,0 +1,221 @@
+"""
+Benchmark suite on a fixed synthetic world.
+
+    python benchmarks/run_benchmarks.py                      # all scenarios, 3 runs each
+    python benchmarks/run_benchmarks.py --only matchday --repeats 5
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json
+    python benchmarks/run_benchmarks.py --size 10x5x20       # 50 synthetic leagues, 1000 clubs
+
+The world is built once per run (see world.py) and every scenario run starts
+from its own copy of it with `random` re-seeded, so runs do the same work and
+numbers are comparable between commits. Results are written as JSON to
+benchmarks/results/<commit>.json unless --out is given.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from world import (DEFAULT_SEED, ROOT, build_world, parse_size, play_out_season, seed_everything,
+                   seed_sql_random, use_database)
+
+import decision_making
+import main_loop as ml
+from fixture_calculation import simulate_fixtures_for_day
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def first_league_matchday(conn):
+    row = conn.execute("""
+        SELECT MIN(f.fixture_date)
+        FROM fixtures f
+        JOIN competitions c ON c.id = f.competition_id
+        WHERE c.is_league = 1
+    """).fetchone()
+    return date.fromisoformat(str(row[0])[:10])
+
+
+def scenario_matchday(engine):
+    day = first_league_matchday(engine.conn)
+    ml.GAME_DATE = day
+    return lambda: simulate_fixtures_for_day(engine.conn, day)
+
+
+def scenario_window_day(engine):
+    day = date(2026, 1, 15)
+    ml.GAME_DATE = day
+    return lambda: decision_making.decision_making_func(day, engine.conn)
+
+
+def scenario_monday_update(engine):
+    day = date(2025, 9, 8)
+    ml.GAME_DATE = day
+    return lambda: ml.update_players_in_db(engine.conn, day)
+
+
+def scenario_month_start(engine):
+    day = date(2025, 10, 1)
+    ml.GAME_DATE = day
+    return lambda: ml.process_monthly_finances(engine.conn, day)
+
+
+def scenario_season_rollover(engine):
+    ml.GAME_DATE = date(2026, 8, 31)
+    return engine.tick
+
+
+# name -> setup(engine) returning the callable to time; the engine runs on a
+# copy of the fresh world unless SCENARIO_WORLDS names another one
+SCENARIOS = {
+    "matchday": scenario_matchday,
+    "window_day": scenario_window_day,
+    "monday_update": scenario_monday_update,
+    "month_start": scenario_month_start,
+    "season_rollover": scenario_season_rollover,
+}
+
+SCENARIO_WORLDS = {
+    "season_rollover": "season_played",
+}
+
+# world name -> prepare(db_path, seed), applied to a copy of the fresh world
+WORLD_PREPARERS = {
+    "season_played": play_out_season,
+}
+
+
+def run_scenario(name, world_path, work_dir, seed, repeats):
+    """Time SCENARIOS[name] `repeats` times, each on a fresh copy of the world."""
+    runs = []
+    statements = None
+    for i in range(repeats):
+        db_path = os.path.join(work_dir, f"{name}_{i}.sqlite")
+        shutil.copyfile(world_path, db_path)
+        use_database(db_path)
+        seed_everything(seed)
+        engine = ml.DayTickEngine(db_path, commit_every=10 ** 9)
+        seed_sql_random(engine.conn)
+        try:
+            engine.conn.count_statements(True)
+            call = SCENARIOS[name](engine)
+            before = engine.conn.statements
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                t0 = time.perf_counter()
+                call()
+                runs.append(time.perf_counter() - t0)
+            statements = engine.conn.statements - before
+        finally:
+            engine.close()
+            os.remove(db_path)
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "statements": statements,
+    }
+
+
+def run_suite(names, work_dir, seed, repeats, size=None, log=print):
+    """Build the world (default or synthetic `size`) and run the named scenarios on it."""
+    world_path = os.path.join(work_dir, "world.sqlite")
+    t0 = time.perf_counter()
+    counts = build_world(world_path, seed, size=size)
+    build_seconds = time.perf_counter() - t0
+    log(f"World built in {build_seconds:.2f}s: {counts}")
+
+    worlds = {"fresh": world_path}
+    results = {}
+    for name in names:
+        world_name = SCENARIO_WORLDS.get(name, "fresh")
+        if world_name not in worlds:
+            worlds[world_name] = os.path.join(work_dir, f"{world_name}.sqlite")
+            shutil.copyfile(world_path, worlds[world_name])
+            WORLD_PREPARERS[world_name](worlds[world_name], seed)
+        results[name] = run_scenario(name, worlds[world_name], work_dir, seed, repeats)
+        res = results[name]
+        log(f"{name:<18} median {res['median'] * 1000:9.1f} ms   min {res['min'] * 1000:9.1f} ms"
+            f"   {res['statements']} statements")
+    for path in worlds.values():
+        os.remove(path)
+    return dict(counts, build_seconds=build_seconds), results
+
+
+def git_commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    print(f"{'scenario':<18}{'base ms':>10}{'now ms':>10}{'ratio':>8}")
+    for name, res in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old:
+            continue
+        ratio = res["median"] / old["median"] if old["median"] else float("inf")
+        print(f"{name:<18}{old['median'] * 1000:>10.1f}{res['median'] * 1000:>10.1f}{ratio:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BallsAndGlory benchmark suite")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), default=None)
+    parser.add_argument("--size", type=parse_size, default=None, metavar="KxDxC",
+                        help="synthetic world: K countries x D divisions x C clubs (default: the bundled leagues)")
+    parser.add_argument("--out", default=None, help="JSON output (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, metavar="JSON", help="print ratios against an earlier result file")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    names = args.only or list(SCENARIOS)
+
+    with tempfile.TemporaryDirectory(prefix="bag_bench_") as work_dir:
+        world, results = run_suite(names, work_dir, args.seed, args.repeats, args.size)
+
+    current = {
+        "meta": {
+            "commit": commit,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "size": "x".join(map(str, args.size)) if args.size else None,
+        },
+        "world": world,
+        "scenarios": results,
+    }
+
+    suffix = f"-{current['meta']['size']}" if args.size else ""
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit or 'local'}{suffix}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(current, fh, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(current, args.compare)
+    return current
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,71 @@
+"""
+How the simulation scales with the size of the world.
+
+    python benchmarks/scaling.py                                   # default ladder
+    python benchmarks/scaling.py --sizes 1x2x20 4x4x20 10x5x20 --only matchday window_day
+
+Runs the chosen scenarios of run_benchmarks.py on synthetic worlds of
+increasing size (K countries x D divisions x C clubs) and prints, per
+scenario, the time per club and the growth exponent between consecutive
+sizes: ~1.0 is linear in the number of clubs, clearly above 1 is superlinear.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from run_benchmarks import RESULTS_DIR, SCENARIOS, git_commit, run_suite
+from world import DEFAULT_SEED, parse_size
+
+DEFAULT_SIZES = ["1x2x20", "2x2x20", "4x3x20", "10x5x20"]
+DEFAULT_SCENARIOS = ["matchday", "window_day", "monday_update", "month_start"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BallsAndGlory scaling benchmark")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, metavar="KxDxC")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--out", default=None, help="JSON output (default: benchmarks/results/scaling-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes]
+    runs = []
+    for size in sizes:
+        label = "x".join(map(str, size))
+        print(f"--- {label}")
+        with tempfile.TemporaryDirectory(prefix="bag_scale_") as work_dir:
+            world, results = run_suite(args.only, work_dir, args.seed, args.repeats, size)
+        runs.append({"size": label, "world": world, "scenarios": results})
+
+    print(f"\n{'scenario':<16}{'size':>10}{'clubs':>7}{'ms':>10}{'ms/club':>9}{'exponent':>10}")
+    for name in args.only:
+        prev = None
+        for run in runs:
+            clubs = run["world"]["clubs"]
+            ms = run["scenarios"][name]["median"] * 1000
+            exponent = ""
+            if prev and clubs != prev[0] and prev[1] > 0:
+                exponent = f"{math.log(ms / prev[1]) / math.log(clubs / prev[0]):.2f}"
+            print(f"{name:<16}{run['size']:>10}{clubs:>7}{ms:>10.1f}{ms / clubs:>9.2f}{exponent:>10}")
+            prev = (clubs, ms)
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"scaling-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({
+            "meta": {"commit": commit, "created": datetime.now().isoformat(timespec="seconds"),
+                     "seed": args.seed, "repeats": args.repeats},
+            "runs": runs,
+        }, fh, indent=2)
+    print(f"Results written to {out}")
+    return runs
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,113 @@
+"""
+Start-up cost of short headless runs.
+
+    python benchmarks/startup.py                  # 10 runs of each command
+    python benchmarks/startup.py --repeats 20 --imports 15
+
+Every command runs in a fresh interpreter (the way a batch of headless runs
+starts), timed from the parent process:
+
+  - python:          `python -c pass`, the interpreter floor;
+  - import:          `import main_loop`;
+  - simulate_1_day:  `main_loop.py simulate --days 1` on a copy of the
+                     benchmark world (the "continue last save" path).
+
+--imports N also prints the N slowest modules main_loop imports directly
+(python -X importtime, cumulative). Results are written as JSON to
+benchmarks/results/startup-<commit>.json unless --out is given.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from run_benchmarks import RESULTS_DIR, git_commit
+from world import DEFAULT_SEED, ROOT, build_world
+
+
+def commands(world_path, run_path):
+    """name -> (argv, prepare()) for every timed command."""
+    def fresh_copy():
+        shutil.copyfile(world_path, run_path)
+
+    return {
+        "python": ([sys.executable, "-c", "pass"], None),
+        "import": ([sys.executable, "-c", "import main_loop"], None),
+        "simulate_1_day": ([sys.executable, "main_loop.py", "simulate", "--db", run_path, "--days", "1", "--quiet"],
+                           fresh_copy),
+    }
+
+
+def time_command(argv, prepare, repeats):
+    runs = []
+    for _ in range(repeats):
+        if prepare:
+            prepare()
+        t0 = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        runs.append(time.perf_counter() - t0)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+
+
+def slowest_imports(limit):
+    """[(cumulative µs, module)] main_loop imports directly, slowest first."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main_loop"],
+                          cwd=ROOT, check=True, capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = len(name) - len(name.lstrip())
+        entries.append((depth, int(parts[1]), name.strip()))
+    # main_loop is reported last, after everything it imported
+    top = entries[-1][0]
+    direct = [(us, name) for depth, us, name in entries if depth == top + 2]
+    return sorted(direct, reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BallsAndGlory start-up benchmark")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--imports", type=int, default=0, metavar="N",
+                        help="print the N slowest imports of main_loop")
+    parser.add_argument("--out", default=None, help="JSON output (default: benchmarks/results/startup-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bag_startup_") as work_dir:
+        world_path = os.path.join(work_dir, "world.sqlite")
+        build_world(world_path, args.seed)
+        for name, (cmd, prepare) in commands(world_path, os.path.join(work_dir, "run.sqlite")).items():
+            results[name] = time_command(cmd, prepare, args.repeats)
+            res = results[name]
+            print(f"{name:<16} median {res['median'] * 1000:8.1f} ms   min {res['min'] * 1000:8.1f} ms")
+
+    if args.imports:
+        print(f"\n{'module':<40}{'cumulative ms':>14}")
+        for us, name in slowest_imports(args.imports):
+            print(f"{name:<40}{us / 1000:>14.1f}")
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"startup-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({
+            "meta": {"commit": commit, "created": datetime.now().isoformat(timespec="seconds"),
+                     "python": sys.version.split()[0], "repeats": args.repeats},
+            "commands": results,
+        }, fh, indent=2)
+    print(f"Results written to {out}")
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,118 @@
+"""
+Deterministic benchmark world.
+
+build_world(path, seed) runs main_loop.bootstrap_world, the "new game"
+bootstrap (init_db, clubs, players, fixtures, cups, staff), with `random` and every
+Faker instance seeded (names come from main_loop's NamePool, which draws from
+`random`), so two builds with the same seed and code produce the
+same save. SQLite's RANDOM() (used by the cup draws) is replaced on the
+connections we hand out by one drawing from the seeded `random`. use_database(path) points the module-level DB_PATH globals at it.
+
+play_out_season(path) plays every league fixture of that world (match engine
+only), giving a save that is ready for the Aug 31 season rollover.
+"""
+import contextlib
+import os
+import random
+import sqlite3
+import sys
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from faker import Faker
+
+import decision_making
+import main_loop as ml
+from db_connection import open_connection
+
+DEFAULT_SEED = 20250901
+START_DATE = date(2025, 9, 1)
+START_SEASON = "2025/26"
+
+
+def seed_everything(seed):
+    """Seed `random` and the generator shared by all Faker instances; drop the names drawn ahead."""
+    random.seed(seed)
+    Faker.seed(seed)
+    ml.names.reset()
+
+
+def seed_sql_random(conn):
+    """Make RANDOM() on `conn` draw from the seeded `random` module."""
+    conn.create_function("random", 0, lambda: random.randint(-2 ** 63, 2 ** 63 - 1))
+    return conn
+
+
+def use_database(db_path):
+    """Point main_loop / decision_making at db_path."""
+    ml.DB_PATH = db_path
+    decision_making.DB_PATH = db_path
+
+
+def parse_size(text):
+    """'KxDxC' -> (countries, divisions, clubs_per_division)."""
+    parts = tuple(int(p) for p in text.lower().split("x"))
+    if len(parts) != 3 or min(parts) < 1:
+        raise ValueError(f"world size must look like 5x4x20, got {text!r}")
+    return parts
+
+
+def build_world(db_path, seed=DEFAULT_SEED, quiet=True, size=None):
+    """
+    Create a fresh save at db_path and return its row counts. With
+    size=(countries, divisions, clubs_per_division) the clubs and competitions
+    come from populate_synthetic_world instead of the bundled CSVs.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    use_database(db_path)
+    seed_everything(seed)
+    ml.GAME_DATE, ml.SEASON = START_DATE, START_SEASON
+
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        conn = seed_sql_random(open_connection(db_path))
+        try:
+            ml.bootstrap_world(conn, size=size)
+        finally:
+            conn.close()
+
+    return world_counts(db_path)
+
+
+def play_out_season(db_path, seed=DEFAULT_SEED):
+    """Play all unplayed league fixtures in date order; returns the number of matches."""
+    from fixture_calculation import simulate_fixtures_for_day
+
+    use_database(db_path)
+    seed_everything(seed)
+    played = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            ml.DayTickEngine(db_path, commit_every=10 ** 9) as engine:
+        seed_sql_random(engine.conn)
+        days = [row[0] for row in engine.conn.execute("""
+            SELECT DISTINCT f.fixture_date
+            FROM fixtures f
+            JOIN competitions c ON c.id = f.competition_id
+            WHERE c.is_league = 1 AND f.played = 0
+            ORDER BY f.fixture_date
+        """)]
+        for day in days:
+            ml.GAME_DATE = date.fromisoformat(str(day)[:10])
+            played += simulate_fixtures_for_day(engine.conn, ml.GAME_DATE)
+    return played
+
+
+def world_counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("competitions", "clubs", "players", "staff", "fixtures", "players_contract")
+        }
+    finally:
+        conn.close()
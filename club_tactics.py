@@ -0,0 +1,240 @@
+"""
+Per-club tactical profiles shared by the transfer AI and the match engine.
+
+    profile = TACTICS.get(cur, club_id)
+    profile.formation             # manager's preferred formation (None: no manager / unset)
+    profile.starters_for("CB")    # starters the formation needs at a position
+    profile.attack_mult, profile.defense_mult
+
+The manager is the club's most famous active one. A profile is rebuilt when
+the club's club_versions squad or roster version moves on (players in or out,
+manager hired or fired, the weekly progression pass).
+ensure_fresh() rebuilds every stale profile of a day with one query.
+
+Each profile also holds depth charts: the squad's (player_id, role score) at
+a position, best first, built on first use from ROLE_SCORES. drop_depth()
+discards them for squad changes that are not written yet (the
+TransferMarket queue).
+
+Formation parsing itself (formation_to_starters_map, formation_multipliers,
+formation_lines) is cached per formation string.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+import club_versions
+import world_model
+from role_scores import ROLE_SCORES
+
+STARTER_POSITIONS = ("GK", "RB", "LB", "CB", "CM", "RM", "LM", "ST")
+
+FORMATION_STARTERS = {
+    "4-4-2":   {"GK": 1, "RB": 1, "LB": 1, "CB": 2, "CM": 2, "RM": 1, "LM": 1, "ST": 2},
+    "4-3-3":   {"GK": 1, "RB": 1, "LB": 1, "CB": 2, "CM": 3, "RM": 1, "LM": 1, "ST": 1},
+    "3-5-2":   {"GK": 1, "RB": 0, "LB": 0, "CB": 3, "CM": 3, "RM": 1, "LM": 1, "ST": 2},
+    "5-3-2":   {"GK": 1, "RB": 1, "LB": 1, "CB": 3, "CM": 3, "RM": 0, "LM": 0, "ST": 2},
+    "4-2-3-1": {"GK": 1, "RB": 1, "LB": 1, "CB": 2, "CM": 2, "RM": 1, "LM": 1, "ST": 1},
+    "4-1-4-1": {"GK": 1, "RB": 1, "LB": 1, "CB": 2, "CM": 3, "RM": 1, "LM": 1, "ST": 1},
+    "4-5-1":   {"GK": 1, "RB": 1, "LB": 1, "CB": 2, "CM": 4, "RM": 0, "LM": 0, "ST": 1},
+    "3-4-3":   {"GK": 1, "RB": 0, "LB": 0, "CB": 3, "CM": 2, "RM": 1, "LM": 1, "ST": 1},
+}
+
+
+@lru_cache(maxsize=None)
+def _starters_map(form_str):
+    f = (form_str or "").strip()
+    if not f:
+        f = "4-4-2"
+
+    if f in FORMATION_STARTERS:
+        m = FORMATION_STARTERS[f].copy()
+    else:
+        # Heuristic fallback for unknown strings (e.g., "4-4-1-1" ≈ 4-4-2)
+        if f.startswith("4-"):
+            m = FORMATION_STARTERS["4-4-2"].copy()
+        elif f.startswith("3-"):
+            m = FORMATION_STARTERS["3-5-2"].copy()
+        elif f.startswith("5-"):
+            m = FORMATION_STARTERS["5-3-2"].copy()
+        else:
+            m = FORMATION_STARTERS["4-4-2"].copy()
+
+    # Ensure all keys exist
+    for k in STARTER_POSITIONS:
+        m.setdefault(k, 0)
+    return m
+
+
+def formation_to_starters_map(form_str):
+    """
+    Map '4-4-2', '4-3-3', '3-5-2', '4-2-3-1', etc. to per-position starters
+    using the transfer AI's roles (GK, RB, LB, CB, CM, RM, LM, ST).
+    AM/DM/WB are folded into CM/RM/LM heuristically.
+    """
+    return dict(_starters_map(form_str))
+
+
+@lru_cache(maxsize=None)
+def formation_multipliers(formation):
+    """(attack_mult, defense_mult) for a formation string such as '4-3-3' (None = neutral)."""
+    if not formation:
+        return 1.0, 1.0  # neutral
+
+    formation = formation.replace(" ", "")
+    parts = formation.split("-")
+
+    # --- Defense bias (first number)
+    try:
+        defenders = int(parts[0])
+    except:
+        defenders = 4
+
+    # --- Attack bias (last number)
+    try:
+        strikers = int(parts[-1])
+    except:
+        strikers = 2
+
+    atk_mult = 1.0
+    def_mult = 1.0
+
+    # Defense side
+    if defenders >= 5:
+        def_mult *= 1.10
+        atk_mult *= 0.95
+    elif defenders == 3:
+        def_mult *= 0.90
+        atk_mult *= 1.05
+
+    # Attack side
+    if strikers >= 3:
+        atk_mult *= 1.08
+        def_mult *= 0.95
+    elif strikers == 1:
+        atk_mult *= 0.92
+        def_mult *= 1.05
+
+    # Mild normalization to avoid extremes
+    return max(0.85, min(1.15, atk_mult)), max(0.85, min(1.15, def_mult))
+
+
+@lru_cache(maxsize=None)
+def formation_lines(formation):
+    """(defenders, midfielders, forwards) of a matchday XI, summing to 10 outfielders (None = 4-3-3)."""
+    formation = formation or "4-3-3"
+
+    # Parse formation into defender–midfielder–forward numbers
+    try:
+        parts = [int(x) for x in formation.replace(" ", "").split("-")]
+        if len(parts) == 2:  # e.g. "4-4"
+            defs, mids, fwds = parts[0], parts[1], 2
+        elif len(parts) == 3:  # e.g. "4-3-3"
+            defs, mids, fwds = parts
+        elif len(parts) == 4:  # e.g. "4-2-3-1"
+            defs, mids, fwds = parts[0], parts[1] + parts[2], parts[3]
+        else:
+            defs, mids, fwds = 4, 3, 3
+    except Exception:
+        defs, mids, fwds = 4, 3, 3  # fallback
+
+    total = defs + mids + fwds
+    if total != 10:  # GK + 10 outfielders
+        # Normalize proportions to 10
+        scale = 10 / total
+        defs = round(defs * scale)
+        mids = round(mids * scale)
+        fwds = 10 - defs - mids
+    return defs, mids, fwds
+
+
+@dataclass(slots=True)
+class ClubTacticalProfile:
+    club_id: int
+    formation: Optional[str]   # manager's preferred formation, None without one
+    starters: dict             # position -> starters (formation_to_starters_map, 4-4-2 by default)
+    attack_mult: float
+    defense_mult: float
+    depth: dict = field(default_factory=dict)  # position -> [(player_id, role score)], best first
+
+    def starters_for(self, pos, default=1):
+        return self.starters.get(pos, default)
+
+
+def build_profile(club_id, formation):
+    atk_mult, def_mult = formation_multipliers(formation)
+    return ClubTacticalProfile(club_id, formation, formation_to_starters_map(formation or "4-4-2"), atk_mult, def_mult)
+
+
+class TacticsCache:
+
+    def __init__(self):
+        self.profiles = {}  # club_id -> ClubTacticalProfile
+        self.versions = {}  # club_id -> (squad version, roster version) it was built from
+
+    @staticmethod
+    def version(club_id):
+        return club_versions.squad_version(club_id), club_versions.roster_version(club_id)
+
+    def is_stale(self, club_id):
+        return self.versions.get(club_id) != self.version(club_id)
+
+    def ensure_fresh(self, cur, club_ids):
+        stale = [cid for cid in club_ids if self.is_stale(cid)]
+        if stale:
+            self.load(cur, stale)
+
+    def load(self, cur, club_ids):
+        """Rebuild the profiles of club_ids (one manager query, none with an active world)."""
+        world = world_model.active()
+        if world is not None:
+            formations = {}
+            for cid in club_ids:
+                manager = world.manager(cid, by="fame")
+                formations[cid] = manager.preferred_formation if manager else None
+        elif len(club_ids) == 1:
+            row = cur.execute("""
+                SELECT preferred_formation
+                FROM staff
+                WHERE club_id = ? AND role = 'Manager' AND is_retired = 0
+                ORDER BY fame DESC, id ASC LIMIT 1
+            """, (club_ids[0],)).fetchone()
+            formations = {club_ids[0]: row[0] if row else None}
+        else:
+            # Most famous manager last, so dict() keeps it
+            formations = dict(cur.execute("""
+                SELECT club_id, preferred_formation
+                FROM staff
+                WHERE club_id IS NOT NULL AND role = 'Manager' AND is_retired = 0
+                ORDER BY fame ASC, id DESC
+            """).fetchall())
+        for cid in club_ids:
+            self.profiles[cid] = build_profile(cid, formations.get(cid))
+            self.versions[cid] = self.version(cid)
+
+    def get(self, cur, club_id):
+        if self.is_stale(club_id):
+            self.load(cur, [club_id])
+        return self.profiles[club_id]
+
+    def depth_chart(self, cur, club_id, pos, members):
+        """
+        [(player_id, role score)] at pos, best first. members() returns the
+        club's player ids for pos and is only called when the chart is built.
+        """
+        depth = self.get(cur, club_id).depth
+        chart = depth.get(pos)
+        if chart is None:
+            chart = [(pid, ROLE_SCORES.score(cur, pid, pos)) for pid in members()]
+            chart.sort(key=lambda x: x[1], reverse=True)
+            depth[pos] = chart
+        return chart
+
+    def drop_depth(self, *club_ids):
+        for cid in club_ids:
+            profile = self.profiles.get(cid)
+            if profile is not None:
+                profile.depth.clear()
+
+
+TACTICS = TacticsCache()
@@ -0,0 +1,65 @@
+"""
+In-process version counters for club state.
+
+Anything that caches per-club data (team strengths, depth charts, ...) stores
+the version it was built from and rebuilds when the current version differs.
+Code that changes a squad calls bump_squad(club_id); code that touches every
+player at once (the weekly progression pass, a fresh connection to a save)
+calls bump_all().
+
+Roster versions only change when players or staff join or leave a club
+(bump_roster, also done by bump_squad); the transfer AI's scheduler uses them
+to skip clubs nothing happened to. The weekly progression pass changes
+attributes only, so it calls bump_all(rosters=False) plus bump_roster() for
+the clubs that lost players to retirement.
+
+roster_epoch() only moves on a full bump_all(), i.e. when nothing cached can
+be trusted (a freshly opened save); per-player caches such as the role
+scores reload on it.
+"""
+
+_epoch = 0
+_squad = {}
+_roster_epoch = 0
+_roster = {}
+
+
+def bump_squad(*club_ids):
+    """Mark the squads of the given clubs as changed (None ids are ignored)."""
+    for cid in club_ids:
+        if cid is not None:
+            _squad[cid] = _squad.get(cid, 0) + 1
+    bump_roster(*club_ids)
+
+
+def bump_roster(*club_ids):
+    """Mark that players or staff joined or left the given clubs (None ids are ignored)."""
+    for cid in club_ids:
+        if cid is not None:
+            _roster[cid] = _roster.get(cid, 0) + 1
+
+
+def bump_all(rosters=True):
+    """Invalidate every club at once (rosters=False: squads/attributes only)."""
+    global _epoch, _roster_epoch
+    _epoch += 1
+    _squad.clear()
+    if rosters:
+        _roster_epoch += 1
+        _roster.clear()
+
+
+def epoch():
+    return _epoch
+
+
+def roster_epoch():
+    return _roster_epoch
+
+
+def squad_version(club_id):
+    return (_epoch, _squad.get(club_id, 0))
+
+
+def roster_version(club_id):
+    return (_roster_epoch, _roster.get(club_id, 0))
@@ -0,0 +1,189 @@
+import re
+import sqlite3
+import time
+
+# Literals (strings, numbers, NULL) -> '?', so 'WHERE id=17' and 'WHERE id=?' group together
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|-?\b\d+(?:\.\d+)?(?:e[-+]?\d+)?\b|\bNULL\b", re.IGNORECASE)
+_SQL_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SQL_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Statement shape used to group queries: literals become '?', IN/VALUES lists collapse."""
+    sql = _SQL_LITERALS.sub("?", sql)
+    sql = _SQL_LISTS.sub("?, ...", sql)
+    return _SQL_SPACES.sub(" ", sql).strip()
+
+
+class SimConnection(sqlite3.Connection):
+    """
+    sqlite3 connection shared by every subsystem during a simulation run.
+
+    While `hold_commits` is set, the commit() calls sprinkled through the
+    subsystems are swallowed so the owner (the day tick engine) decides where
+    the transaction boundaries are. flush() always commits.
+    """
+    hold_commits = False
+    statements = 0
+    profiler = None
+    _counting = False
+
+    def count_statements(self, enabled=True):
+        """Count every SQL statement run on this connection into `statements`."""
+        self._counting = enabled
+        self._install_trace()
+
+    def _install_trace(self):
+        on = self._counting or self.profiler is not None
+        self.set_trace_callback(self._on_statement if on else None)
+
+    def _on_statement(self, sql):
+        self.statements += 1
+        if self.profiler is not None:
+            self.profiler.on_statement(sql)
+
+    def commit(self):
+        if self.hold_commits:
+            return
+        super().commit()
+
+    def flush(self):
+        super().commit()
+
+
+class QueryProfiler:
+    """
+    Per-statement call counts and cumulative time for a ProfiledConnection.
+
+    Calls come from the trace callback (one per executed statement, so an
+    executemany counts once per row). Time is measured by ProfiledCursor
+    around execute/executemany and the fetches that follow, and is charged to
+    the statement the cursor last ran.
+    """
+
+    def __init__(self):
+        self.calls = {}     # normalized sql -> statements run
+        self.seconds = {}   # normalized sql -> seconds spent in execute + fetch
+        self._shapes = {}   # raw sql text -> normalized sql
+
+    def shape(self, sql):
+        key = self._shapes.get(sql)
+        if key is None:
+            if len(self._shapes) > 10000:
+                self._shapes.clear()
+            key = self._shapes[sql] = normalize_sql(sql)
+        return key
+
+    def on_statement(self, sql):
+        key = self.shape(sql)
+        self.calls[key] = self.calls.get(key, 0) + 1
+
+    def add_time(self, key, seconds):
+        self.seconds[key] = self.seconds.get(key, 0.0) + seconds
+
+    def top(self, limit=25, by="seconds"):
+        """[(sql, calls, seconds)] of the worst offenders by 'seconds' or 'calls'."""
+        keys = self.calls.keys() | self.seconds.keys()
+        rows = [(k, self.calls.get(k, 0), self.seconds.get(k, 0.0)) for k in keys]
+        rows.sort(key=(lambda r: r[2]) if by == "seconds" else (lambda r: r[1]), reverse=True)
+        return rows[:limit]
+
+    def report(self, limit=25):
+        total_calls = sum(self.calls.values())
+        total_secs = sum(self.seconds.values())
+        lines = [f"{total_calls} statements, {total_secs:.2f}s in SQL, {len(self.calls)} distinct shapes", ""]
+        for title, by in (("Top statements by time", "seconds"), ("Top statements by calls", "calls")):
+            lines.append(title)
+            lines.append(f"{'calls':>9}{'total ms':>11}{'avg us':>9}  sql")
+            for sql, calls, secs in self.top(limit, by):
+                avg = secs * 1e6 / calls if calls else 0.0
+                lines.append(f"{calls:>9}{secs * 1000:>11.1f}{avg:>9.1f}  {sql[:160]}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def write_report(self, path, limit=25):
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(self.report(limit))
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that charges execute and fetch time to the connection's QueryProfiler."""
+    _key = None
+
+    def _charge(self, t0):
+        profiler = self.connection.profiler
+        if profiler is not None and self._key is not None:
+            profiler.add_time(self._key, time.perf_counter() - t0)
+
+    def execute(self, sql, parameters=()):
+        self._key = self.connection.profiler.shape(sql)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._charge(t0)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._key = self.connection.profiler.shape(sql)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._charge(t0)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._charge(t0)
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._charge(t0)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._charge(t0)
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            self._charge(t0)
+
+
+class ProfiledConnection(SimConnection):
+    """SimConnection whose cursors report to `profiler` (see open_connection(profiler=...))."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* build their cursor in C, bypassing cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def open_connection(db_path, profiler=None, **kwargs):
+    """
+    Open a SimConnection on db_path (extra kwargs go to sqlite3.connect).
+
+    With a QueryProfiler, every statement on the connection is counted and
+    timed into it.
+    """
+    if profiler is None:
+        return sqlite3.connect(db_path, factory=SimConnection, **kwargs)
+    conn = sqlite3.connect(db_path, factory=ProfiledConnection, **kwargs)
+    conn.profiler = profiler
+    conn._install_trace()
+    return conn
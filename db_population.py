@@ -3,10 +3,7 @@ import csv
 import math
 import random
 import sqlite3
-from tabulate import tabulate
-from faker import Faker
 from datetime import datetime, timedelta, date
-from dateutil.relativedelta import relativedelta
 import datetime as dt
 from typing import Tuple
 import decision_making
@@ -14,7 +11,7 @@ from decision_making import adjust_board_satisfaction,season_end_board_adjustmen
 
 
 # Nationality weighting by home league country
-# (Only uses nationalities you already support in fakers)
+# (Only uses nationalities you already support in the NamePool)
 NATIONALITY_PROFILES = {
     "Spain": [
         ("Spain", 65),   # strong domestic core
@@ -273,8 +270,10 @@ def calculate_player_fame(age, curr_ability, club_fame):
     # Clamp to 1–2000
     return int(max(1, min(fame, 2000)))
 
-def gen_logs_insert(DB_PATH, GAME_DATE, log_type, log_desc):
-    conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
+def gen_logs_insert(DB_PATH, GAME_DATE, log_type, log_desc, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
     cur = conn.cursor()
     
     cur.execute(
@@ -284,11 +283,146 @@ def gen_logs_insert(DB_PATH, GAME_DATE, log_type, log_desc):
     
     conn.commit()     
     
-    conn.close()
+    if own_conn:
+        conn.close()
     
 
-def init_db(DB_PATH, GAME_DATE):
-    conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
+# League table per season, updated by simulate_fixtures_for_day with every result
+STANDINGS_DDL = """
+    CREATE TABLE IF NOT EXISTS standings (
+        season TEXT NOT NULL,
+        competition_id INTEGER NOT NULL,
+        club_id INTEGER NOT NULL,
+        played INTEGER DEFAULT 0,
+        won INTEGER DEFAULT 0,
+        drawn INTEGER DEFAULT 0,
+        lost INTEGER DEFAULT 0,
+        goals_for INTEGER DEFAULT 0,
+        goals_against INTEGER DEFAULT 0,
+        points INTEGER DEFAULT 0,
+        PRIMARY KEY (competition_id, season, club_id)
+    );
+"""
+
+# Forecast finishing positions per season (season_forecast.update_board_expectations);
+# the board's expected position when a row exists, fame rank otherwise
+BOARD_EXPECTATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS board_expectations (
+        season TEXT NOT NULL,
+        competition_id INTEGER NOT NULL,
+        club_id INTEGER NOT NULL,
+        expected_position INTEGER NOT NULL,
+        mean_position REAL,
+        expected_points REAL,
+        title_prob REAL,
+        promotion_prob REAL,
+        relegation_prob REAL,
+        sims INTEGER,
+        PRIMARY KEY (competition_id, season, club_id)
+    );
+"""
+
+
+# Indexes on fixtures, kept in step by init_db and upgrade_save_schema
+FIXTURE_INDEXES = {
+    "idx_fixtures_date_played": "fixtures(fixture_date, played)",             # simulate_fixtures_for_day
+    "idx_fixtures_comp_season_round": "fixtures(competition_id, season, competition_round)",  # cup_manage, UI
+    "idx_fixtures_home_played_date": "fixtures(home_club_id, played, fixture_date)",  # get_team_form
+    "idx_fixtures_away_played_date": "fixtures(away_club_id, played, fixture_date)",
+}
+
+
+def ensure_fixture_indexes(cur):
+    """Create any missing index from FIXTURE_INDEXES. Returns the names created."""
+    existing = {r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='fixtures'")}
+    created = []
+    for name, target in FIXTURE_INDEXES.items():
+        if name not in existing:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+            created.append(name)
+    return created
+
+
+def backfill_standings(cur):
+    """Rebuild standings from every league fixture (played or scheduled)."""
+    cur.execute("DELETE FROM standings")
+    cur.execute("""
+        INSERT INTO standings (season, competition_id, club_id, played, won, drawn, lost,
+                               goals_for, goals_against, points)
+        SELECT season, competition_id, club_id,
+               SUM(played),
+               SUM(CASE WHEN played = 1 AND gf > ga THEN 1 ELSE 0 END),
+               SUM(CASE WHEN played = 1 AND gf = ga THEN 1 ELSE 0 END),
+               SUM(CASE WHEN played = 1 AND gf < ga THEN 1 ELSE 0 END),
+               SUM(CASE WHEN played = 1 THEN gf ELSE 0 END),
+               SUM(CASE WHEN played = 1 THEN ga ELSE 0 END),
+               SUM(CASE WHEN played = 1 AND gf > ga THEN 3
+                        WHEN played = 1 AND gf = ga THEN 1 ELSE 0 END)
+        FROM (
+            SELECT f.season, f.competition_id, f.home_club_id AS club_id, f.played,
+                   f.home_goals AS gf, f.away_goals AS ga
+            FROM fixtures f JOIN competitions c ON c.id = f.competition_id
+            WHERE c.is_league = 1
+            UNION ALL
+            SELECT f.season, f.competition_id, f.away_club_id, f.played,
+                   f.away_goals, f.home_goals
+            FROM fixtures f JOIN competitions c ON c.id = f.competition_id
+            WHERE c.is_league = 1
+        )
+        WHERE season IS NOT NULL
+        GROUP BY season, competition_id, club_id
+    """)
+
+
+def sync_primary_positions(cur, player_ids=None):
+    """
+    Refresh players.primary_position from players_positions for the given
+    players (None = everyone). Call after writing a player's positions.
+    """
+    sql = """
+        UPDATE players
+           SET primary_position = COALESCE(
+                 (SELECT MIN(pp.position) FROM players_positions pp WHERE pp.player_id = players.id),
+                 position,
+                 'CM')
+    """
+    if player_ids is None:
+        cur.execute(sql)
+        return
+    player_ids = list(player_ids)
+    for i in range(0, len(player_ids), 500):
+        chunk = player_ids[i:i + 500]
+        cur.execute(sql + f" WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+
+
+def upgrade_save_schema(conn):
+    """
+    Bring a save created by an older version up to the current schema.
+    Safe to call on every start.
+    """
+    cur = conn.cursor()
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(players)")}
+    if "primary_position" not in cols:
+        cur.execute("ALTER TABLE players ADD COLUMN primary_position TEXT")
+        sync_primary_positions(cur)
+        print("✅ players.primary_position added")
+    if not cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='standings'").fetchone():
+        cur.executescript(STANDINGS_DDL)
+        backfill_standings(cur)
+        print("✅ standings table built from fixtures")
+    cur.execute(BOARD_EXPECTATIONS_DDL)
+    created = ensure_fixture_indexes(cur)
+    if created:
+        print(f"✅ fixtures indexes added: {', '.join(created)}")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_club_primary ON players(club_id, is_retired, primary_position)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_contract_player ON players_contract(player_id, is_terminated)")
+    conn.commit()
+
+
+def init_db(DB_PATH, GAME_DATE, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
     cur = conn.cursor()
 
     cur.executescript("""
@@ -319,6 +453,8 @@ def init_db(DB_PATH, GAME_DATE):
     DROP TABLE IF EXISTS player_stats_summary;
     DROP TABLE IF EXISTS league_links;  
     DROP TABLE IF EXISTS league_movements;  
+    DROP TABLE IF EXISTS standings;
+    DROP TABLE IF EXISTS board_expectations;
     """)
 
     cur.executescript("""
@@ -451,6 +587,7 @@ def init_db(DB_PATH, GAME_DATE):
         fame INTEGER DEFAULT 0,
         peak_fame INTEGER DEFAULT 0,
         last_transfer_ts DATE,
+        primary_position TEXT,            -- first of players_positions (alphabetical), kept by sync_primary_positions
         FOREIGN KEY (club_id) REFERENCES clubs(id)
     );
     
@@ -620,6 +757,8 @@ def init_db(DB_PATH, GAME_DATE):
         FOREIGN KEY (fixture_id) REFERENCES fixtures(id)
     );
     """)
+    cur.executescript(STANDINGS_DDL)
+    cur.executescript(BOARD_EXPECTATIONS_DDL)
 
     leagues = [
         # England
@@ -662,18 +801,91 @@ def init_db(DB_PATH, GAME_DATE):
     cur.execute("CREATE INDEX IF NOT EXISTS idx_players_club_alive ON players(club_id, is_retired)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_players_positions_pos ON players_positions(position, player_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_players_positions_player ON players_positions(player_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_club_primary ON players(club_id, is_retired, primary_position)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_players_attr_player ON players_attr(player_id)")
+    ensure_fixture_indexes(cur)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_transfers_log_player_ts ON transfers_log(player_id, ts)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_staff_club_role ON staff(club_id, role)")        
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_contract_player ON players_contract(player_id, is_terminated)")
         
     conn.commit()     
     
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Database initialized:", DB_PATH)
     
     
-def player_stats_summary_func(DB_PATH):
-    conn = sqlite3.connect(DB_PATH)
+SYNTHETIC_COUNTRIES = ["England", "Spain", "Germany", "France", "Italy", "Netherlands", "Argentina"]
+SYNTHETIC_CLUB_SUFFIXES = ["FC", "United", "City", "Athletic", "Rovers", "Town", "Sporting", "Albion"]
+
+
+def populate_synthetic_world(DB_PATH, countries=2, divisions=2, clubs_per_division=20, promotions=2, conn=None):
+    """
+    Replace the default competitions and clubs of a freshly initialised save
+    with `countries` x `divisions` leagues of `clubs_per_division` clubs each,
+    a domestic cup per country and promotion/relegation links between
+    consecutive divisions. Run instead of populate_clubs(); the rest of the
+    new-game bootstrap (balances, boards, players, staff, fixtures) is unchanged.
+
+    Countries beyond SYNTHETIC_COUNTRIES are named 'Country 8', 'Country 9', ...
+    Returns the league competition ids.
+    """
+    from faker import Faker
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    faker = Faker()
+
+    cur.execute("DELETE FROM league_links")
+    cur.execute("DELETE FROM competitions")
+
+    competitions, links, clubs, league_ids = [], [], [], []
+    comp_id = 0
+    for k in range(countries):
+        country = SYNTHETIC_COUNTRIES[k] if k < len(SYNTHETIC_COUNTRIES) else f"Country {k + 1}"
+        parent = None
+        for level in range(1, divisions + 1):
+            comp_id += 1
+            competitions.append((comp_id, f"{country} Division {level}", country, level, clubs_per_division,
+                                 promotions if level > 1 else 0, promotions if level < divisions else 0, 1, 0))
+            league_ids.append(comp_id)
+            if parent is not None:
+                links.append((parent, comp_id, promotions, promotions, 1))
+            parent = comp_id
+
+            # Fame falls ~300 per division, with some spread inside each league
+            top_fame = max(300, 1900 - 300 * (level - 1))
+            for i in range(clubs_per_division):
+                fame = max(100, int(top_fame - i * 600 / max(1, clubs_per_division - 1) + random.randint(-50, 50)))
+                name = f"{faker.city()} {random.choice(SYNTHETIC_CLUB_SUFFIXES)}"
+                clubs.append((name, name[:3].upper(), comp_id, f"{name} Stadium", fame))
+        comp_id += 1
+        competitions.append((comp_id, f"{country} Cup", country, 99, divisions * clubs_per_division, None, None, 0, 1))
+
+    cur.executemany("""
+        INSERT INTO competitions (id, name, country, level, total_clubs, promoted_clubs, relegated_clubs,
+                                  is_league, is_cup)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, competitions)
+    cur.executemany("""
+        INSERT INTO league_links(parent_league_id, child_league_id, promote_automatic, relegate_automatic, priority)
+        VALUES (?, ?, ?, ?, ?)
+    """, links)
+    cur.executemany("INSERT INTO clubs (name, short_name, league_id, stadium, fame) VALUES (?, ?, ?, ?, ?)", clubs)
+
+    conn.commit()
+    if own_conn:
+        conn.close()
+    print(f"✅ Synthetic world: {len(league_ids)} leagues, {countries} cups, {len(clubs)} clubs")
+    return league_ids
+
+
+def player_stats_summary_func(DB_PATH, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     cur.execute("""
@@ -715,7 +927,8 @@ def player_stats_summary_func(DB_PATH):
     """)    
     
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     
 
 def distribute_attributes(curr_ability, pot_ability, position, club_fame=1000):
@@ -787,7 +1000,7 @@ def random_potential():
     lo, hi, _ = random.choices(buckets, weights=[b[2] for b in buckets])[0]
     return random.randint(lo, hi)
 
-def generate_player(GAME_DATE, fakers, position=None, club_id=None, club_fame=None, force_youth=False, home_country=None):
+def generate_player(GAME_DATE, names, position=None, club_id=None, club_fame=None, force_youth=False, home_country=None):
     # --- Identity / Nationality (country-aware) ---
     if home_country and home_country in NATIONALITY_PROFILES:
         choices = NATIONALITY_PROFILES[home_country]
@@ -798,12 +1011,14 @@ def generate_player(GAME_DATE, fakers, position=None, club_id=None, club_fame=No
     nat_weights = [w for _, w in choices]
     nationality = random.choices(nat_labels, weights=nat_weights, k=1)[0]
 
-    faker = fakers[nationality] if nationality in fakers else fakers["Random"]
+    # names: a NamePool (unknown nationalities draw from its default locale)
     if nationality == "Random":
-        nationality = faker.country()
+        country = names.country()
 
-    first_name = faker.first_name_male()
-    last_name  = faker.last_name()
+    first_name = names.first_name(nationality)
+    last_name  = names.last_name(nationality)
+    if nationality == "Random":
+        nationality = country
     # (rest of your generate_player stays the same)
 
     # --- Position ---
@@ -895,10 +1110,11 @@ def calculate_age(birth_date, game_date):
 
 
 
-def top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5):
+def top_up_free_agents(DB_PATH, GAME_DATE, names, per_club=5, conn=None):
     """
     Ensure there are at least (per_club × #league clubs) free agents available.
     Keeps positional balance similar to club needs.
+    Pass `conn` to run on the caller's connection (it is left open).
     """
     import sqlite3, datetime as dt, random
 
@@ -910,7 +1126,9 @@ def top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5):
     POSITIONS = list(POS_WEIGHTS.keys())
     WEIGHTS   = [POS_WEIGHTS[p] for p in POSITIONS]
 
-    conn = sqlite3.connect(DB_PATH)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Count league clubs (ignore cups)
@@ -929,7 +1147,8 @@ def top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5):
     target = per_club * clubs_n
     need = max(0, target - free_now)
     if need == 0:
-        conn.close()
+        if own_conn:
+            conn.close()
         print(f"✅ Free-agent pool already sufficient: {free_now}/{target}")
         return
 
@@ -941,7 +1160,7 @@ def top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5):
     def _append_free(position):
         # Use a neutral market context for FAs (club_id=None, club_fame=1000)
         p, a, c = generate_player(
-            GAME_DATE, fakers,
+            GAME_DATE, names,
             position=position, club_id=None, club_fame=1000,
             home_country=None  # default nationality mix
         )
@@ -1020,15 +1239,19 @@ def top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5):
         "INSERT INTO players_positions (player_id, position, foot) VALUES (?, ?, ?)",
         filled_pos_rows
     )
+    sync_primary_positions(cur, pids)
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ Added {need} new free agents (total now ≥ {target})")
 
 
 
-def populate_all_players(DB_PATH, GAME_DATE, fakers):
-    conn = sqlite3.connect(DB_PATH)
+def populate_all_players(DB_PATH, GAME_DATE, names, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     def create_players_for_league(league_id):
@@ -1055,7 +1278,7 @@ def populate_all_players(DB_PATH, GAME_DATE, fakers):
             for pos, count in position_counts.items():
                 for _ in range(count):
                     p, a, c = generate_player(
-                        GAME_DATE, fakers,
+                        GAME_DATE, names,
                         position=pos, club_id=club_id, club_fame=club_fame,
                         home_country=league_country  # ← key change
                     )
@@ -1077,7 +1300,8 @@ def populate_all_players(DB_PATH, GAME_DATE, fakers):
     league_ids = [r[0] for r in cur.fetchall()]
     if not league_ids:
         print("⚠️ No leagues found in clubs; nothing to generate.")
-        conn.close()
+        if own_conn:
+            conn.close()
         return
 
     # Generate for every league present (e.g., 1,2,4,5)
@@ -1090,7 +1314,8 @@ def populate_all_players(DB_PATH, GAME_DATE, fakers):
 
     if not all_players:
         print("⚠️ No players generated.")
-        conn.close()
+        if own_conn:
+            conn.close()
         return
 
     # Insert players
@@ -1139,9 +1364,11 @@ def populate_all_players(DB_PATH, GAME_DATE, fakers):
             "INSERT INTO players_positions (player_id, position, foot) VALUES (?, ?, ?)",
             pos_rows
         )
+    sync_primary_positions(cur, player_ids)
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ {len(all_players)} league players generated with contracts")
     print("✅ players_positions rows added")
 
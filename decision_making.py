@@ -2,7 +2,12 @@ import os
 import random
 import sqlite3
 from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
+import club_versions
+import world_model
+import perf
+from transfer_market import TransferMarket
+from role_scores import ROLE_SCORES
+from club_tactics import TACTICS
 #from db_population import gen_logs_insert
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,17 +25,69 @@ MAX_TRANSFERS_PER_PLAYER = 3     # lifetime cap (moves of any type)
 
 GEN_LOG_ACTIVATED = 0
 
+# Every league competition (the board only judges clubs in a league)
+LEAGUE_IDS_SQL = "SELECT id FROM competitions WHERE COALESCE(is_league, 0) = 1"
 
+# Outside transfer windows, only look at clubs that changed or still have needs
+DIRTY_CLUBS_ONLY = True
 
 
+def is_window(d: date) -> bool:
+    """Transfer windows: January, July and August."""
+    return d.month in (1, 7, 8)
 
-def decision_making_func(GAME_DATE):
+
+class ClubScheduler:
+    """
+    Which clubs decision_making_func evaluates on a given day.
+
+    Window days are full passes. On other days a club is only evaluated when
+    its roster changed since its last evaluation (club_versions.roster_version:
+    a player or staff member joined or left), or when it still had needs then
+    (short squad, a REQUIRED position or a staff role missing) and the supply
+    it was turned down by has changed: the free players / free staff, or the
+    month (balances move with the monthly finances).
+    """
+
+    def __init__(self):
+        self.seen = {}        # club_id -> (roster_version, supply) at its last evaluation
+        self.pending = set()  # clubs left with needs
+
+    def due(self, club_id, supply, full=False):
+        if full or club_id not in self.seen:
+            return True
+        version, last_supply = self.seen[club_id]
+        if version != club_versions.roster_version(club_id):
+            return True
+        return club_id in self.pending and last_supply != supply
+
+    def evaluated(self, club_id, supply, has_needs):
+        self.seen[club_id] = (club_versions.roster_version(club_id), supply)
+        if has_needs:
+            self.pending.add(club_id)
+        else:
+            self.pending.discard(club_id)
+
+
+CLUB_SCHEDULER = ClubScheduler()
+
+
+
+
+
+@perf.timed()
+def decision_making_func(GAME_DATE, conn=None):
     """
     Transfers + Staff:
       - COOLDOWN_DAYS=180 via transfers_log check
       - unique (player_id, ts) index
       - seller re-check right before move
       - commit after each successful transfer
+    Pass `conn` to run on the caller's connection (it is left open).
+
+    On transfer-window days the player side reads a TransferMarket snapshot
+    (built once for the day) and the day's signings and transfers are
+    written in bulk after the last club.
     """
 
     if GEN_LOG_ACTIVATED:
@@ -40,86 +97,31 @@ def decision_making_func(GAME_DATE):
     cutoff_date = (GAME_DATE - timedelta(days=COOLDOWN_DAYS)).isoformat()
 
 
-    conn = sqlite3.connect(DB_PATH)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
+    # In-memory world (DayTickEngine(world=True)); None means read everything from SQLite
+    world = world_model.active()
+    # Day snapshot of the player market, loaded below on window days
+    market = None
+
 
-    def formation_to_starters_map(form_str: str) -> dict:
-        """
-        Map '4-4-2', '4-3-3', '3-5-2', '4-2-3-1', etc. to per-position starters
-        using your roles (GK, RB, LB, CB, CM, RM, LM, ST).
-        AM/DM/WB are folded into CM/RM/LM heuristically.
-        """
-        f = (form_str or "").strip()
-        if not f:
-            f = "4-4-2"
-    
-        presets = {
-            "4-4-2":   {"GK":1,"RB":1,"LB":1,"CB":2,"CM":2,"RM":1,"LM":1,"ST":2},
-            "4-3-3":   {"GK":1,"RB":1,"LB":1,"CB":2,"CM":3,"RM":1,"LM":1,"ST":1},
-            "3-5-2":   {"GK":1,"RB":0,"LB":0,"CB":3,"CM":3,"RM":1,"LM":1,"ST":2},
-            "5-3-2":   {"GK":1,"RB":1,"LB":1,"CB":3,"CM":3,"RM":0,"LM":0,"ST":2},
-            "4-2-3-1": {"GK":1,"RB":1,"LB":1,"CB":2,"CM":2,"RM":1,"LM":1,"ST":1},
-            "4-1-4-1": {"GK":1,"RB":1,"LB":1,"CB":2,"CM":3,"RM":1,"LM":1,"ST":1},
-            "4-5-1":   {"GK":1,"RB":1,"LB":1,"CB":2,"CM":4,"RM":0,"LM":0,"ST":1},
-            "3-4-3":   {"GK":1,"RB":0,"LB":0,"CB":3,"CM":2,"RM":1,"LM":1,"ST":1},
-        }
-    
-        if f in presets:
-            m = presets[f].copy()
-        else:
-            # Heuristic fallback for unknown strings (e.g., "4-4-1-1" ≈ 4-4-2)
-            if f.startswith("4-"):
-                m = presets["4-4-2"].copy()
-            elif f.startswith("3-"):
-                m = presets["3-5-2"].copy()
-            elif f.startswith("5-"):
-                m = presets["5-3-2"].copy()
-            else:
-                m = presets["4-4-2"].copy()
-    
-        # Ensure all keys exist
-        for k in ("GK","RB","LB","CB","CM","RM","LM","ST"):
-            m.setdefault(k, 0)
-        return m
-    
-    
-    def get_club_starters_map(club_id: int) -> dict:
-        """
-        Read the manager's staff.preferred_formation for this club and return starters map.
-        Falls back to '4-4-2' if no manager or no preference set.
-        """
-        row = cur.execute("""
-            SELECT preferred_formation
-            FROM staff
-            WHERE club_id=? AND role='Manager' AND is_retired=0
-            ORDER BY id DESC
-            LIMIT 1
-        """, (club_id,)).fetchone()
-    
-        form = row[0] if row and row[0] else "4-4-2"
-        return formation_to_starters_map(form)
-    
-    
     def starters_for_pos(club_id: int, pos: str, default_starters: int = 1) -> int:
-        return get_club_starters_map(club_id).get(pos, default_starters)
+        return TACTICS.get(cur, club_id).starters_for(pos, default_starters)
 
 
     def count_players_in_pos(club_id: int, pos: str) -> int:
-        (cnt,) = cur.execute("""
-            SELECT COUNT(DISTINCT p.id)
-            FROM players p
-            LEFT JOIN players_positions pp ON pp.player_id = p.id
-            WHERE p.club_id=? AND p.is_retired=0
-              AND COALESCE(pp.position, p.position) = ?
-        """, (club_id, pos)).fetchone()
-        return cnt
+        return len(club_pos_scores(club_id, pos))
 
 
     def last_transfer(pid: int):
         """
         Returns (ts_str, from_club_id, to_club_id) of the last move, or (None, None, None).
         """
+        if market is not None:
+            return market.last_transfer(pid)
         row = cur.execute("""
             SELECT ts, from_club_id, to_club_id
             FROM transfers_log
@@ -130,6 +132,8 @@ def decision_making_func(GAME_DATE):
         return row if row else (None, None, None)
     
     def lifetime_transfers(pid: int) -> int:
+        if market is not None:
+            return market.moves[pid]
         (cnt,) = cur.execute("SELECT COUNT(*) FROM transfers_log WHERE player_id=?", (pid,)).fetchone()
         return cnt
     
@@ -159,6 +163,10 @@ def decision_making_func(GAME_DATE):
 
 
     def club_balance(cid: int) -> int:
+        if market is not None:
+            return market.balance.get(cid, 0)
+        if world is not None:
+            return world.club_balance(cid)
         row = cur.execute("SELECT current_balance_EUR FROM clubs WHERE id=?", (cid,)).fetchone()
         return row[0] if row else 0
     # -----------------------
@@ -195,9 +203,6 @@ def decision_making_func(GAME_DATE):
     # -----------------------
     # Helpers / config
     # -----------------------
-    def is_window(d: date) -> bool:
-        return d.month in (1, 7, 8)
-
     REQUIRED = {
         "GK": 2,
         "RB": 2, "LB": 2, "CB": 4,
@@ -222,13 +227,16 @@ def decision_making_func(GAME_DATE):
         Example: [('CB', 2), ('GK', 1), ...]
         """
         
-        counts = dict(cur.execute("""
+        if market is not None:
+            counts = market.listed_counts[club_id]
+        else:
+            counts = world.listed_position_counts(club_id) if world is not None else dict(cur.execute("""
             SELECT pp.position, COUNT(*)
             FROM players p
             JOIN players_positions pp ON pp.player_id = p.id
             WHERE p.club_id=? AND p.is_retired=0
             GROUP BY pp.position
-        """, (club_id,)).fetchall())
+            """, (club_id,)).fetchall())
     
         lacks = []
         for pos in ALL_POSITIONS:
@@ -242,43 +250,25 @@ def decision_making_func(GAME_DATE):
 
     
     
-    def key_attrs_for_pos(pos: str):
-        """Return the list of key attribute column names for a position."""
-        if pos == "GK":
-            return ["at_goalkeeping", "at_defending"]
-        if pos in ("CB", "RB", "LB"):
-            return ["at_defending", "at_passing"]
-        if pos in ("CM", "RM", "LM"):
-            return ["at_passing", "at_dribbling"]
-        # forwards / wingers
-        return ["at_scoring", "at_dribbling", "at_speed"]
-    
     def player_pos_score(pid: int, pos: str) -> int:
-        """Role score = 60% Current Ability + 40% avg(key attributes)."""
-        row = cur.execute(f"""
-            SELECT pa.at_curr_ability, {", ".join(key_attrs_for_pos(pos))}
-            FROM players_attr pa
-            WHERE pa.player_id=?
-        """, (pid,)).fetchone()
-        if not row:
-            return 0
-        ca = row[0]
-        keys = row[1:]
-        key_avg = sum(keys) / len(keys) if keys else 0
-        score = 0.60 * ca + 0.40 * key_avg
-        return int(score)
+        """Role score = 60% Current Ability + 40% avg(key attributes), see role_scores."""
+        return ROLE_SCORES.score(cur, pid, pos)
     
     def club_pos_scores(club_id: int, pos: str):
-        rows = cur.execute("""
-            SELECT DISTINCT p.id
-            FROM players p
-            LEFT JOIN players_positions pp ON pp.player_id = p.id
-            WHERE p.club_id=? AND p.is_retired=0
-              AND COALESCE(pp.position, p.position) = ?
-        """, (club_id, pos)).fetchall()
-        scores = [(pid, player_pos_score(pid, pos)) for (pid,) in rows]
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores
+        """Depth chart from the club's tactical profile: [(player_id, role score)] at pos, best first."""
+        def members():
+            if market is not None:
+                return market.players_in_pos(club_id, pos)
+            if world is not None:
+                return world.players_in_pos(club_id, pos)
+            return [r[0] for r in cur.execute("""
+                SELECT DISTINCT p.id
+                FROM players p
+                LEFT JOIN players_positions pp ON pp.player_id = p.id
+                WHERE p.club_id=? AND p.is_retired=0
+                  AND COALESCE(pp.position, p.position) = ?
+            """, (club_id, pos)).fetchall()]
+        return TACTICS.depth_chart(cur, club_id, pos, members)
 
     
     def improves_team(club_id: int, pos: str, cand_pid: int) -> bool:
@@ -302,6 +292,10 @@ def decision_making_func(GAME_DATE):
 
 
     def active_contract_end(pid: int):
+        if market is not None:
+            return market.contract_end.get(pid)
+        if world is not None:
+            return world.active_contract_end(pid)
         row = cur.execute("""
             SELECT contract_end
             FROM players_contract
@@ -352,22 +346,46 @@ def decision_making_func(GAME_DATE):
 
     
     def club_squad_count(cid: int) -> int:
+        if market is not None:
+            return market.squad_count(cid)
+        if world is not None:
+            return world.squad_count(cid)
         return cur.execute(
             "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (cid,)
         ).fetchone()[0]
+
+    def club_position_counts(cid: int) -> dict:
+        if market is not None:
+            return market.position_counts[cid]
+        if world is not None:
+            return world.position_counts(cid)
+        return dict(cur.execute("""
+            SELECT position, COUNT(*) FROM players
+            WHERE club_id=? AND is_retired=0 GROUP BY position
+        """, (cid,)).fetchall())
     
     def safe_assign_to_club(pid: int, new_cid: int) -> bool:
         """
         Move player only if the target club is still under MAX_SQUAD *at update time*.
         Returns True if the row was updated (moved), False if capacity blocked it.
         """
+        if world is not None:
+            old_cid = world.player_club(pid)
+        else:
+            row = cur.execute("SELECT club_id FROM players WHERE id=?", (pid,)).fetchone()
+            old_cid = row[0] if row else None
         cur.execute("""
             UPDATE players
                SET club_id=?
              WHERE id=?
                AND (SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0) < ?
         """, (new_cid, pid, new_cid, MAX_SQUAD))
-        return cur.rowcount == 1    
+        moved = cur.rowcount == 1
+        if moved:
+            club_versions.bump_squad(old_cid, new_cid)
+            if world is not None:
+                world.move_player(pid, new_cid)
+        return moved
 
     def mark_transfer(pid: int):
         cur.execute("UPDATE players SET last_transfer_ts=? WHERE id=?", (GAME_DATE.isoformat(), pid))
@@ -380,14 +398,12 @@ def decision_making_func(GAME_DATE):
         Try to sign ONE free agent for 'pos'. Returns True if someone was signed.
         Uses live club balance; if squad below MIN_SQUAD, skip the 'improves_team' gate.
         """
-        buyer_total = cur.execute(
-            "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (club_id,)
-        ).fetchone()[0]
+        buyer_total = club_squad_count(club_id)
         if buyer_total >= MAX_SQUAD:
             return False
     
         # pull a decent pool of free agents for this pos
-        candidates = cur.execute("""
+        candidates = market.free_agent_candidates(pos) if market is not None else cur.execute("""
             SELECT DISTINCT p.id, p.first_name, p.last_name,
                    COALESCE(pp.position, p.position) AS position, p.value
             FROM players p
@@ -415,9 +431,7 @@ def decision_making_func(GAME_DATE):
         need_total = buyer_total < MIN_SQUAD
         for _, pid, fn, ln, position, value in scored:
             # capacity guard
-            if cur.execute(
-                "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (club_id,)
-            ).fetchone()[0] >= MAX_SQUAD:
+            if club_squad_count(club_id) >= MAX_SQUAD:
                 return False
     
             live_balance = club_balance(club_id)
@@ -432,16 +446,26 @@ def decision_making_func(GAME_DATE):
             if not (need_total or need_pos or improves_team(club_id, position, pid)):
                 continue
     
+            # 2-year contract to Aug 31
+            end = date(today.year + 2, 8, 31)
+
+            if market is not None:
+                # capacity was checked against the market's live squad count above
+                market.sign_free_agent(pid, club_id, wage, end.isoformat())
+                TACTICS.drop_depth(club_id)
+                moved_today.add(pid)
+                print(f"[{club_name}] Signed FREE {fn} {ln} ({position}) wage={wage}")
+                return True
+
             # assign to club
             if not safe_assign_to_club(pid, club_id):
                 continue
-    
-            # 2-year contract to Aug 31
-            end = date(today.year + 2, 8, 31)
             cur.execute("""
                 INSERT INTO players_contract (player_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated)
                 VALUES (?, ?, 'Professional', ?, ?, ?, 0)
             """, (pid, club_id, today.isoformat(), end.isoformat(), wage))
+            if world is not None:
+                world.sign_contract(pid, end.isoformat())
     
             cur.execute("""
                 INSERT OR IGNORE INTO transfers_log (ts, type, from_club_id, to_club_id, player_id, fee, wage, contract_end)
@@ -486,7 +510,7 @@ def decision_making_func(GAME_DATE):
     def buy_player(club_id: int, club_name: str, pos: str, balance: int, today: date) -> int:
         if not is_window(today) or balance <= 400_000:
             if GEN_LOG_ACTIVATED and balance <= 400_000: 
-                gen_logs_insert(DB_PATH, GAME_DATE, f'[{club_name}] not buying (buy_player filter)', f'Balance too low [{balance}]  ')
+                gen_logs_insert(DB_PATH, GAME_DATE, f'[{club_name}] not buying (buy_player filter)', f'Balance too low [{balance}]  ', conn=conn)
             return balance
     
 
@@ -494,16 +518,19 @@ def decision_making_func(GAME_DATE):
     
 
         # 🚫 Buyer already full?
-        buyer_total = cur.execute(
-            "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (club_id,)
-        ).fetchone()[0]
+        buyer_total = club_squad_count(club_id)
         if buyer_total >= MAX_SQUAD:
             if GEN_LOG_ACTIVATED: 
-                gen_logs_insert(DB_PATH, GAME_DATE, f'[{club_name}] not buying (buy_player filter)', f'Buyer already full [{buyer_total} > {MAX_SQUAD}]  ')
+                gen_logs_insert(DB_PATH, GAME_DATE, f'[{club_name}] not buying (buy_player filter)', f'Buyer already full [{buyer_total} > {MAX_SQUAD}]  ', conn=conn)
             return balance    
     
         # Buyer's fame (used in SQL filter and final guard)
-        buyer_fame = cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,)).fetchone()[0]
+        if market is not None:
+            buyer_fame = market.fame[club_id]
+        elif world is not None:
+            buyer_fame = world.club_fame(club_id)
+        else:
+            buyer_fame = cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,)).fetchone()[0]
         
         # before the pool query:
         agg = calc_aggression(balance, buyer_fame)
@@ -511,7 +538,7 @@ def decision_making_func(GAME_DATE):
         # e.g., base +400 fame, plus up to +1200 more with aggression
         fame_gap = int(400 + agg * 1200)
         
-        pool = cur.execute("""
+        pool = market.sale_candidates(pos, club_id, buyer_fame + fame_gap) if market is not None else cur.execute("""
             SELECT p.id, p.club_id, p.first_name, p.last_name, pp.position, p.value,
                    pa.at_curr_ability, c.fame AS seller_fame, p.date_of_birth
             FROM players p
@@ -544,7 +571,7 @@ def decision_making_func(GAME_DATE):
             ok, reason = can_move_player(pid, club_id, today)
             if not ok:
                 if GEN_LOG_ACTIVATED:
-                    gen_logs_insert(DB_PATH, GAME_DATE, f"[{club_name}] transfer blocked", f"pid={pid} reason={reason}")
+                    gen_logs_insert(DB_PATH, GAME_DATE, f"[{club_name}] transfer blocked", f"pid={pid} reason={reason}", conn=conn)
                 continue
             
             # Final fame guard (belt & suspenders)
@@ -552,22 +579,32 @@ def decision_making_func(GAME_DATE):
                 continue
     
             # Re-check current owner + cooldown (no lock columns)
-            row = cur.execute("SELECT club_id FROM players WHERE id=?", (pid,)).fetchone()
-            if not row:
-                continue
-            current_owner = row[0]
+            if market is not None:
+                current_owner = market.club[pid]
+            elif world is not None:
+                current_owner = world.player_club(pid)
+            else:
+                row = cur.execute("SELECT club_id FROM players WHERE id=?", (pid,)).fetchone()
+                if not row:
+                    continue
+                current_owner = row[0]
             if current_owner != seller_id:
                 continue
             
             # Cooldown guard: skip if moved within last COOLDOWN_DAYS
-            if cur.execute(
+            if market is not None:
+                # the snapshot's last move covers both guards below
+                last_ts = market.last_transfer_ts(pid)
+                if last_ts is not None and last_ts >= cutoff_date:
+                    continue
+            elif cur.execute(
                 "SELECT 1 FROM transfers_log WHERE player_id=? AND ts >= ? LIMIT 1",
                 (pid, cutoff_date)
             ).fetchone():
                 continue
             
             # Same-day guard (belt & suspenders)
-            if cur.execute(
+            elif cur.execute(
                 "SELECT 1 FROM transfers_log WHERE player_id=? AND ts = ? LIMIT 1",
                 (pid, GAME_DATE.isoformat())
             ).fetchone():
@@ -601,9 +638,7 @@ def decision_making_func(GAME_DATE):
                 continue
             
             # Seller must have enough overall squad size after the sale
-            seller_total = cur.execute(
-                "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (seller_id,)
-            ).fetchone()[0]
+            seller_total = club_squad_count(seller_id)
             if seller_total - 1 < MIN_SQUAD:
                 continue  # 🚫 would drop seller below min 18            
                 
@@ -650,6 +685,13 @@ def decision_making_func(GAME_DATE):
             # accept?
             if random.random() < 0.60:
 
+                if market is not None:
+                    end = date(today.year + random.randint(2,4), 8, 31)
+                    market.transfer(pid, seller_id, club_id, fee, wage, end.isoformat())
+                    TACTICS.drop_depth(seller_id, club_id)
+                    print(f"[{club_name}] Bought {fn} {ln} ({position}) fee={fee} wage={wage}")
+                    break
+
                 if not safe_assign_to_club(pid, club_id):
                     continue
 
@@ -657,6 +699,9 @@ def decision_making_func(GAME_DATE):
                 cur.execute("UPDATE clubs SET current_balance_EUR = current_balance_EUR + ? WHERE id=?", (fee, seller_id))
                 # buyer pays fee (relative subtract)
                 cur.execute("UPDATE clubs SET current_balance_EUR = current_balance_EUR - ? WHERE id=?", (fee, club_id))
+                if world is not None:
+                    world.add_balance(seller_id, fee)
+                    world.add_balance(club_id, -fee)
                 # (optional) refresh local for subsequent checks this day
                 live_balance = club_balance(club_id)
 
@@ -675,6 +720,8 @@ def decision_making_func(GAME_DATE):
                     INSERT INTO players_contract (player_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated)
                     VALUES (?, ?, 'Transfer', ?, ?, ?, 0)
                 """, (pid, club_id, today.isoformat(), end.isoformat(), wage))
+                if world is not None:
+                    world.sign_contract(pid, end.isoformat(), terminate_from=today.isoformat())
     
                 cur.execute("""
                     INSERT OR IGNORE INTO transfers_log (ts, type, from_club_id, to_club_id, player_id, fee, wage, contract_end)
@@ -692,6 +739,9 @@ def decision_making_func(GAME_DATE):
     # -----------------------
     # Execution
     # -----------------------
+    if is_window(GAME_DATE):
+        market = TransferMarket.load(cur, GAME_DATE, cutoff_date, world)
+
     # Preload free staff once per day
     free_staff = cur.execute("""
         SELECT s.id, s.first_name, s.last_name, s.role, s.fame
@@ -699,22 +749,27 @@ def decision_making_func(GAME_DATE):
         WHERE s.club_id IS NULL AND s.is_retired = 0
     """).fetchall()
 
-    clubs = cur.execute("SELECT id, name, fame, current_balance_EUR FROM clubs").fetchall()
+    if world is not None:
+        clubs = [(c.id, c.name, c.fame, c.balance) for c in sorted(world.clubs.values(), key=lambda c: c.id)]
+    else:
+        clubs = cur.execute("SELECT id, name, fame, current_balance_EUR FROM clubs").fetchall()
+    TACTICS.ensure_fresh(cur, [c[0] for c in clubs])
     moved_players_today = set()
-
-        
+    full_pass = is_window(GAME_DATE) or not DIRTY_CLUBS_ONLY
+    free_players = cur.execute("""
+        SELECT COUNT(*), TOTAL(id) FROM players WHERE club_id IS NULL AND is_retired = 0
+    """).fetchone()
+    supply = (GAME_DATE.month, tuple(free_players), len(free_staff), sum(fs[0] for fs in free_staff))
 
     for club_id, club_name, club_fame, balance in clubs:
+        if not CLUB_SCHEDULER.due(club_id, supply, full_pass):
+            continue
+
         # count squad
-        counts = dict(cur.execute("""
-            SELECT position, COUNT(*) FROM players
-            WHERE club_id=? AND is_retired=0 GROUP BY position
-        """, (club_id,)).fetchall())
+        counts = club_position_counts(club_id)
 
         # A) Hard safety: if below MIN_SQUAD, fill multiple times this tick
-        total_now = cur.execute(
-            "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (club_id,)
-        ).fetchone()[0]
+        total_now = club_squad_count(club_id)
         
         attempts = 0
         while total_now < MIN_SQUAD and attempts < 6:  # cap per tick to avoid runaway
@@ -738,16 +793,11 @@ def decision_making_func(GAME_DATE):
             if not signed_any:
                 break  # nothing to sign this tick
         
-            total_now = cur.execute(
-                "SELECT COUNT(*) FROM players WHERE club_id=? AND is_retired=0", (club_id,)
-            ).fetchone()[0]
+            total_now = club_squad_count(club_id)
             attempts += 1
         
         # B) Normal one-off “need” logic (your existing flow) …
-        counts = dict(cur.execute("""
-            SELECT position, COUNT(*) FROM players
-            WHERE club_id=? AND is_retired=0 GROUP BY position
-        """, (club_id,)).fetchall())
+        counts = club_position_counts(club_id)
         needed = [pos for pos, need in REQUIRED.items() if counts.get(pos, 0) < need]
         if needed:
             pos_try = random.choice(needed)
@@ -757,20 +807,20 @@ def decision_making_func(GAME_DATE):
 
 
         # 2) If still needs and in window, try a paid buy
-        counts = dict(cur.execute("""
-            SELECT position, COUNT(*) FROM players
-            WHERE club_id=? AND is_retired=0 GROUP BY position
-        """, (club_id,)).fetchall())
+        counts = club_position_counts(club_id)
         needed = [pos for pos, need in REQUIRED.items() if counts.get(pos, 0) < need]
         if needed:
             pos_try = random.choice(needed)
             balance = buy_player(club_id, club_name, pos_try, balance, GAME_DATE)
 
         # 3) STAFF SIGNING (same as before)
-        staff_counts = dict(cur.execute("""
-            SELECT role, COUNT(*) FROM staff
-            WHERE club_id=? AND is_retired=0 GROUP BY role
-        """, (club_id,)).fetchall())
+        if world is not None:
+            staff_counts = world.staff_role_counts(club_id)
+        else:
+            staff_counts = dict(cur.execute("""
+                SELECT role, COUNT(*) FROM staff
+                WHERE club_id=? AND is_retired=0 GROUP BY role
+            """, (club_id,)).fetchall())
 
         staff_needs = []
         for role in ["Manager", "Physio", "Medical", "Scout", "Goalkeeping Coach"]:
@@ -800,6 +850,8 @@ def decision_making_func(GAME_DATE):
                     contract_end = date(GAME_DATE.year + 2, 8, 31)
 
                     cur.execute("UPDATE staff SET club_id=? WHERE id=?", (club_id, sid))
+                    if world is not None:
+                        world.assign_staff(sid, club_id)
                     cur.execute("""
                         INSERT INTO staff_contract (staff_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated)
                         VALUES (?, ?, 'Professional', ?, ?, ?, 0)
@@ -820,17 +872,41 @@ def decision_making_func(GAME_DATE):
                             WHERE club_id=?
                         """, (new_confidence, GAME_DATE.isoformat(), club_id))
 
+                    club_versions.bump_roster(club_id)
                     free_staff = [fs for fs in free_staff if fs[0] != sid]
                     conn.commit()
                     print(f"[{club_name}] Hired staff {fn} {ln} ({role}) wage={wage}")
 
+        CLUB_SCHEDULER.evaluated(club_id, supply, total_now < MIN_SQUAD or bool(needed) or bool(staff_needs))
+
+    if market is not None:
+        market.apply(cur, world)
+        conn.commit()
+
     # no bulk commit needed; we committed after each successful op
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 
 
 def get_expected_table_position(cur, club_id, league_id):
+    """
+    (expected position, clubs in the league). The forecast stored in
+    board_expectations for the league's current season when there is one,
+    the club's fame rank otherwise.
+    """
+    cur.execute("""
+        SELECT be.expected_position
+        FROM board_expectations be
+        WHERE be.competition_id = ? AND be.club_id = ?
+          AND be.season = (SELECT MAX(season) FROM standings WHERE competition_id = ?)
+    """, (league_id, club_id, league_id))
+    forecast = cur.fetchone()
+    if forecast:
+        cur.execute("SELECT COUNT(*) FROM clubs WHERE league_id=?", (league_id,))
+        return forecast[0], cur.fetchone()[0]
+
     cur.execute("SELECT id, fame FROM clubs WHERE league_id=? ORDER BY fame DESC", (league_id,))
     clubs = cur.fetchall()
     for idx, (cid, fame) in enumerate(clubs):
@@ -838,33 +914,41 @@ def get_expected_table_position(cur, club_id, league_id):
             return idx + 1, len(clubs)
     return None, len(clubs)
 
-def get_actual_table_position(cur, club_id, league_id):
+def get_league_table(cur, league_id, season=None):
+    """
+    Club ids of a league sorted by points, goal difference, goals scored.
+    Reads the standings table; season=None means the latest season stored
+    for that competition (the one in progress, or the one just finished).
+    """
     cur.execute("""
-        SELECT c.id,
-               COALESCE(SUM(
-                   CASE
-                       WHEN f.home_club_id = c.id AND f.home_goals > f.away_goals THEN 3
-                       WHEN f.away_club_id = c.id AND f.away_goals > f.home_goals THEN 3
-                       WHEN f.home_goals = f.away_goals AND (f.home_club_id = c.id OR f.away_club_id = c.id) THEN 1
-                       ELSE 0 END
-               ), 0) as points,
-               COALESCE(SUM(CASE WHEN f.home_club_id = c.id THEN f.home_goals ELSE f.away_goals END), 0) as goals_for,
-               COALESCE(SUM(CASE WHEN f.home_club_id = c.id THEN f.away_goals ELSE f.home_goals END), 0) as goals_against
-        FROM clubs c
-        LEFT JOIN fixtures f ON (f.home_club_id = c.id OR f.away_club_id = c.id)
-        WHERE c.league_id = ?
-        GROUP BY c.id
-        ORDER BY points DESC, (goals_for - goals_against) DESC
-    """, (league_id,))
-    table = cur.fetchall()
-    for idx, (cid, *_rest) in enumerate(table):
+        SELECT club_id
+        FROM standings
+        WHERE competition_id = ?
+          AND season = COALESCE(?, (SELECT MAX(season) FROM standings WHERE competition_id = ?))
+        ORDER BY points DESC, (goals_for - goals_against) DESC, goals_for DESC, club_id ASC
+    """, (league_id, season, league_id))
+    return [r[0] for r in cur.fetchall()]
+
+def get_actual_table_position(cur, club_id, league_id, season=None):
+    for idx, cid in enumerate(get_league_table(cur, league_id, season)):
         if cid == club_id:
             return idx + 1  # 1-based
     return None
 
+def get_league_matches_played(cur, club_id, league_id, season=None):
+    cur.execute("""
+        SELECT played
+        FROM standings
+        WHERE competition_id = ? AND club_id = ?
+          AND season = COALESCE(?, (SELECT MAX(season) FROM standings WHERE competition_id = ?))
+    """, (league_id, club_id, season, league_id))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+@perf.timed()
 def board_satisfaction_and_firing(conn, GAME_DATE, min_matches=10, max_matches=15):
     cur = conn.cursor()
-    cur.execute("SELECT id, name, league_id FROM clubs WHERE league_id IN (1,2)")
+    cur.execute(f"SELECT id, name, league_id FROM clubs WHERE league_id IN ({LEAGUE_IDS_SQL})")
     for club_id, club_name, league_id in cur.fetchall():
         
         cur.execute("SELECT last_manager_change FROM clubs_board WHERE club_id=?", (club_id,))
@@ -895,11 +979,7 @@ def board_satisfaction_and_firing(conn, GAME_DATE, min_matches=10, max_matches=1
             fire_chance += 0.2
         
         # Count league matches played this season
-        cur.execute("""
-            SELECT COUNT(*) FROM fixtures
-            WHERE (home_club_id=? OR away_club_id=?) AND competition_id=? AND played=1
-        """, (club_id, club_id, league_id))
-        matches_played = cur.fetchone()[0]
+        matches_played = get_league_matches_played(cur, club_id, league_id)
 
         if matches_played < min_matches:
             continue
@@ -923,6 +1003,10 @@ def board_satisfaction_and_firing(conn, GAME_DATE, min_matches=10, max_matches=1
 
                     # ✅ Fire manager (set him free)
                     cur.execute("UPDATE staff SET club_id=NULL WHERE id=?", (manager_id,))
+                    club_versions.bump_roster(club_id)
+                    world = world_model.active()
+                    if world is not None:
+                        world.assign_staff(manager_id, None)
                     
                     # ✅ Terminate his active contract
                     cur.execute("""
@@ -1005,7 +1089,7 @@ def adjust_board_satisfaction(cur, club_id, result):
 
 def season_end_board_adjustments(conn, season):
     cur = conn.cursor()
-    cur.execute("SELECT id, name, league_id FROM clubs WHERE league_id IN (1,2)")
+    cur.execute(f"SELECT id, name, league_id FROM clubs WHERE league_id IN ({LEAGUE_IDS_SQL})")
     clubs = cur.fetchall()
 
     for club_id, club_name, league_id in clubs:
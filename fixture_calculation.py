@@ -1,15 +1,20 @@
 
+import atexit
 import random
 import math
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import club_versions
+from club_tactics import TACTICS, formation_lines
+import world_model
+import perf
 from decision_making import adjust_board_satisfaction,season_end_board_adjustments
 
 
 GOAL_SCALING = 1.0 
 
-# League baselines (lazy)
-LEAGUE_ATK_MEAN = None
-LEAGUE_DEF_MEAN = None
-
 LEAGUE_DEBUGGING = False
 CUP_DEBUGGING = False
 
@@ -17,53 +22,18 @@ HOME_ADV = 1.08
 
 
 
-def pick_scorers(cur, club_id, goals, fixture_id, team_name, eligible_ids=None):
+def pick_scorers(players, goals, club_fame, rng=random):
     """
-    Picks scorers from the players who actually played minutes.
-    Guarantees scorers exist for both home and away.
+    Picks `goals` scorers (player ids, with repetition) from `players`, the
+    squad match rows of those who actually played minutes.
     """
-    if goals == 0:
-        return [], []
-
-    cur.execute("""
-        SELECT
-          p.id,
-          p.first_name,
-          p.last_name,
-          COALESCE(
-            (SELECT pp.position
-             FROM players_positions pp
-             WHERE pp.player_id = p.id
-             ORDER BY pp.position
-             LIMIT 1),
-            p.position,
-            'CM'
-          ) AS position,
-          pa.at_curr_ability, pa.at_scoring, pa.at_speed
-        FROM players p
-        JOIN players_attr pa ON pa.player_id = p.id
-        WHERE p.club_id = ? AND p.is_retired = 0
-
-
-
-    """, (club_id,))
-    players = cur.fetchall()
-
-    # ✅ Only allow players who actually played minutes
-    if eligible_ids is not None:
-        players = [row for row in players if row[0] in eligible_ids]
-
-    if not players:
-        return [], []
+    if goals == 0 or not players:
+        return []
 
-    # Fame
-    cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,))
-    fame_row = cur.fetchone()
-    fame = fame_row[0] if fame_row else 1000
-    fame_mult = 0.9 + (fame / 2000.0) * 0.2
+    fame_mult = 0.9 + (club_fame / 2000.0) * 0.2
 
-    weighted_pool = []
-    for pid, fn, ln, pos, ability, scoring, speed in players:
+    ids, weights = [], []
+    for pid, pos, _defending, _passing, scoring, _gk, speed, ability in players:
         attr_score = scoring * 1.5 + speed * 0.5 + ability * 0.3
         if pos in ("ST", "CF", "FW"):
             attr_score *= 2.5
@@ -75,22 +45,18 @@ def pick_scorers(cur, club_id, goals, fixture_id, team_name, eligible_ids=None):
             attr_score *= 0.3
         else:
             attr_score *= 0.1
-        weight = attr_score * fame_mult
-        weighted_pool.append((pid, fn, ln, weight))
-
-    scorers, names = [], []
-    for _ in range(goals):
-        scorer = random.choices(
-            weighted_pool, weights=[w for _, _, _, w in weighted_pool], k=1
-        )[0]
-        pid, fn, ln, _ = scorer
-        scorers.append((pid, fixture_id))
-        names.append(f"{fn} {ln} ({team_name})")
+        ids.append(pid)
+        weights.append(attr_score * fame_mult)
 
-    return scorers, names
+    return rng.choices(ids, weights=weights, k=goals)
 
 
-def update_fame_after_match(cur, club_id, result, fame_delta=10):
+def update_fame_after_match(cur, club_id, result, fame_delta=10, pending=None):
+    """
+    Fame change for a club's players, staff and manager after a result.
+    With `pending` (a dict), the deltas are only accumulated per club and
+    written later by apply_fame_deltas(); otherwise they are applied now.
+    """
     # Get club fame for scaling
     cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,))
     row = cur.fetchone()
@@ -112,33 +78,72 @@ def update_fame_after_match(cur, club_id, result, fame_delta=10):
         staff_delta = 0
         manager_delta = 0
 
+    if pending is None:
+        apply_fame_deltas(cur, {club_id: (player_delta, staff_delta, manager_delta)})
+        return
+    acc = pending.setdefault(club_id, [0, 0, 0])
+    acc[0] += player_delta
+    acc[1] += staff_delta
+    acc[2] += manager_delta
+
+
+def apply_fame_deltas(cur, deltas):
+    """
+    Apply {club_id: (player_delta, staff_delta, manager_delta)} with one set-based
+    UPDATE per group, clamping fame to 1–2000.
+    With an active world model the change stays in memory until its next flush.
+    """
+    world = world_model.active()
+    if world is not None:
+        world.apply_fame_deltas(deltas)
+        return
+
+    players = [(p, cid) for cid, (p, s, m) in deltas.items() if p]
+    staff = [(s, cid) for cid, (p, s, m) in deltas.items() if s]
+    managers = [(m, cid) for cid, (p, s, m) in deltas.items() if m]
+
     # Update players
-    cur.execute("SELECT id, fame FROM players WHERE club_id=? AND is_retired=0", (club_id,))
-    for pid, fame in cur.fetchall():
-        new_fame = max(1, min(fame + player_delta, 2000))
-        cur.execute("UPDATE players SET fame=? WHERE id=?", (new_fame, pid))
+    cur.executemany("""
+        UPDATE players SET fame = MAX(1, MIN(2000, fame + ?))
+        WHERE club_id = ? AND is_retired = 0
+    """, players)
 
     # Update staff (except manager)
-    cur.execute("SELECT id, fame FROM staff WHERE club_id=? AND role != 'Manager'", (club_id,))
-    for sid, fame in cur.fetchall():
-        new_fame = max(1, min(fame + staff_delta, 2000))
-        cur.execute("UPDATE staff SET fame=? WHERE id=?", (new_fame, sid))
+    cur.executemany("""
+        UPDATE staff SET fame = MAX(1, MIN(2000, fame + ?))
+        WHERE club_id = ? AND role != 'Manager'
+    """, staff)
 
     # Update manager
-    cur.execute("SELECT id, fame FROM staff WHERE club_id=? AND role = 'Manager'", (club_id,))
-    for sid, fame in cur.fetchall():
-        new_fame = max(1, min(fame + manager_delta, 2000))
-        cur.execute("UPDATE staff SET fame=? WHERE id=?", (new_fame, sid))
+    cur.executemany("""
+        UPDATE staff SET fame = MAX(1, MIN(2000, fame + ?))
+        WHERE club_id = ? AND role = 'Manager'
+    """, managers)
 
 def get_team_form(cur, club_id, limit=5):
+    # Two index range scans (home side / away side) instead of an OR over the whole table
     cur.execute("""
         SELECT home_club_id, away_club_id, home_goals, away_goals
-        FROM fixtures
-        WHERE (home_club_id = ? OR away_club_id = ?)
-          AND played = 1
+        FROM (
+            SELECT * FROM (
+                SELECT home_club_id, away_club_id, home_goals, away_goals, fixture_date
+                FROM fixtures
+                WHERE home_club_id = ? AND played = 1
+                ORDER BY fixture_date DESC
+                LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT home_club_id, away_club_id, home_goals, away_goals, fixture_date
+                FROM fixtures
+                WHERE away_club_id = ? AND played = 1
+                ORDER BY fixture_date DESC
+                LIMIT ?
+            )
+        )
         ORDER BY fixture_date DESC
         LIMIT ?
-    """, (club_id, club_id, limit))
+    """, (club_id, limit, club_id, limit, limit))
     matches = cur.fetchall()
     points = 0
     for home_id, away_id, hg, ag in matches:
@@ -151,62 +156,161 @@ def get_team_form(cur, club_id, limit=5):
     return 1 + (points - 5) / 20.0  # ~0.75–1.25 typical
 
 def get_club_fame(cur, club_id):
+    world = world_model.active()
+    if world is not None:
+        return world.club_fame(club_id)
     cur.execute("SELECT fame FROM clubs WHERE id = ?", (club_id,))
     row = cur.fetchone()
     return row[0] if row else 1000
 
 
+def get_manager_formation(cur, club_id):
+    """preferred_formation of the club's most famous active manager (None if unset), see club_tactics."""
+    return TACTICS.get(cur, club_id).formation
+
+
+def get_squad_match_rows(cur, club_id, limit=None):
+    """
+    (id, position, defending, passing, scoring, goalkeeping, speed, curr_ability)
+    for the club's active players, best current ability first.
+    """
+    world = world_model.active()
+    if world is not None:
+        return [
+            (p.id, p.primary_position, p.attrs.at_defending, p.attrs.at_passing, p.attrs.at_scoring,
+             p.attrs.at_goalkeeping, p.attrs.at_speed, p.attrs.at_curr_ability)
+            for p in world.best_players(club_id, limit)
+        ]
+    cur.execute(f"""
+        SELECT
+          p.id,
+          p.primary_position AS position,
+          pa.at_defending, pa.at_passing, pa.at_scoring,
+          pa.at_goalkeeping, pa.at_speed, pa.at_curr_ability
+        FROM players p
+        JOIN players_attr pa ON pa.player_id = p.id
+        WHERE p.club_id = ? AND p.is_retired = 0
+        ORDER BY pa.at_curr_ability DESC
+        {"LIMIT %d" % limit if limit else ""}
+    """, (club_id,))
+    return cur.fetchall()
+
+
 def formation_modifiers(cur, club_id):
     """
     Returns (attack_mult, defense_mult) based on manager's preferred formation.
     Example: 3-5-2 → (1.08, 0.90)
     """
-    cur.execute("""
-        SELECT preferred_formation
-        FROM staff
-        WHERE club_id = ? AND role = 'Manager' AND is_retired = 0
-        ORDER BY fame DESC LIMIT 1
-    """, (club_id,))
-    row = cur.fetchone()
-    if not row or not row[0]:
-        return 1.0, 1.0  # neutral
-
-    formation = row[0].replace(" ", "")
-    parts = formation.split("-")
-
-    # --- Defense bias (first number)
-    try:
-        defenders = int(parts[0])
-    except:
-        defenders = 4
-
-    # --- Attack bias (last number)
-    try:
-        strikers = int(parts[-1])
-    except:
-        strikers = 2
-
-    atk_mult = 1.0
-    def_mult = 1.0
-
-    # Defense side
-    if defenders >= 5:
-        def_mult *= 1.10
-        atk_mult *= 0.95
-    elif defenders == 3:
-        def_mult *= 0.90
-        atk_mult *= 1.05
-
-    # Attack side
-    if strikers >= 3:
-        atk_mult *= 1.08
-        def_mult *= 0.95
-    elif strikers == 1:
-        atk_mult *= 0.92
-        def_mult *= 1.05
-
-    # Mild normalization to avoid extremes
-    return clamp(atk_mult, 0.85, 1.15), clamp(def_mult, 0.85, 1.15)
+    profile = TACTICS.get(cur, club_id)
+    return profile.attack_mult, profile.defense_mult
+
+
+# Attribute columns loaded for strength calculation, in this order
+STRENGTH_ATTRS = ("at_scoring", "at_speed", "at_passing", "at_dribbling",
+                  "at_defending", "at_goalkeeping", "at_selfcont")
+
+# Per-position weights over STRENGTH_ATTRS (scoring, speed, passing, dribbling, defending, goalkeeping, selfcont)
+# Attack: strikers/wingers contribute the most
+ATTACK_WEIGHTS = {
+    "ST": (2.0, 1.2, 0.4, 0.6, 0, 0, 0),
+    "CF": (2.0, 1.2, 0.4, 0.6, 0, 0, 0),
+    "FW": (2.0, 1.2, 0.4, 0.6, 0, 0, 0),
+    "LW": (1.4, 1.0, 0.7, 1.0, 0, 0, 0),
+    "RW": (1.4, 1.0, 0.7, 1.0, 0, 0, 0),
+    "CAM": (1.4, 1.0, 0.7, 1.0, 0, 0, 0),
+    "AM": (1.4, 1.0, 0.7, 1.0, 0, 0, 0),
+    "CM": (0.7, 0.6, 1.0, 0.8, 0, 0, 0),
+    "RM": (0.7, 0.6, 1.0, 0.8, 0, 0, 0),
+    "LM": (0.7, 0.6, 1.0, 0.8, 0, 0, 0),
+}
+ATTACK_DEFAULT = (0.3, 0.3, 0.5, 0, 0, 0, 0)  # defenders & GK rarely attack
+
+# Defense: GK + CBs dominate
+DEFENSE_WEIGHTS = {
+    "GK": (0, 0, 0, 0, 0.4, 2.2, 0.5),
+    "CB": (0, 0, 0, 0, 1.6, 0, 0.6),
+    "RB": (0, 0.4, 0, 0, 1.2, 0, 0.5),
+    "LB": (0, 0.4, 0, 0, 1.2, 0, 0.5),
+    "CDM": (0, 0.4, 0, 0, 1.2, 0, 0.5),
+}
+DEFENSE_DEFAULT = (0, 0, 0, 0, 0.5, 0, 0.3)  # midfielders/attackers contribute lightly
+
+NEUTRAL_STRENGTH = (1000, 1000)
+
+
+class TeamStrengthCache:
+    """
+    Attack/defense per club, computed in bulk with NumPy.
+
+    Each entry remembers the club_versions.squad_version() it was built from.
+    ensure_fresh() reloads all stale clubs with a single query, so a matchday
+    costs at most one strength query no matter how many fixtures are played.
+    """
+
+    def __init__(self):
+        self.entries = {}   # club_id -> (attack, defense)
+        self.versions = {}  # club_id -> squad version the entry was built from
+        self.epoch = None
+
+    def is_stale(self, club_id):
+        return self.versions.get(club_id) != club_versions.squad_version(club_id)
+
+    def ensure_fresh(self, cur, club_ids):
+        if self.epoch != club_versions.epoch():
+            self.load(cur)
+            return
+        stale = sorted({cid for cid in club_ids if self.is_stale(cid)})
+        if stale:
+            self.load(cur, stale)
+
+    def load(self, cur, club_ids=None):
+        """Recompute strengths for club_ids (None = every club) in one query."""
+        sql = f"""
+            SELECT p.club_id, {", ".join("pa." + a for a in STRENGTH_ATTRS)},
+                   p.primary_position AS position
+            FROM players_attr pa
+            JOIN players p ON pa.player_id = p.id
+            WHERE p.is_retired = 0 AND p.club_id IS NOT NULL
+        """
+        params = ()
+        if club_ids is None:
+            self.entries.clear()
+            self.versions.clear()
+            self.epoch = club_versions.epoch()
+        else:
+            sql += f" AND p.club_id IN ({','.join('?' * len(club_ids))})"
+            params = tuple(club_ids)
+        rows = cur.execute(sql, params).fetchall()
+
+        if club_ids is not None:
+            for cid in club_ids:
+                self.entries[cid] = NEUTRAL_STRENGTH
+                self.versions[cid] = club_versions.squad_version(cid)
+        if not rows:
+            return
+
+        clubs = np.array([r[0] for r in rows], dtype=np.int64)
+        attrs = np.array([r[1:-1] for r in rows], dtype=np.float64)
+        positions = [r[-1] for r in rows]
+        atk_w = np.array([ATTACK_WEIGHTS.get(p, ATTACK_DEFAULT) for p in positions], dtype=np.float64)
+        def_w = np.array([DEFENSE_WEIGHTS.get(p, DEFENSE_DEFAULT) for p in positions], dtype=np.float64)
+
+        uniq, idx = np.unique(clubs, return_inverse=True)
+        counts = np.bincount(idx)
+        attack = np.bincount(idx, weights=(attrs * atk_w).sum(axis=1)) / counts
+        defense = np.bincount(idx, weights=(attrs * def_w).sum(axis=1)) / counts
+
+        for cid, a, d in zip(uniq.tolist(), attack.tolist(), defense.tolist()):
+            self.entries[cid] = (a, d)
+            self.versions[cid] = club_versions.squad_version(cid)
+
+    def get(self, cur, club_id):
+        if self.epoch != club_versions.epoch() or self.is_stale(club_id):
+            self.ensure_fresh(cur, (club_id,))
+        return self.entries.get(club_id, NEUTRAL_STRENGTH)
+
+
+STRENGTH_CACHE = TeamStrengthCache()
 
 
 def team_strengths(cur, club_id):
@@ -215,57 +319,9 @@ def team_strengths(cur, club_id):
     Attack = heavily scoring + speed, with some passing/dribbling.
     Defense = defending + goalkeeping + discipline.
     Fame is applied later in the match simulation.
+    Served from STRENGTH_CACHE; see ATTACK_WEIGHTS / DEFENSE_WEIGHTS.
     """
-    cur.execute("""
-        SELECT
-          pa.at_scoring, pa.at_speed, pa.at_passing, pa.at_dribbling,
-          pa.at_defending, pa.at_goalkeeping, pa.at_selfcont,
-          COALESCE(
-            (SELECT pp.position
-             FROM players_positions pp
-             WHERE pp.player_id = p.id
-             ORDER BY pp.position
-             LIMIT 1),
-            p.position,
-            'CM'
-          ) AS position
-        FROM players_attr pa
-        JOIN players p ON pa.player_id = p.id
-        WHERE p.club_id = ? AND p.is_retired = 0
-        
-                
-
-    """, (club_id,))
-    rows = cur.fetchall()
-
-    if not rows:
-        return 1000, 1000  # fallback neutral
-
-    attack_vals, defense_vals = [], []
-    for scoring, speed, passing, dribbling, defending, goalkeeping, selfcont, pos in rows:
-        # Attack: strikers/wingers contribute the most
-        if pos in ("ST", "CF", "FW"):
-            attack_vals.append(scoring * 2.0 + speed * 1.2 + dribbling * 0.6 + passing * 0.4)
-        elif pos in ("LW", "RW", "CAM", "AM"):
-            attack_vals.append(scoring * 1.4 + speed * 1.0 + dribbling * 1.0 + passing * 0.7)
-        elif pos in ("CM", "RM", "LM"):
-            attack_vals.append(scoring * 0.7 + speed * 0.6 + dribbling * 0.8 + passing * 1.0)
-        else:  # defenders & GK rarely attack
-            attack_vals.append(scoring * 0.3 + speed * 0.3 + passing * 0.5)
-
-        # Defense: GK + CBs dominate
-        if pos == "GK":
-            defense_vals.append(goalkeeping * 2.2 + defending * 0.4 + selfcont * 0.5)
-        elif pos in ("CB",):
-            defense_vals.append(defending * 1.6 + selfcont * 0.6)
-        elif pos in ("RB", "LB", "CDM"):
-            defense_vals.append(defending * 1.2 + speed * 0.4 + selfcont * 0.5)
-        else:  # midfielders/attackers contribute lightly
-            defense_vals.append(defending * 0.5 + selfcont * 0.3)
-
-    attack = sum(attack_vals) / len(rows)
-    defense = sum(defense_vals) / len(rows)
-    return attack, defense
+    return STRENGTH_CACHE.get(cur, club_id)
 
 def compute_comp_strength_baselines(conn, competition_id):
     cur = conn.cursor()
@@ -284,24 +340,33 @@ def compute_comp_strength_baselines(conn, competition_id):
         atk_vals.append(a); def_vals.append(d)
     return sum(atk_vals)/len(atk_vals), sum(def_vals)/len(def_vals)
 
-def compute_league_strength_baselines(conn):
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM clubs WHERE league_id = 1")
-    club_ids = [r[0] for r in cur.fetchall()]
-    if not club_ids:
-        return 1500.0, 1500.0
-    atk_vals, def_vals = [], []
-    for cid in club_ids:
-        a, d = team_strengths(cur, cid)
-        atk_vals.append(a); def_vals.append(d)
-    return sum(atk_vals)/len(atk_vals), sum(def_vals)/len(def_vals)
+def record_league_result(cur, fixture_id, home_id, away_id, home_goals, away_goals):
+    """Add a played league fixture to both clubs' standings rows (same transaction as the result)."""
+    rows = []
+    for club_id, gf, ga in ((home_id, home_goals, away_goals), (away_id, away_goals, home_goals)):
+        won, drawn, lost = int(gf > ga), int(gf == ga), int(gf < ga)
+        rows.append((club_id, won, drawn, lost, gf, ga, 3 * won + drawn, fixture_id))
+    cur.executemany("""
+        INSERT INTO standings (season, competition_id, club_id, played, won, drawn, lost,
+                               goals_for, goals_against, points)
+        SELECT season, competition_id, ?, 1, ?, ?, ?, ?, ?, ?
+        FROM fixtures WHERE id = ?
+        ON CONFLICT (competition_id, season, club_id) DO UPDATE SET
+            played = played + 1,
+            won = won + excluded.won,
+            drawn = drawn + excluded.drawn,
+            lost = lost + excluded.lost,
+            goals_for = goals_for + excluded.goals_for,
+            goals_against = goals_against + excluded.goals_against,
+            points = points + excluded.points
+    """, rows)
 
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
 
 
-def assign_realistic_minutes(home_players, away_players):
+def assign_realistic_minutes(home_players, away_players, rng=random):
     """
     Assign realistic minutes for one match, synchronized for both teams:
       - Both teams share same full match duration (90–94)
@@ -315,7 +380,7 @@ def assign_realistic_minutes(home_players, away_players):
         return {}, {}
 
     # --- Common full match duration ---
-    full_match = random.randint(90, 94)
+    full_match = rng.randint(90, 94)
 
     def assign_team_minutes(players):
         if len(players) < 11:
@@ -332,13 +397,13 @@ def assign_realistic_minutes(home_players, away_players):
 
         # --- Select up to 3 outfield subs ---
         valid_bench = [p for p in bench if p[1] != "GK"]
-        subs = random.sample(valid_bench, k=min(3, len(valid_bench)))
+        subs = rng.sample(valid_bench, k=min(3, len(valid_bench)))
         sub_candidates = [p for p in starters if p[1] != "GK"]
-        replaced = random.sample(sub_candidates, k=len(subs))
+        replaced = rng.sample(sub_candidates, k=len(subs))
 
         # --- Apply substitutions ---
         for (sub_pid, *_), (out_pid, *__) in zip(subs, replaced):
-            sub_minutes = random.randint(10, 25)
+            sub_minutes = rng.randint(10, 25)
             minutes[out_pid] = full_match - sub_minutes
             minutes[sub_pid] = sub_minutes
 
@@ -371,66 +436,20 @@ def assign_realistic_minutes(home_players, away_players):
 
 
 
-def get_realistic_squad(cur, club_id):
+def get_realistic_squad(cur, club_id, rng=random):
     """
     Returns up to 22 players (11 starters + bench) based on the manager's preferred formation.
     Example formations supported: "4-3-3", "4-2-3-1", "3-5-2", "5-3-2", etc.
     """
-    # 1️⃣ Get manager's preferred formation
-    cur.execute("""
-        SELECT preferred_formation FROM staff
-        WHERE club_id = ? AND role = 'Manager' AND is_retired = 0
-        ORDER BY fame DESC LIMIT 1
-    """, (club_id,))
-    row = cur.fetchone()
-    formation = row[0] if row and row[0] else "4-3-3"
-
-    # 2️⃣ Parse formation into defender–midfielder–forward numbers
-    try:
-        parts = [int(x) for x in formation.replace(" ", "").split("-")]
-        if len(parts) == 2:  # e.g. "4-4"
-            defs, mids, fwds = parts[0], parts[1], 2
-        elif len(parts) == 3:  # e.g. "4-3-3"
-            defs, mids, fwds = parts
-        elif len(parts) == 4:  # e.g. "4-2-3-1"
-            defs, mids, fwds = parts[0], parts[1] + parts[2], parts[3]
-        else:
-            defs, mids, fwds = 4, 3, 3
-    except Exception:
-        defs, mids, fwds = 4, 3, 3  # fallback
-
-    total = defs + mids + fwds
-    if total != 10:  # GK + 10 outfielders
-        # Normalize proportions to 10
-        scale = 10 / total
-        defs = round(defs * scale)
-        mids = round(mids * scale)
-        fwds = 10 - defs - mids
-
-    # 3️⃣ Fetch players
-    cur.execute("""
-        SELECT
-          p.id,
-          COALESCE(
-            (SELECT pp.position
-             FROM players_positions pp
-             WHERE pp.player_id = p.id
-             ORDER BY pp.position
-             LIMIT 1),
-            p.position,
-            'CM'
-          ) AS position,
-          pa.at_defending, pa.at_passing, pa.at_scoring,
-          pa.at_goalkeeping, pa.at_speed, pa.at_curr_ability
-        FROM players p
-        JOIN players_attr pa ON pa.player_id = p.id
-        WHERE p.club_id = ? AND p.is_retired = 0
-        ORDER BY pa.at_curr_ability DESC
+    return build_matchday_squad(get_manager_formation(cur, club_id), get_squad_match_rows(cur, club_id), rng)
 
 
+def build_matchday_squad(formation, all_players, rng=random):
+    """get_realistic_squad() on already loaded squad match rows (best ability first)."""
+    # 1️⃣ + 2️⃣ Manager's preferred formation as defender–midfielder–forward numbers
+    defs, mids, fwds = formation_lines(formation)
 
-    """, (club_id,))
-    all_players = cur.fetchall()
+    # 3️⃣ Players
     if not all_players:
         return []
 
@@ -460,26 +479,30 @@ def get_realistic_squad(cur, club_id):
         bench.append(gks[1])
     # add mix of roles
     pool_for_bench = [p for p in remaining if p not in bench]
-    bench += random.sample(pool_for_bench, k=min(9, len(pool_for_bench)))
+    bench += rng.sample(pool_for_bench, k=min(9, len(pool_for_bench)))
 
     return starters + bench
 
 
-def draw_goals(lmbda):
+def sample_goals(lambdas, rng, phi=0.0):
     """
-    Stable Poisson draw with soft bias to prevent 6–0 or 7–1 blowouts.
+    Goals for a whole batch of expected-goal rates in one go.
+
+    `lambdas` is any array of rates (clamped to 0.05–1.8), `rng` a
+    numpy.random.Generator. Draws are Poisson, or Negative Binomial (a Gamma
+    mixed over the rate, var = λ + φλ²) when phi > 0. Soft bias against
+    6–0 or 7–1 blowouts: anything above 4 becomes 4 with 60% chance, 5 otherwise.
     """
-    lmbda = max(0.05, min(lmbda, 1.8))
-    probs = [math.exp(-lmbda) * (lmbda ** k) / math.factorial(k) for k in range(8)]
-    probs[-1] = max(0.0, 1.0 - sum(probs[:-1]))
-    goals = random.choices(range(8), weights=probs, k=1)[0]
+    lam = np.clip(np.asarray(lambdas, dtype=np.float64), 0.05, 1.8)
+    if phi > 0:
+        shape = 1.0 / phi
+        lam = rng.gamma(shape, lam / shape)
+    goals = rng.poisson(lam)
 
     # Softly cap extremes
-    if goals > 4:
-        if random.random() < 0.6:
-            goals = 4
-        elif goals > 5:
-            goals = 5
+    high = goals > 4
+    if high.any():
+        goals[high] = np.where(rng.random(int(high.sum())) < 0.6, 4, 5)
     return goals
 
 
@@ -502,510 +525,510 @@ def get_playing_ranges(minutes_dict):
     return playing_ranges
 
 
+def pick_unique_minute(start, end, used, lo_minute, hi_minute, rng=random):
+    """Pick a unique minute within [start,end]; if busy, search nearest free minute.
+       If none free in the window (very unlikely), search the whole match range."""
+    s = max(lo_minute, int(math.floor(start)))
+    e = min(hi_minute, int(math.ceil(end)))
+
+    if s > e:  # fallback if window is inverted/empty
+        s, e = lo_minute, hi_minute
+
+    # First try a random minute in the player's valid window
+    candidate = rng.randint(s, e)
+    if candidate not in used:
+        return candidate
+
+    # Then search outward from the candidate within [s,e]
+    left = candidate - 1
+    right = candidate + 1
+    while left >= s or right <= e:
+        if left >= s and left not in used:
+            return left
+        if right <= e and right not in used:
+            return right
+        left -= 1
+        right += 1
+
+    # As a last resort (extremely rare), search whole match range
+    for minute in range(lo_minute, hi_minute + 1):
+        if minute not in used:
+            return minute
+
+    # Absolute fallback (should never hit): allow reused minute
+    return candidate
+
+
+def stat_from_attr(attr, factor, minutes_played, rng=random, spread=0.2):
+    """Scales production by minutes played and ability."""
+    if minutes_played <= 0:
+        return 0
+    base = attr / 1000.0 * factor * (minutes_played / 90.0)
+    return max(0, int(base * rng.uniform(1 - spread, 1 + spread)))
+
+
+def player_match_stats(row, fixture_id, club_id, minutes_played, goals, rng=random):
+    """players_stats row for one squad match row, or None for players who did not play."""
+    pid, pos, defending, passing, scoring, goalkeeping, speed, ability = row
+    if minutes_played == 0:
+        return None  # skip creating a row for DNPs (or keep it if you want 0-min rows)
+
+    if pos in ("GK",):
+        tackles_a = stat_from_attr(defending, 2, minutes_played, rng)
+        tackles_c = int(tackles_a * rng.uniform(0.7, 0.95))
+        passes_a = stat_from_attr(passing, 25, minutes_played, rng)
+        passes_c = int(passes_a * rng.uniform(0.85, 0.99))
+        shoots_a = shoots_t = 0
+    elif pos in ("CB", "RB", "LB", "CDM"):
+        tackles_a = stat_from_attr(defending, 6, minutes_played, rng)
+        tackles_c = int(tackles_a * rng.uniform(0.6, 0.9))
+        passes_a = stat_from_attr(passing, 35, minutes_played, rng)
+        passes_c = int(passes_a * rng.uniform(0.85, 0.99))
+        shoots_a = stat_from_attr(scoring, 1, minutes_played, rng)
+        shoots_t = int(shoots_a * rng.uniform(0.4, 0.7))
+    elif pos in ("CM", "RM", "LM", "CAM"):
+        tackles_a = stat_from_attr(defending, 4, minutes_played, rng)
+        tackles_c = int(tackles_a * rng.uniform(0.6, 0.9))
+        passes_a = stat_from_attr(passing, 60, minutes_played, rng)
+        passes_c = int(passes_a * rng.uniform(0.85, 1.0))
+        shoots_a = stat_from_attr(scoring, 3, minutes_played, rng)
+        shoots_t = int(shoots_a * rng.uniform(0.4, 0.7))
+    else:
+        tackles_a = stat_from_attr(defending, 2, minutes_played, rng)
+        tackles_c = int(tackles_a * rng.uniform(0.5, 0.8))
+        passes_a = stat_from_attr(passing, 30, minutes_played, rng)
+        passes_c = int(passes_a * rng.uniform(0.8, 0.95))
+        shoots_a = stat_from_attr(scoring, 5, minutes_played, rng)
+        shoots_t = int(shoots_a * rng.uniform(0.4, 0.7))
+
+    yellow = 1 if rng.random() < (0.06 if pos in ("CB", "CDM", "RB", "LB") else 0.02) else 0
+    red = 1 if yellow and rng.random() < 0.1 else 0
+
+    # 🧠 Ensure scorers always have at least one shot and one on target
+    if goals > 0:
+        shoots_a = max(shoots_a, goals)
+        shoots_t = max(shoots_t, goals)
+
+    return (
+        pid, fixture_id, club_id, minutes_played,
+        tackles_a, tackles_c,
+        passes_a, passes_c,
+        shoots_a, shoots_t,
+        goals, yellow, red
+    )
+
+
+def fame_effect(fame):
+    return clamp(1.0 + (fame - 1000) / 12000.0, 0.94, 1.06)
+
+
+def base_expected_goals(attack, opp_defense, fame_mult, form_mult, home_side, atk_mean, def_mean):
+    """expected_goals_local() without its ±3% noise and clamp; attack..form_mult may be numpy arrays."""
+    base = 1.05 if home_side else 0.95
+    atk_n = attack / max(1.0, atk_mean)
+    def_n = opp_defense / max(1.0, def_mean)
+    ratio = (atk_n ** 1.0) / (def_n ** 1.0)
+    fame_adj = 1.0 + (fame_mult - 1.0) * 0.3
+    form_adj = 1.0 + (form_mult - 1.0) * 0.25
+    lam = base * ratio * fame_adj * form_adj
+    if home_side:
+        lam *= 1.05
+    return lam
+
+
+def expected_goals_local(attack, opp_defense, fame_mult, form_mult, home_side, atk_mean, def_mean, rng=random):
+    lam = base_expected_goals(attack, opp_defense, fame_mult, form_mult, home_side, atk_mean, def_mean)
+    lam *= rng.uniform(0.97, 1.03)
+    return clamp(lam, 0.3, 1.8)
+
+
+# -----------------------------
+# Matchday: snapshot -> pure per-fixture simulation -> writes
+# -----------------------------
+# Processes used by simulate_fixtures_for_day when no `workers` is given
+# (0/1 = simulate in this process).
+MATCH_WORKERS = 0
+_MATCH_POOL = None
+_MATCH_POOL_SIZE = 0
+
+
+@dataclass(slots=True)
+class ClubSnapshot:
+    """What the match engine reads about a club, taken before the day's first fixture."""
+    club_id: int
+    attack: float          # formation multipliers already applied
+    defense: float
+    fame: int
+    form: float
+    formation: Optional[str]
+    squad: list            # get_squad_match_rows(), best ability first
+
+
+@dataclass(slots=True)
+class FixtureResult:
+    fixture_id: int
+    home_goals: int
+    away_goals: int
+    pens: tuple            # (home, away) shoot-out score used if a cup tie ends level
+    scorers: list          # (player_id, fixture_id, minute), sorted by minute
+    player_stats: list     # players_stats rows
+
+
+def snapshot_club(cur, club_id):
+    attack, defense = team_strengths(cur, club_id)
+    profile = TACTICS.get(cur, club_id)
+    return ClubSnapshot(club_id, attack * profile.attack_mult, defense * profile.defense_mult,
+                        get_club_fame(cur, club_id), get_team_form(cur, club_id), profile.formation,
+                        get_squad_match_rows(cur, club_id))
+
+
+def fixture_seed(day_seed, fixture_id):
+    """Seed of one fixture's random.Random: same day seed and fixture -> same match."""
+    return f"{day_seed}:{fixture_id}"
+
+
+def fixture_lambdas(home, away, atk_mean, def_mean, rng=random):
+    """(home, away) expected goals for a fixture between two ClubSnapshots."""
+    return (
+        expected_goals_local(home.attack, away.defense, fame_effect(home.fame), home.form, True,
+                             atk_mean, def_mean, rng),
+        expected_goals_local(away.attack, home.defense, fame_effect(away.fame), away.form, False,
+                             atk_mean, def_mean, rng),
+    )
+
+
+def simulate_fixture(fixture_id, home, away, home_goals, away_goals, seed):
+    """
+    Play out one fixture whose score is already drawn (see sample_goals)
+    from ClubSnapshots without touching the database. Everything random comes
+    from random.Random(seed), so the result only depends on the inputs (and
+    can be computed in any process).
+    """
+    rng = random.Random(seed)
+
+    pens = (rng.randint(1, 5), rng.randint(1, 5))
+
+    # --- Players involved ---
+    home_players = build_matchday_squad(home.formation, home.squad, rng)
+    away_players = build_matchday_squad(away.formation, away.squad, rng)
+    home_minutes, away_minutes = assign_realistic_minutes(home_players, away_players, rng)
+
+    # ✅ Scorers come from the players who actually played
+    home_scorers = pick_scorers([p for p in home_players if home_minutes.get(p[0], 0) > 0],
+                                home_goals, home.fame, rng)
+    away_scorers = pick_scorers([p for p in away_players if away_minutes.get(p[0], 0) > 0],
+                                away_goals, away.fame, rng)
+
+    # ✅ Goal minutes — unique, inside each scorer's time on the pitch
+    scorer_minutes = []
+    if home_scorers or away_scorers:
+        ranges = {**get_playing_ranges(home_minutes), **get_playing_ranges(away_minutes)}
+        match_len = max(max(home_minutes.values(), default=90), max(away_minutes.values(), default=90))
+        lo_minute, hi_minute = 1, min(94, match_len)
+        used_minutes = set()
+        for pid in home_scorers + away_scorers:
+            start, end = ranges.get(pid, (lo_minute, hi_minute))
+            minute = pick_unique_minute(start, end, used_minutes, lo_minute, hi_minute, rng)
+            used_minutes.add(minute)
+            scorer_minutes.append((pid, fixture_id, minute))
+        # Sort by time for consistency
+        scorer_minutes.sort(key=lambda x: x[2])
+
+    goal_map = {}
+    for pid in home_scorers + away_scorers:
+        goal_map[pid] = goal_map.get(pid, 0) + 1
+
+    # --- PLAYER MATCH STATS (realistic minutes & participation) ---
+    player_stats = []
+    for club_id, players, minutes in ((home.club_id, home_players, home_minutes),
+                                      (away.club_id, away_players, away_minutes)):
+        for row in players:
+            record = player_match_stats(row, fixture_id, club_id, minutes.get(row[0], 0),
+                                        goal_map.get(row[0], 0), rng)
+            if record:
+                player_stats.append(record)
 
-def simulate_fixtures_for_day(conn, day):
-    global LEAGUE_ATK_MEAN, LEAGUE_DEF_MEAN
-    if LEAGUE_ATK_MEAN is None or LEAGUE_DEF_MEAN is None:
-        LEAGUE_ATK_MEAN, LEAGUE_DEF_MEAN = compute_league_strength_baselines(conn)
+    return FixtureResult(fixture_id, home_goals, away_goals, pens, scorer_minutes, player_stats)
 
-    cur = conn.cursor()
-    cur.execute("""
-            SELECT f.id, f.home_club_id, hc.name, f.away_club_id, ac.name, f.competition_id, comp.name, comp.is_cup, f.competition_round
-            FROM fixtures f
-            JOIN clubs hc ON hc.id = f.home_club_id
-            JOIN clubs ac ON ac.id = f.away_club_id
-            JOIN competitions comp ON comp.id = f.competition_id
-            WHERE f.fixture_date = ? AND f.played = 0
-    """, (day,))
-    fixtures = cur.fetchall()
-    if not fixtures:
-        print(f"⚠️ No fixtures found for {day}")
-        return
 
-    def fame_effect(fame):
-        return clamp(1.0 + (fame - 1000) / 12000.0, 0.94, 1.06)
-    
-    
-    
-    def expected_goals_local(attack, opp_defense, fame_mult, form_mult, home_side, atk_mean, def_mean):
-        base = 1.05 if home_side else 0.95
-        atk_n = attack / max(1.0, atk_mean)
-        def_n = opp_defense / max(1.0, def_mean)
-        ratio = (atk_n ** 1.0) / (def_n ** 1.0)
-        fame_adj = 1.0 + (fame_mult - 1.0) * 0.3
-        form_adj = 1.0 + (form_mult - 1.0) * 0.25
-        lam = base * ratio * fame_adj * form_adj
-        if home_side:
-            lam *= 1.05
-        lam *= random.uniform(0.97, 1.03)
-        return clamp(lam, 0.3, 1.8)
-    
-        
-
-
-    def poisson_draw(lmbda, kmax=6):
-        lmbda = max(0.05, lmbda)
-        probs = [math.exp(-lmbda) * (lmbda ** k) / math.factorial(k) for k in range(kmax)]
-        probs[-1] = max(0.0, 1.0 - sum(probs[:-1]))
-        return random.choices(range(kmax), weights=probs, k=1)[0]
-    
-    
-    def negbinom_poisson(lmbda, kmax=8, phi=0.25):
-        """
-        Draw goals from a Negative Binomial by mixing a Gamma over the Poisson rate:
-        - lmbda: mean goals
-        - phi: overdispersion (0 -> Poisson). 0.2–0.4 is a nice realistic band.
-        """
-        lmbda = max(0.03, lmbda)
-        # Gamma(shape, scale) with mean=λ, var=λ + φλ^2
-        shape = 1.0 / max(1e-6, phi)
-        scale = lmbda / shape
-        lam_ = random.gammavariate(shape, scale)
-        # Poisson draw with soft cap probability mass
-        probs = [math.exp(-lam_) * (lam_ ** k) / math.factorial(k) for k in range(kmax)]
-        probs[-1] = max(0.0, 1.0 - sum(probs[:-1]))
-        return random.choices(range(kmax), weights=probs, k=1)[0]
+def simulate_competition(jobs):
+    """Worker entry point: [(fixture_id, home, away, home_goals, away_goals, seed)] -> [FixtureResult]."""
+    return [simulate_fixture(*job) for job in jobs]
 
 
-    # Group fixtures by competition to compute baselines once per comp per day
-    by_comp = {}
-    for row in fixtures:
-        _fid, _h, _hn, _a, _an, comp_id, *_ = row
-        by_comp.setdefault(comp_id, []).append(row)
+def _match_pool(workers):
+    from concurrent.futures import ProcessPoolExecutor
 
-    baselines = {}
-    for comp_id in by_comp:
-        baselines[comp_id] = compute_comp_strength_baselines(conn, comp_id)
+    global _MATCH_POOL, _MATCH_POOL_SIZE
+    if _MATCH_POOL is None or _MATCH_POOL_SIZE != workers:
+        shutdown_match_pool()
+        _MATCH_POOL = ProcessPoolExecutor(max_workers=workers)
+        _MATCH_POOL_SIZE = workers
+    return _MATCH_POOL
 
 
-    for fixture_id, home_id, home_name, away_id, away_name, league_id, league_name, is_cup, competition_round in fixtures:
-        
-        scorers, names = [], []  # ✅ initialize before any conditional use
-        
-        home_attack, home_defense = team_strengths(cur, home_id)
-        away_attack, away_defense = team_strengths(cur, away_id)
-        
-        # ⚙️ Formation tactical effect
-        home_atk_mult, home_def_mult = formation_modifiers(cur, home_id)
-        away_atk_mult, away_def_mult = formation_modifiers(cur, away_id)
-        
-        home_attack *= home_atk_mult
-        home_defense *= home_def_mult
-        away_attack *= away_atk_mult
-        away_defense *= away_def_mult
-
-        home_fm = fame_effect(get_club_fame(cur, home_id))
-        away_fm = fame_effect(get_club_fame(cur, away_id))
-        home_form = get_team_form(cur, home_id)
-        away_form = get_team_form(cur, away_id)
-
-
-        # after computing baselines = {comp_id: (atk_mean, def_mean)}
-        atk_mean, def_mean = baselines.get(league_id, (LEAGUE_ATK_MEAN or 1500.0, LEAGUE_DEF_MEAN or 1500.0))
-        
-        home_lambda = expected_goals_local(home_attack, away_defense, home_fm, home_form, True,  atk_mean, def_mean)
-        away_lambda = expected_goals_local(away_attack, home_defense, away_fm, away_form, False, atk_mean, def_mean)
-
-
-        home_goals = draw_goals(home_lambda)
-        away_goals = draw_goals(away_lambda)
-        
-        
-        # --- Players involved ---
-        cur.execute("SELECT id FROM players WHERE club_id = ? AND is_retired = 0", (home_id,))
-        home_players = [r[0] for r in cur.fetchall()]
-
-        cur.execute("SELECT id FROM players WHERE club_id = ? AND is_retired = 0", (away_id,))
-        away_players = [r[0] for r in cur.fetchall()]
-        
-        
-        # Effect on fame for players and staff after win/lose
-        if home_goals > away_goals:
-            update_fame_after_match(cur, home_id, "win")
-            update_fame_after_match(cur, away_id, "loss")
-            adjust_board_satisfaction(cur, home_id, "win")
-            adjust_board_satisfaction(cur, away_id, "loss")
-        elif home_goals < away_goals:
-            update_fame_after_match(cur, home_id, "loss")
-            update_fame_after_match(cur, away_id, "win")
-            adjust_board_satisfaction(cur, home_id, "loss")
-            adjust_board_satisfaction(cur, away_id, "win")
-        else:
-            update_fame_after_match(cur, home_id, "draw")
-            update_fame_after_match(cur, away_id, "draw")
-            adjust_board_satisfaction(cur, home_id, "draw")
-            adjust_board_satisfaction(cur, away_id, "draw")
+def shutdown_match_pool():
+    """Stop the worker processes (started lazily by the first parallel matchday)."""
+    global _MATCH_POOL, _MATCH_POOL_SIZE
+    if _MATCH_POOL is not None:
+        _MATCH_POOL.shutdown()
+        _MATCH_POOL = None
+        _MATCH_POOL_SIZE = 0
 
 
+atexit.register(shutdown_match_pool)
 
 
+def run_match_jobs(batches, workers):
+    """Simulate each batch (one per competition), in worker processes when workers > 1."""
+    if workers and workers > 1 and len(batches) > 1:
+        return [r for batch in _match_pool(workers).map(simulate_competition, batches) for r in batch]
+    return [r for batch in batches for r in simulate_competition(batch)]
 
 
-        cur.execute("""
-            SELECT count(1)
-            FROM clubs_competition
-            WHERE competition_id = ? and is_active
-        """, (league_id,))
-        row = cur.fetchone()
-        total_clubs = row[0] if row else 0
-
-
-        if total_clubs==8:
-            round_name="Quarter Finals"
-        elif total_clubs==4:
-            round_name="Semifinals"
-        elif total_clubs==2:
-            round_name="FINAL"
-        else:
-            round_name=f"Round {competition_round}"
-
+def apply_fixture_result(cur, fixture, result, fame_deltas):
+    """Write one FixtureResult: score, cup tie / standings, fame, board, scorers and player stats."""
+    fixture_id, home_id, home_name, away_id, away_name, league_id, league_name, is_cup, competition_round = fixture
+    home_goals, away_goals = result.home_goals, result.away_goals
 
-        if is_cup:
+    # Effect on fame for players and staff after win/lose
+    if home_goals > away_goals:
+        update_fame_after_match(cur, home_id, "win", pending=fame_deltas)
+        update_fame_after_match(cur, away_id, "loss", pending=fame_deltas)
+        adjust_board_satisfaction(cur, home_id, "win")
+        adjust_board_satisfaction(cur, away_id, "loss")
+    elif home_goals < away_goals:
+        update_fame_after_match(cur, home_id, "loss", pending=fame_deltas)
+        update_fame_after_match(cur, away_id, "win", pending=fame_deltas)
+        adjust_board_satisfaction(cur, home_id, "loss")
+        adjust_board_satisfaction(cur, away_id, "win")
+    else:
+        update_fame_after_match(cur, home_id, "draw", pending=fame_deltas)
+        update_fame_after_match(cur, away_id, "draw", pending=fame_deltas)
+        adjust_board_satisfaction(cur, home_id, "draw")
+        adjust_board_satisfaction(cur, away_id, "draw")
 
-            cur.execute("UPDATE fixtures SET home_goals=?, away_goals=?, played=1 WHERE id=?",
-                    (home_goals, away_goals, fixture_id))
+    if is_cup:
+        round_name = f"Round {competition_round}"
+        if CUP_DEBUGGING:
+            cur.execute("""
+                SELECT count(1)
+                FROM clubs_competition
+                WHERE competition_id = ? and is_active
+            """, (league_id,))
+            row = cur.fetchone()
+            total_clubs = row[0] if row else 0
+            if total_clubs == 8:
+                round_name = "Quarter Finals"
+            elif total_clubs == 4:
+                round_name = "Semifinals"
+            elif total_clubs == 2:
+                round_name = "FINAL"
+
+        cur.execute("UPDATE fixtures SET home_goals=?, away_goals=?, played=1 WHERE id=?",
+                (home_goals, away_goals, fixture_id))
+
+        rand1, rand2 = result.pens
+        cur.execute("""
+            SELECT team1_id, team2_id, goals_team1, goals_team2,
+                   matches_played, total_matches
+            FROM (
+                SELECT
+                    CASE WHEN home_club_id < away_club_id THEN home_club_id ELSE away_club_id END AS team1_id,
+                    CASE WHEN home_club_id < away_club_id THEN away_club_id ELSE home_club_id END AS team2_id,
+                    SUM(CASE WHEN home_club_id < away_club_id THEN home_goals ELSE away_goals END) AS goals_team1,
+                    SUM(CASE WHEN home_club_id < away_club_id THEN away_goals ELSE home_goals END) AS goals_team2,
+                    SUM(CASE WHEN played = 1 THEN 1 ELSE 0 END) AS matches_played,
+                    COUNT(1) AS total_matches
+                FROM fixtures
+                WHERE competition_id = ?
+                  AND competition_round = ?
+                  AND (home_club_id = ? OR away_club_id = ?)
+                GROUP BY team1_id, team2_id
+                ORDER BY team1_id
+            )
+        """, (league_id, competition_round,home_id,home_id,))
+        cup_both_legs = cur.fetchall()
+        for team1_id, team2_id, goals_team1, goals_team2, matches_played, total_matches in cup_both_legs:
 
+            if matches_played == 1 and total_matches == 2:
+                if CUP_DEBUGGING:
+                    print(f"⚽ [{league_name}] - {round_name} - First Leg: {home_name} {home_goals} - {away_goals} {away_name}")
+            elif matches_played == 2 and total_matches == 2:
 
-            cur.execute("""
-                SELECT team1_id, team2_id, goals_team1, goals_team2,
-                       (ABS(RANDOM()) % 5) + 1 AS rand1,
-                       (ABS(RANDOM()) % 5) + 1 AS rand2,
-                       matches_played, total_matches
-                FROM (
-                    SELECT
-                        CASE WHEN home_club_id < away_club_id THEN home_club_id ELSE away_club_id END AS team1_id,
-                        CASE WHEN home_club_id < away_club_id THEN away_club_id ELSE home_club_id END AS team2_id,
-                        SUM(CASE WHEN home_club_id < away_club_id THEN home_goals ELSE away_goals END) AS goals_team1,
-                        SUM(CASE WHEN home_club_id < away_club_id THEN away_goals ELSE home_goals END) AS goals_team2,
-                        SUM(CASE WHEN played = 1 THEN 1 ELSE 0 END) AS matches_played,
-                        COUNT(1) AS total_matches
-                    FROM fixtures
-                    WHERE competition_id = ?
-                      AND competition_round = ?
-                      AND (home_club_id = ? OR away_club_id = ?)
-                    GROUP BY team1_id, team2_id
-                    ORDER BY team1_id
-                )
-            """, (league_id, competition_round,home_id,home_id,))
-            cup_both_legs = cur.fetchall()
-            for team1_id, team2_id, goals_team1, goals_team2, rand1, rand2, matches_played, total_matches in cup_both_legs:
-                #print(team1_id, team2_id, goals_team1, goals_team2, rand1, rand2, matches_played, total_matches)
-
-                if matches_played == 1 and total_matches == 2:
+                if goals_team1 > goals_team2:
                     if CUP_DEBUGGING:
-                        print(f"⚽ [{league_name}] - {round_name} - First Leg: {home_name} {home_goals} - {away_goals} {away_name}")
-                elif matches_played == 2 and total_matches == 2:
+                        print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
+                        print(f"⚽ {home_name} advances to the next stage")
+                elif goals_team1 == goals_team2:
+
 
-                    if goals_team1 > goals_team2:
+                    if rand1 > rand2:
                         if CUP_DEBUGGING:
                             print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
-                            print(f"⚽ {home_name} advances to the next stage")
-                    elif goals_team1 == goals_team2:
-
-
-                        if rand1 > rand2:
-                            if CUP_DEBUGGING:
-                                print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
-                                print(f"⚽ {home_name} advances to the next stage by penalties ({rand1} - {rand1-1})")
-                            cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
-                                    (rand1, rand1-1, fixture_id))
-                        else:
-                            if CUP_DEBUGGING:
-                                print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
-                                print(f"⚽ {away_name} advances to the next stage by penalties ({rand2} - {rand2-1})")
-                            cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
-                                    (rand2-1, rand2, fixture_id))
+                            print(f"⚽ {home_name} advances to the next stage by penalties ({rand1} - {rand1-1})")
+                        cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
+                                (rand1, rand1-1, fixture_id))
                     else:
                         if CUP_DEBUGGING:
                             print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
-                            print(f"⚽ {away_name} advances to the next stage")
-
+                            print(f"⚽ {away_name} advances to the next stage by penalties ({rand2} - {rand2-1})")
+                        cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
+                                (rand2-1, rand2, fixture_id))
                 else:
                     if CUP_DEBUGGING:
-                        print(f"⚽ [{league_name}] - {round_name}: {home_name} {home_goals} - {away_goals} {away_name}")
-                    if home_goals > away_goals:
-                        if CUP_DEBUGGING:
-                            print(f"⚽ {home_name} is the champion of the {league_name}!! Congratulations!!")
-                    elif home_goals == away_goals:
+                        print(f"⚽ [{league_name}] - {round_name} - Second Leg: {home_name} {home_goals}({goals_team1}) - {away_goals}({goals_team2}) {away_name}")
+                        print(f"⚽ {away_name} advances to the next stage")
 
-                        if CUP_DEBUGGING:
-                            print(f"⚽ {home_name} is the champion of the {league_name}!! Congratulations!!")
-
-                        if rand1 > rand2:
-                            if CUP_DEBUGGING:
-                                print(f"⚽ [{league_name}] - {round_name}: {home_goals}({rand1}) - {away_goals}({rand1-1}) {away_name}")
-                                print(f"⚽ {home_name} is the champion of the {league_name} by penalties ({rand1} - {rand1-1})!! Congratulations!!")
-                            cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
-                                    (rand1, rand1-1, fixture_id))
-                        else:
-                            if CUP_DEBUGGING:
-                                print(f"⚽ [{league_name}] - {round_name}: {home_goals}({rand2-1}) - {away_goals}({rand2}) {away_name}")
-                                print(f"⚽ {away_name} is the champion of the {league_name} by penalties ({rand2} - {rand2-1})!! Congratulations!!")
-                            cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
-                                    (rand2-1, rand2, fixture_id))
+            else:
+                if CUP_DEBUGGING:
+                    print(f"⚽ [{league_name}] - {round_name}: {home_name} {home_goals} - {away_goals} {away_name}")
+                if home_goals > away_goals:
+                    if CUP_DEBUGGING:
+                        print(f"⚽ {home_name} is the champion of the {league_name}!! Congratulations!!")
+                elif home_goals == away_goals:
 
+                    if CUP_DEBUGGING:
+                        print(f"⚽ {home_name} is the champion of the {league_name}!! Congratulations!!")
 
+                    if rand1 > rand2:
+                        if CUP_DEBUGGING:
+                            print(f"⚽ [{league_name}] - {round_name}: {home_goals}({rand1}) - {away_goals}({rand1-1}) {away_name}")
+                            print(f"⚽ {home_name} is the champion of the {league_name} by penalties ({rand1} - {rand1-1})!! Congratulations!!")
+                        cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
+                                (rand1, rand1-1, fixture_id))
                     else:
                         if CUP_DEBUGGING:
-                            print(f"⚽ {away_name} is the champion of the {league_name}!! Congratulations!!")
-
+                            print(f"⚽ [{league_name}] - {round_name}: {home_goals}({rand2-1}) - {away_goals}({rand2}) {away_name}")
+                            print(f"⚽ {away_name} is the champion of the {league_name} by penalties ({rand2} - {rand2-1})!! Congratulations!!")
+                        cur.execute("UPDATE fixtures SET home_goals_pk=?, away_goals_pk=? WHERE id=?",
+                                (rand2-1, rand2, fixture_id))
 
-        else:
-            #print("Es Liga")
-            cur.execute("UPDATE fixtures SET home_goals=?, away_goals=?, played=1 WHERE id=?",
-                        (home_goals, away_goals, fixture_id))
 
-            if LEAGUE_DEBUGGING:
-                print(f"⚽ [{league_name}] {home_name} {home_goals} - {away_goals} {away_name}")
-
-            
-            
- 
-            
-        # --- PLAYER MATCH STATS (realistic minutes & participation) ---
-        player_stats = []
-
-        def get_team_players(club_id):
-            cur.execute("""
-                SELECT
-                  p.id,
-                  COALESCE(
-                    (SELECT pp.position
-                     FROM players_positions pp
-                     WHERE pp.player_id = p.id
-                     ORDER BY pp.position
-                     LIMIT 1),
-                    p.position,
-                    'CM'
-                  ) AS position,
-                  pa.at_defending, pa.at_passing, pa.at_scoring,
-                  pa.at_goalkeeping, pa.at_speed, pa.at_curr_ability
-                FROM players p
-                JOIN players_attr pa ON pa.player_id = p.id
-                WHERE p.club_id = ? AND p.is_retired = 0
-                ORDER BY pa.at_curr_ability DESC
-                LIMIT 22
-
-
-
-            """, (club_id,))
-            return cur.fetchall()
-
-        home_players = get_team_players(home_id)
-        away_players = get_team_players(away_id)
-
-        # Top 11 start, next 4 are potential subs
-        def assign_minutes(players):
-            starters = players[:11]
-            subs = random.sample(players[11:], k=min(len(players[11:]), 3))
-            active = starters + subs
-
-            # minute distribution
-            minutes = {}
-            for pid, pos, *_ in players:
-                if (pid, pos, *_ ) in starters:
-                    minutes[pid] = random.randint(80, 95)
-                elif (pid, pos, *_ ) in subs:
-                    minutes[pid] = random.randint(10, 30)
-                else:
-                    minutes[pid] = 0
-            return minutes
-
-        home_players = get_realistic_squad(cur, home_id)
-        away_players = get_realistic_squad(cur, away_id)
-        
-        # Get the club_id for each player
-        home_pids = [pid for pid, *_ in home_players]
-        away_pids = [pid for pid, *_ in away_players]        
-        
-        
-        pid_to_club = {pid: home_id for pid in home_pids}
-        pid_to_club.update({pid: away_id for pid in away_pids})
-        
-        home_minutes, away_minutes = assign_realistic_minutes(home_players, away_players)
-
-
-        # ✅ Now that we know who played, pick scorers from actual participants
-        home_eligible = [pid for pid, *_ in home_players if home_minutes.get(pid, 0) > 0]
-        away_eligible = [pid for pid, *_ in away_players if away_minutes.get(pid, 0) > 0]
-
-        hs, hn = pick_scorers(cur, home_id, home_goals, fixture_id, home_name, home_eligible)
-        as_, an = pick_scorers(cur, away_id, away_goals, fixture_id, away_name, away_eligible)
-
-        scorers = hs + as_
-        names = hn + an
-        
-        
-        home_ranges = get_playing_ranges(home_minutes)
-        away_ranges = get_playing_ranges(away_minutes)
-
-        
-
-        # ✅ Handle goal scorers (insert + realistic timing) — UNIQUE MINUTES
-        if scorers:
-            # Determine the match length from actual minutes played
-            def safe_max(d, default=90):
-                return max(d.values()) if d else default
-            match_len = max(safe_max(home_minutes, 90), safe_max(away_minutes, 90))
-            lo_minute, hi_minute = 1, min(94, match_len)
-
-            def pick_unique_minute(start, end, used):
-                """Pick a unique minute within [start,end]; if busy, search nearest free minute.
-                   If none free in the window (very unlikely), search the whole match range."""
-                s = max(lo_minute, int(math.floor(start)))
-                e = min(hi_minute, int(math.ceil(end)))
-
-                if s > e:  # fallback if window is inverted/empty
-                    s, e = lo_minute, hi_minute
-
-                # First try a random minute in the player's valid window
-                candidate = random.randint(s, e)
-                if candidate not in used:
-                    return candidate
-
-                # Then search outward from the candidate within [s,e]
-                left = candidate - 1
-                right = candidate + 1
-                while left >= s or right <= e:
-                    if left >= s and left not in used:
-                        return left
-                    if right <= e and right not in used:
-                        return right
-                    left -= 1
-                    right += 1
-
-                # As a last resort (extremely rare), search whole match range
-                for minute in range(lo_minute, hi_minute + 1):
-                    if minute not in used:
-                        return minute
-
-                # Absolute fallback (should never hit): allow reused minute
-                return candidate
-
-            scorer_minutes = []
-            used_minutes = set()
-
-            # Pair (pid, fix_id) with name, but assign mintues ensuring uniqueness
-            for (pid, fix_id), name in zip(scorers, names):
-                if pid in home_ranges:
-                    start, end = home_ranges[pid]
-                elif pid in away_ranges:
-                    start, end = away_ranges[pid]
                 else:
-                    start, end = (lo_minute, hi_minute)
-
-                minute = pick_unique_minute(start, end, used_minutes)
-                used_minutes.add(minute)
-                scorer_minutes.append((pid, fix_id, minute))
-
-            # Sort by time for consistency
-            scorer_minutes.sort(key=lambda x: x[2])
-
-            if LEAGUE_DEBUGGING or CUP_DEBUGGING:
-                def pretty_minute(m):
-                    return f"{m}" if m <= 90 else f"90+{m-90}"
-                pretty = ", ".join([
-                    f"{nm} {pretty_minute(m)}'"
-                    for (pid, fix_id, m), nm in zip(scorer_minutes, names)
-                ])
-                print("   Scorers:", pretty)
-
-            cur.executemany("""
-                INSERT INTO match_scorers (player_id, fixture_id, goal_minute)
-                VALUES (?, ?, ?)
-            """, scorer_minutes)
-
-
-
-
-
-        # Merge all
-        all_players = home_players + away_players
-        all_minutes = {**home_minutes, **away_minutes}
-
-        # Build goal map for scorers
-        goal_map = {}
-        for pid, fix_id in scorers:
-            goal_map[pid] = goal_map.get(pid, 0) + 1
-
-        def stat_from_attr(attr, factor, minutes_played, base_factor=0.01, spread=0.2):
-            """Scales production by minutes played and ability."""
-            if minutes_played <= 0:
-                return 0
-            base = attr / 1000.0 * factor * (minutes_played / 90.0)
-            return max(0, int(base * random.uniform(1 - spread, 1 + spread)))
-
-        def make_stats(pid, pos, defending, passing, scoring, goalkeeping, speed, ability):
-            minutes_played = all_minutes.get(pid, 0)   # players not in today’s XI get 0
-            if minutes_played == 0:
-                return None  # skip creating a row for DNPs (or keep it if you want 0-min rows)
-            if minutes_played == 0:
-                return None
-        
-            if pos in ("GK",):
-                tackles_a = stat_from_attr(defending, 2, minutes_played)
-                tackles_c = int(tackles_a * random.uniform(0.7, 0.95))
-                passes_a = stat_from_attr(passing, 25, minutes_played)
-                passes_c = int(passes_a * random.uniform(0.85, 0.99))
-                shoots_a = shoots_t = 0
-            elif pos in ("CB", "RB", "LB", "CDM"):
-                tackles_a = stat_from_attr(defending, 6, minutes_played)
-                tackles_c = int(tackles_a * random.uniform(0.6, 0.9))
-                passes_a = stat_from_attr(passing, 35, minutes_played)
-                passes_c = int(passes_a * random.uniform(0.85, 0.99))
-                shoots_a = stat_from_attr(scoring, 1, minutes_played)
-                shoots_t = int(shoots_a * random.uniform(0.4, 0.7))
-            elif pos in ("CM", "RM", "LM", "CAM"):
-                tackles_a = stat_from_attr(defending, 4, minutes_played)
-                tackles_c = int(tackles_a * random.uniform(0.6, 0.9))
-                passes_a = stat_from_attr(passing, 60, minutes_played)
-                passes_c = int(passes_a * random.uniform(0.85, 1.0))
-                shoots_a = stat_from_attr(scoring, 3, minutes_played)
-                shoots_t = int(shoots_a * random.uniform(0.4, 0.7))
-            else:
-                tackles_a = stat_from_attr(defending, 2, minutes_played)
-                tackles_c = int(tackles_a * random.uniform(0.5, 0.8))
-                passes_a = stat_from_attr(passing, 30, minutes_played)
-                passes_c = int(passes_a * random.uniform(0.8, 0.95))
-                shoots_a = stat_from_attr(scoring, 5, minutes_played)
-                shoots_t = int(shoots_a * random.uniform(0.4, 0.7))
-        
-            yellow = 1 if random.random() < (0.06 if pos in ("CB", "CDM", "RB", "LB") else 0.02) else 0
-            red = 1 if yellow and random.random() < 0.1 else 0
-            goals = goal_map.get(pid, 0)
-        
-            # 🧠 Ensure scorers always have at least one shot and one on target
-            if goals > 0:
-                shoots_a = max(shoots_a, goals)
-                shoots_t = max(shoots_t, goals)
-        
-            return (
-                pid, fixture_id, pid_to_club.get(pid), minutes_played,
-                tackles_a, tackles_c,
-                passes_a, passes_c,
-                shoots_a, shoots_t,
-                goals, yellow, red
-            )
-
+                    if CUP_DEBUGGING:
+                        print(f"⚽ {away_name} is the champion of the {league_name}!! Congratulations!!")
 
 
-        for pid, pos, defending, passing, scoring, gk, speed, ability in all_players:
-            record = make_stats(pid, pos, defending, passing, scoring, gk, speed, ability)
-            if record:
-                player_stats.append(record)
+    else:
+        #print("Es Liga")
+        cur.execute("UPDATE fixtures SET home_goals=?, away_goals=?, played=1 WHERE id=?",
+                    (home_goals, away_goals, fixture_id))
+        record_league_result(cur, fixture_id, home_id, away_id, home_goals, away_goals)
+
+        if LEAGUE_DEBUGGING:
+            print(f"⚽ [{league_name}] {home_name} {home_goals} - {away_goals} {away_name}")
+
+    if result.scorers:
+        if LEAGUE_DEBUGGING or CUP_DEBUGGING:
+            def pretty_minute(m):
+                return f"{m}" if m <= 90 else f"90+{m-90}"
+            club_names = {home_id: home_name, away_id: away_name}
+            pretty = []
+            for pid, _fid, m in result.scorers:
+                fn, ln, cid = cur.execute("SELECT first_name, last_name, club_id FROM players WHERE id=?",
+                                          (pid,)).fetchone()
+                pretty.append(f"{fn} {ln} ({club_names.get(cid, '?')}) {pretty_minute(m)}'")
+            print("   Scorers:", ", ".join(pretty))
 
         cur.executemany("""
-            INSERT INTO players_stats (
-                player_id, fixture_id, club_id,
-                minutes_played, tackles_attempted, tackles_comp,
-                passes_attempted, passes_comp,
-                shoots_attempted, shoots_target,
-                goals_scored, yellow_cards, red_cards
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, player_stats)
+            INSERT INTO match_scorers (player_id, fixture_id, goal_minute)
+            VALUES (?, ?, ?)
+        """, result.scorers)
+
+    cur.executemany("""
+        INSERT INTO players_stats (
+            player_id, fixture_id, club_id,
+            minutes_played, tackles_attempted, tackles_comp,
+            passes_attempted, passes_comp,
+            shoots_attempted, shoots_target,
+            goals_scored, yellow_cards, red_cards
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, result.player_stats)
+
+
+@perf.timed()
+def simulate_fixtures_for_day(conn, day, workers=None):
+    """
+    Play every unplayed fixture of `day`.
+
+    The clubs involved are snapshotted first (strengths, fame, form,
+    formation, squads), the day's scores are drawn in one batch (see
+    sample_goals), every fixture is then played out from that snapshot with
+    its own seed (see simulate_fixture), and the results are written in
+    fixture order in the caller's transaction. With workers > 1 (default
+    MATCH_WORKERS) the competitions are simulated in a process pool; the
+    results are the same as in-process.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+            SELECT f.id, f.home_club_id, hc.name, f.away_club_id, ac.name, f.competition_id, comp.name, comp.is_cup, f.competition_round
+            FROM fixtures f
+            JOIN clubs hc ON hc.id = f.home_club_id
+            JOIN clubs ac ON ac.id = f.away_club_id
+            JOIN competitions comp ON comp.id = f.competition_id
+            WHERE f.fixture_date = ? AND f.played = 0
+    """, (day,))
+    fixtures = cur.fetchall()
+    if not fixtures:
+        print(f"⚠️ No fixtures found for {day}")
+        return 0
+
+    # Group fixtures by competition to compute baselines once per comp per day
+    # (each league and cup is normalised against its own clubs)
+    by_comp = {}
+    for row in fixtures:
+        _fid, _h, _hn, _a, _an, comp_id, *_ = row
+        by_comp.setdefault(comp_id, []).append(row)
 
+    # One bulk strength load for every club playing in today's competitions
+    cur.execute(f"""
+        SELECT club_id FROM clubs_competition
+        WHERE is_active = 1 AND competition_id IN ({','.join('?' * len(by_comp))})
+    """, tuple(by_comp))
+    day_clubs = {r[0] for r in cur.fetchall()}
+    for row in fixtures:
+        day_clubs.update((row[1], row[3]))
+    STRENGTH_CACHE.ensure_fresh(cur, day_clubs)
+    TACTICS.ensure_fresh(cur, day_clubs)
 
+    baselines = {}
+    for comp_id in by_comp:
+        baselines[comp_id] = compute_comp_strength_baselines(conn, comp_id)
 
+    # Snapshot of every club playing today; nothing the match engine reads
+    # changes while the day's fixtures are written (fame changes are deferred)
+    snapshots = {}
+    for row in fixtures:
+        for club_id in (row[1], row[3]):
+            if club_id not in snapshots:
+                snapshots[club_id] = snapshot_club(cur, club_id)
+
+    # Every score of the day in one batched draw, in by_comp order
+    day_seed = random.getrandbits(64)
+    day_rng = np.random.default_rng(day_seed)
+    lambdas = []
+    for comp_id, rows in by_comp.items():
+        atk_mean, def_mean = baselines[comp_id]
+        for _fid, home_id, _hn, away_id, *_ in rows:
+            lambdas.append(fixture_lambdas(snapshots[home_id], snapshots[away_id], atk_mean, def_mean, day_rng))
+    goals = iter(sample_goals(lambdas, day_rng).tolist())
+
+    batches = []
+    for rows in by_comp.values():
+        batches.append([
+            (fid, snapshots[home_id], snapshots[away_id], *next(goals), fixture_seed(day_seed, fid))
+            for fid, home_id, _hn, away_id, *_ in rows
+        ])
+
+    results = {r.fixture_id: r for r in run_match_jobs(batches, MATCH_WORKERS if workers is None else workers)}
+
+    # Fame changes are collected per club and written once after the last fixture
+    fame_deltas = {}
+    for row in fixtures:
+        apply_fixture_result(cur, row, results[row[0]], fame_deltas)
 
+    apply_fame_deltas(cur, fame_deltas)
+    conn.commit()
 
-    conn.commit()
\ No newline at end of file
+    return len(fixtures)
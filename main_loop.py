@@ -6,13 +6,12 @@ import csv
 import math
 import random
 import sqlite3
-from tabulate import tabulate
-from faker import Faker
 from datetime import datetime, timedelta, date
-from dateutil.relativedelta import relativedelta
 import datetime as dt
 import sys
 
+import numpy as np
+
 import decision_making
 from decision_making import adjust_board_satisfaction,season_end_board_adjustments, board_satisfaction_and_firing
 
@@ -24,10 +23,19 @@ from db_population import (
     populate_all_players,
     distribute_attributes,
     calculate_player_fame,
-    gen_logs_insert, player_stats_summary_func, random_positions_and_foot, top_up_free_agents
+    gen_logs_insert, player_stats_summary_func, random_positions_and_foot, top_up_free_agents,
+    sync_primary_positions, upgrade_save_schema, populate_synthetic_world
 )
 
-from fixture_calculation import simulate_fixtures_for_day
+from fixture_calculation import simulate_fixtures_for_day, shutdown_match_pool
+from db_connection import open_connection, QueryProfiler
+import club_versions
+import world_model
+import contextlib
+import perf
+import season_forecast
+from role_scores import ROLE_SCORES, ATTR_COLUMNS as ROLE_ATTR_COLUMNS
+from name_pool import NamePool
 
 LEAGUE_DEBUGGING = False
 CUP_DEBUGGING = False
@@ -58,10 +66,6 @@ SEASON = '2025/26'
 DEFENSE_EXP = 0.65
 DEF_SUPPRESS = 0.35
 
-# League baselines (lazy)
-LEAGUE_ATK_MEAN = None
-LEAGUE_DEF_MEAN = None
-
 SCORER_BOOST = 1.15
 
 # Tables that should have seasonal snapshots
@@ -74,17 +78,8 @@ SNAPSHOT_TABLES = (
     "clubs_board"  
 )
 
-# Fame → name fakers
-fakers = {
-    "England": Faker('en_GB'),
-    "Argentina": Faker('es_AR'),
-    "Spain": Faker('es_ES'),
-    "Germany": Faker('de_DE'),
-    "Netherlands": Faker('nl_NL'),
-    "France": Faker('fr_FR'),
-    "Italy": Faker('it_IT'),
-    "Random": Faker()
-}
+# Nationality → names (Faker's locale name lists, cached next to the save)
+names = NamePool(cache_path=os.path.join(DB_DIR, "name_pool.json"))
 
 FORMATIONS = [
     "4-4-2", "4-3-3", "3-5-2", "4-2-3-1",
@@ -314,6 +309,8 @@ def to_next_monday(d):
     return d + timedelta(days=(0 - d.weekday()) % 7)
 
 def print_table(table_name):
+    from tabulate import tabulate
+
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     cur.execute(f"SELECT * FROM {table_name}")
@@ -325,7 +322,7 @@ def print_table(table_name):
 
 def calculate_age(birth_date, game_date):
     if isinstance(birth_date, str):
-        birth_date = dt.datetime.strptime(birth_date, "%Y-%m-%d").date()
+        birth_date = dt.date.fromisoformat(birth_date)
     elif isinstance(birth_date, dt.datetime):
         birth_date = birth_date.date()
     if isinstance(game_date, str):
@@ -362,16 +359,19 @@ def normalize_fame(fame):
     return clamp(0.7 + fame / 2000.0, 0.7, 1.3)
 
 
-def initialize_club_balances():
+def initialize_club_balances(conn=None):
     """
     Seed club cash with tiered ranges scaled by fame percentile inside each league,
     then apply a global downscale (~2/3) with a small top/bottom skew:
       - richest clubs slightly higher, poorest slightly lower.
       - never below MIN_MONTHS_COVER of wages after scaling.
+    Wages are summed per club with one grouped query.
     """
     import sqlite3, random
 
-    conn = sqlite3.connect(DB_PATH)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # --- knobs ---
@@ -414,13 +414,17 @@ def initialize_club_balances():
         # 0..1, where 1.0 is highest fame in league
         return 1.0 - (idx / (n - 1))
 
+    # Annual wages from existing contracts
+    wages_by_club = dict(cur.execute("""
+        SELECT club_id, COALESCE(SUM(wage),0)
+        FROM players_contract
+        WHERE club_id IS NOT NULL AND is_terminated=0
+        GROUP BY club_id
+    """).fetchall())
+
+    balances = []
     for club_id, fame, league_id in clubs:
-        # Annual wages from existing contracts (fallback if empty)
-        yearly_wages = cur.execute("""
-            SELECT COALESCE(SUM(wage),0)
-            FROM players_contract
-            WHERE club_id=? AND is_terminated=0
-        """, (club_id,)).fetchone()[0]
+        yearly_wages = wages_by_club.get(club_id, 0)
         monthly_wages = yearly_wages / 12.0
         if monthly_wages <= 0:
             # fallback: rough wage from fame
@@ -468,15 +472,23 @@ def initialize_club_balances():
         balance = max(balance, floor_scaled, min_wage_floor)
         balance = min(balance, GLOBAL_CAP)
 
-        cur.execute("UPDATE clubs SET current_balance_EUR=? WHERE id=?", (balance, club_id))
+        balances.append((balance, club_id))
 
+    cur.executemany("UPDATE clubs SET current_balance_EUR=? WHERE id=?", balances)
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 
+@perf.timed()
 def process_monthly_finances(conn, game_date):
-    from datetime import timedelta
+    """
+    Close the previous month for every club (run on the 1st): write its
+    clubs_monthly_economy row and roll the balance forward with wages and
+    operations. Wages, transfers and the history rows are read with one
+    grouped query each; the rows and balances are written with executemany.
+    """
     cur = conn.cursor()
 
     # Previous month window (run on the 1st)
@@ -484,6 +496,7 @@ def process_monthly_finances(conn, game_date):
     prev_month_end   = first_this_month - timedelta(days=1)
     prev_month_start = prev_month_end.replace(day=1)
     month_str = prev_month_start.strftime("%Y-%m-01")
+    window = (prev_month_start.isoformat(), prev_month_end.isoformat())
 
     # Idempotent monthly row
     cur.execute("""
@@ -494,68 +507,70 @@ def process_monthly_finances(conn, game_date):
     # Snapshot live balances now — this IS the month-end balance (B_end)
     clubs = cur.execute("SELECT id, current_balance_EUR, fame FROM clubs").fetchall()
 
-    for club_id, B_end, fame in clubs:
-        
-        
-        # Balance 2 months ago
-        target_month = (GAME_DATE.replace(day=1) - relativedelta(months=2)).strftime("%Y-%m-01")
-        row = cur.execute("""
-            SELECT balance_before, balance_after
+    # (opening, closing) balance two months ago
+    target_month = (prev_month_start - timedelta(days=1)).strftime("%Y-%m-01")
+    history = {
+        club_id: (before, after)
+        for club_id, before, after in cur.execute("""
+            SELECT club_id, balance_before, balance_after
             FROM clubs_monthly_economy
-            WHERE club_id=? AND month_date=?""",
-            (club_id, target_month)
-        ).fetchone()
-        
-        if row:
-            B_start_2_months_ago, B_end_hist_2_months_ago = row  # opening, closing two months ago     
-        else: 
-            B_start_2_months_ago = B_end
-            B_end_hist_2_months_ago = B_end
-        
-        
-        # Wages for PLAYERS previous month (active contracts on prev_month_end)
-        yearly_wages = cur.execute("""
-            SELECT COALESCE(SUM(wage),0)
-            FROM players_contract
-            WHERE club_id=? AND is_terminated=0
-              AND contract_start<=? AND contract_end>=?
-        """, (club_id, prev_month_end, prev_month_end)).fetchone()[0]
-        wages_total = yearly_wages // 12
+            WHERE month_date=?
+        """, (target_month,))
+    }
+
+    # Yearly wages of PLAYERS with a contract active on prev_month_end
+    yearly_wages = dict(cur.execute("""
+        SELECT club_id, COALESCE(SUM(wage),0)
+        FROM players_contract
+        WHERE is_terminated=0
+          AND contract_start<=? AND contract_end>=?
+        GROUP BY club_id
+    """, (prev_month_end.isoformat(), prev_month_end.isoformat())).fetchall())
+
+    # Transfers during the month (reporting only — cash already moved day-of)
+    transfer_in, transfer_out = {}, {}
+    for direction, club_id, fees in cur.execute("""
+        SELECT 'in', to_club_id, COALESCE(SUM(fee),0) FROM transfers_log
+        WHERE ts BETWEEN ? AND ? GROUP BY to_club_id
+        UNION ALL
+        SELECT 'out', from_club_id, COALESCE(SUM(fee),0) FROM transfers_log
+        WHERE ts BETWEEN ? AND ? GROUP BY from_club_id
+    """, window + window).fetchall():
+        (transfer_in if direction == "in" else transfer_out)[club_id] = fees
+
+    economy_rows, balances = [], []
+    for club_id, B_end, fame in clubs:
+        B_start_2_months_ago, B_end_hist_2_months_ago = history.get(club_id, (B_end, B_end))
+
+        wages_total = yearly_wages.get(club_id, 0) // 12
 
         # Operational income/expense (simple model)
         ops_income = int(wages_total * random.uniform(0.8, 1.2) * (0.8 + fame / 3000))
         ops_exp    = int(wages_total * 0.15)
 
-        # Transfers during the month (reporting only — cash already moved day-of)
-        transfer_in = cur.execute("""
-            SELECT COALESCE(SUM(fee),0) FROM transfers_log
-            WHERE to_club_id=? AND ts BETWEEN ? AND ?
-        """, (club_id, prev_month_start.isoformat(), prev_month_end.isoformat())).fetchone()[0]
-
-        transfer_out = cur.execute("""
-            SELECT COALESCE(SUM(fee),0) FROM transfers_log
-            WHERE from_club_id=? AND ts BETWEEN ? AND ?
-        """, (club_id, prev_month_start.isoformat(), prev_month_end.isoformat())).fetchone()[0]
-
         # Totals shown in the monthly row
-        income_total      = ops_income + transfer_out
-        expenditure_total = ops_exp    + transfer_in
+        income_total      = ops_income + transfer_out.get(club_id, 0)
+        expenditure_total = ops_exp    + transfer_in.get(club_id, 0)
 
-        # Reconstruct the true month-start balance so the row reconciles:
-        # B_end = B_start + ops_income + transfer_in - (wages_total + ops_exp + transfer_out)
-        B_start = B_end - ops_income - transfer_in + wages_total + ops_exp + transfer_out
+        # Roll into the new month with ops only (do NOT re-apply transfers)
+        B_next = B_end - wages_total - ops_exp + ops_income
 
-        # Write monthly row: BEFORE = B_start, AFTER = B_end (matches clubs table now)
-        cur.execute("""
-            INSERT INTO clubs_monthly_economy
-              (month_date, club_id, income_total, expenditure_total, wages_total,
-               balance_before, balance_after)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (month_str, club_id, income_total, wages_total+expenditure_total, wages_total, B_end_hist_2_months_ago,B_end-wages_total-ops_exp+ops_income ))
+        # Monthly row: BEFORE = closing balance two months ago, AFTER = new balance
+        economy_rows.append((month_str, club_id, income_total, wages_total + expenditure_total, wages_total,
+                             B_end_hist_2_months_ago, B_next))
+        balances.append((B_next, club_id))
 
-        # Roll into the new month with ops only (do NOT re-apply transfers)
-        B_next = B_end + ops_income - wages_total - ops_exp
-        cur.execute("UPDATE clubs SET current_balance_EUR=? WHERE id=?", (B_end-wages_total-ops_exp+ops_income, club_id))
+    cur.executemany("""
+        INSERT INTO clubs_monthly_economy
+          (month_date, club_id, income_total, expenditure_total, wages_total,
+           balance_before, balance_after)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, economy_rows)
+    cur.executemany("UPDATE clubs SET current_balance_EUR=? WHERE id=?", balances)
+    world = world_model.active()
+    if world is not None:
+        for balance, club_id in balances:
+            world.set_balance(club_id, balance)
 
     conn.commit()
 
@@ -563,8 +578,10 @@ def process_monthly_finances(conn, game_date):
 
 
 
-def populate_clubs():
-    conn = sqlite3.connect(DB_PATH)
+def populate_clubs(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     csv_path = os.path.join(BASE_DIR, "premier_league_clubs.csv")
     rows = []
@@ -589,17 +606,20 @@ def populate_clubs():
     
     
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Clubs populated")
     
     
-def populate_clubs_board():
+def populate_clubs_board(conn=None):
     """
     Populate clubs_board with initial values for each club.
     Ranges: 0–2000, influenced by fame and balance.
     """
     import random
-    conn = sqlite3.connect(DB_PATH)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Clean old board records (if rerunning)
@@ -608,6 +628,7 @@ def populate_clubs_board():
     cur.execute("SELECT id, fame, current_balance_EUR FROM clubs")
     clubs = cur.fetchall()
 
+    boards = []
     for club_id, fame, balance in clubs:
         # Normalize inputs
         fame_norm = max(0, min(2000, fame))
@@ -624,18 +645,22 @@ def populate_clubs_board():
         economic_confid  = max(0, min(2000, economic_confid))
         at_patience      = max(0, min(2000, at_patience))
 
-        cur.execute("""
-            INSERT INTO clubs_board (manager_satisf, squad_satisf, economic_confid, at_patience, club_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (manager_satisf, squad_satisf, economic_confid, at_patience, club_id))
+        boards.append((manager_satisf, squad_satisf, economic_confid, at_patience, club_id))
 
+    cur.executemany("""
+        INSERT INTO clubs_board (manager_satisf, squad_satisf, economic_confid, at_patience, club_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, boards)
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ Populated clubs_board for {len(clubs)} clubs")
 
 
-def populate_fixtures(competition_id: int):
-    conn = sqlite3.connect(DB_PATH)
+def populate_fixtures(competition_id: int, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Get competition type
@@ -643,7 +668,8 @@ def populate_fixtures(competition_id: int):
     comp_row = cur.fetchone()
     if not comp_row:
         print(f"⚠️ Competition {competition_id} not found")
-        conn.close()
+        if own_conn:
+            conn.close()
         return
     is_league, is_cup = comp_row
 
@@ -653,7 +679,8 @@ def populate_fixtures(competition_id: int):
 
     if len(club_ids) < 2:
         print(f"⚠️ Not enough clubs in competition {competition_id}. Found {len(club_ids)}")
-        conn.close()
+        if own_conn:
+            conn.close()
         return
 
     # Get current season
@@ -705,37 +732,55 @@ def populate_fixtures(competition_id: int):
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, fixtures_to_insert)
 
+    # Empty table rows so every club shows up before its first match
+    if is_league:
+        cur.executemany("""
+            INSERT OR IGNORE INTO standings (season, competition_id, club_id)
+            VALUES (?, ?, ?)
+        """, [(season, competition_id, cid) for cid in club_ids if cid is not None])
+
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ Fixtures populated for competition {competition_id} ({season})")
 
 
-def depopulate_transfers_log():
-    conn = sqlite3.connect(DB_PATH)
+def depopulate_transfers_log(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     cur.execute("DELETE FROM transfers_log")
     cur.execute("DELETE FROM sqlite_sequence WHERE name='transfers_log'")
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ transfers_log depopulated.")
 
 
-def depopulate_fixtures():
-    conn = sqlite3.connect(DB_PATH)
+def depopulate_fixtures(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     cur.execute("DELETE FROM fixtures")
     cur.execute("DELETE FROM sqlite_sequence WHERE name='fixtures'")
+    cur.execute("DELETE FROM standings")
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Fixtures depopulated.")
 
-def depopulate_match_scorers():
-    conn = sqlite3.connect(DB_PATH)
+def depopulate_match_scorers(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     cur.execute("DELETE FROM match_scorers")
     cur.execute("DELETE FROM sqlite_sequence WHERE name='match_scorers'")
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Match_scorers depopulated.")
 
 
@@ -908,25 +953,18 @@ def calculate_staff_fame(age, club_fame, role):
 
 
 
-def maybe_convert_to_staff(conn, player_id):
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT club_id, first_name, last_name, fame, peak_fame,
-               position, date_of_birth, nationality, second_nationality
-        FROM players WHERE id = ?
-    """, (player_id,))
-    row = cur.fetchone()
-    if not row:
-        return
-    _club_id, first_name, last_name, fame, peak_fame, pos, dob, nat, nat2 = row
-
+def retired_player_staff(fame, peak_fame, pos, attrs):
+    """
+    Roll whether a retiring player becomes (unemployed) staff. attrs are his
+    (goalkeeping, defending, passing, scoring). Returns (role, fame,
+    preferred_formation, staff_attr values after staff_id), or None.
+    """
     # Base chance
     chance = 0.30
     if fame > 800 or peak_fame > 1000:
         chance += 0.20
     if random.random() > chance:
-        return
+        return None
 
     # Role choices
     roles = []
@@ -968,17 +1006,7 @@ def maybe_convert_to_staff(conn, player_id):
     preferred_formation = random.choice(FORMATIONS)
 
 
-    # Insert into staff...
-    cur.execute("""
-        INSERT INTO staff (first_name, last_name, date_of_birth, nationality,
-                           second_nationality, role, fame, club_id, former_player_id, preferred_formation)
-        VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)
-    """, (first_name, last_name, dob, nat, nat2, role, fame, player_id, preferred_formation))
-    staff_id = cur.lastrowid
-
-    # Carry over attributes as before...
-    cur.execute("SELECT at_goalkeeping, at_defending, at_passing, at_scoring FROM players_attr WHERE player_id = ?", (player_id,))
-    gk, tac, pas, sho = cur.fetchone() or (0, 0, 0, 0)
+    gk, tac, pas, sho = attrs
     
     
     # Base staff ability, with realistic spread
@@ -1020,14 +1048,8 @@ def maybe_convert_to_staff(conn, player_id):
     curr_ability = max(700, base + random.randint(-100, 150))
     pot_ability  = min(2000, curr_ability + random.randint(300, 700))
 
-    # Insert into staff_attr (with new fields)
-    cur.execute("""
-        INSERT INTO staff_attr (staff_id, at_goalkeeping, at_tackling, at_passing,
-                                at_shooting, at_physio, at_medical, at_scouting,
-                                at_curr_ability, at_pot_ability)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        staff_id,
+    # staff_attr (with new fields)
+    return role, fame, preferred_formation, (
         gk_attr,
         tac_attr,
         pas_attr,
@@ -1037,17 +1059,133 @@ def maybe_convert_to_staff(conn, player_id):
         at_scouting,
         curr_ability,
         pot_ability
-    ))
+    )
+
+
+@perf.timed()
+def retire_players(conn, game_date):
+    """
+    End-of-season retirements: every active player older than 34 retires,
+    may become unemployed staff and is replaced by a youth regen (50% at
+    his club, 50% as a free agent). Retirees are collected with one query
+    and every table is written with one executemany; one commit at the end.
+    """
+    from dateutil.relativedelta import relativedelta
 
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT p.id, p.club_id, p.first_name, p.last_name, p.fame, p.peak_fame,
+               p.position, p.date_of_birth, p.nationality, p.second_nationality,
+               pa.at_goalkeeping, pa.at_defending, pa.at_passing, pa.at_scoring
+        FROM players p
+        LEFT JOIN players_attr pa ON pa.player_id = p.id
+        WHERE p.is_retired = 0 AND p.date_of_birth <= ?
+        ORDER BY p.id
+    """, ((game_date - relativedelta(years=35)).isoformat(),))  # age > 34
+    retirees = cur.fetchall()
+    if not retirees:
+        return 0
+
+    club_fame = dict(cur.execute("SELECT id, fame FROM clubs").fetchall())
+
+    staff_rows, staff_attrs = [], []
+    regens, regen_attrs, regen_contracts, regen_positions = [], [], [], []
+    for (player_id, club_id, first_name, last_name, fame, peak_fame,
+         pos, dob, nat, nat2, *attrs) in retirees:
+        staff = retired_player_staff(fame, peak_fame, pos, attrs if attrs[0] is not None else (0, 0, 0, 0))
+        if staff is not None:
+            role, staff_fame, preferred_formation, values = staff
+            staff_rows.append((first_name, last_name, dob, nat, nat2, role, staff_fame,
+                               player_id, preferred_formation))
+            staff_attrs.append(values)
+
+        # Regen: 50% same club, 50% free agent (no club)
+        same_club = (random.random() < 0.5)
+        # Keep pedigree in fame/value even if free: use former club's fame
+        youth, youth_attr, contract = generate_player(
+            game_date, names,
+            position=pos,
+            club_id=club_id if same_club else None,
+            club_fame=club_fame.get(club_id, 1000),
+            force_youth=True
+        )
+        regens.append(youth)
+        regen_attrs.append(youth_attr)
+        regen_contracts.append(contract)
+        regen_positions.append(random_positions_and_foot(pos))
+
+    # Retire
+    cur.executemany("UPDATE players SET is_retired=1, value=0, club_id=NULL WHERE id=?",
+                    [(row[0],) for row in retirees])
+
+    # Former players turned staff
+    if staff_rows:
+        cur.executemany("""
+            INSERT INTO staff (first_name, last_name, date_of_birth, nationality,
+                               second_nationality, role, fame, club_id, former_player_id, preferred_formation)
+            VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)
+        """, staff_rows)
+        last_rowid = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+        staff_ids = range(last_rowid - len(staff_rows) + 1, last_rowid + 1)
+        cur.executemany("""
+            INSERT INTO staff_attr (staff_id, at_goalkeeping, at_tackling, at_passing,
+                                    at_shooting, at_physio, at_medical, at_scouting,
+                                    at_curr_ability, at_pot_ability)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(sid, *values) for sid, values in zip(staff_ids, staff_attrs)])
+
+    # Regens
+    cur.executemany("""
+        INSERT INTO players (
+            first_name, last_name, date_of_birth, nationality,
+            position, club_id, value, fame, peak_fame
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, regens)
+    last_rowid = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+    regen_ids = list(range(last_rowid - len(regens) + 1, last_rowid + 1))
+
+    cur.executemany("""
+        INSERT OR IGNORE INTO players_positions (player_id, position, foot)
+        VALUES (?, ?, ?)
+    """, [(pid, p, foot) for pid, (positions, foot) in zip(regen_ids, regen_positions) for p in positions])
+    sync_primary_positions(cur, regen_ids)
+
+    cur.executemany("""
+        INSERT INTO players_attr (
+            player_id,
+            at_luck, at_selfcont, at_honour, at_crazyness, at_working,
+            at_sexatract, at_friendship, at_speed, at_dribbling,
+            at_goalkeeping, at_defending, at_passing, at_scoring,
+            at_happiness, at_confidence, at_hope,
+            at_curr_ability, at_pot_ability
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(pid, *a) for pid, a in zip(regen_ids, regen_attrs)])
+
+    # players_contract only for regens that actually have a club
+    cur.executemany("""
+        INSERT INTO players_contract (
+            player_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated
+        ) VALUES (?, ?, ?, ?, ?, ?, 0)
+    """, [(pid, *c) for pid, c in zip(regen_ids, regen_contracts) if c[0] is not None])
+
+    for row in retirees:
+        ROLE_SCORES.forget(row[0])
+    # Retirees left and same-club regens joined: squad strength and rosters change
+    club_versions.bump_squad(*{row[1] for row in retirees}, *{c[0] for c in regen_contracts})
     conn.commit()
-    print(f"👔 {first_name} {last_name} retired and became an UNEMPLOYED {role} (staff_id={staff_id})")
 
+    at_clubs = sum(1 for c in regen_contracts if c[0] is not None)
+    print(f"👴 {len(retirees)} players retired ({len(staff_rows)} became UNEMPLOYED staff); "
+          f"{len(regens)} regens, {at_clubs} at their former clubs")
+    return len(retirees)
 
 
 # -----------------------------
 # Weekly progression
 # -----------------------------
 
+@perf.timed()
 def update_staff_in_db(conn, game_date):
     cur = conn.cursor()
     cur.execute("""
@@ -1058,6 +1196,7 @@ def update_staff_in_db(conn, game_date):
         WHERE s.is_retired = 0
     """)
     staff = cur.fetchall()
+    world = world_model.active()
 
     for staff_id, birth_date, role, club_id, curr_ability, pot_ability in staff:
         age = calculate_age(birth_date, game_date)
@@ -1081,6 +1220,9 @@ def update_staff_in_db(conn, game_date):
                 SET is_retired = 1, club_id = NULL
                 WHERE id = ?
             """, (staff_id,))
+            club_versions.bump_roster(club_id)
+            if world is not None:
+                world.retire_staff(staff_id)
             print(f"👴 Staff {staff_id} retired at age {age} ({role})")
             continue
 
@@ -1114,6 +1256,155 @@ def update_staff_in_db(conn, game_date):
     conn.commit()
 
 
+# Technical attributes progressed every week, in random-draw order
+PROGRESSION_ATTRS = ("speed", "dribbling", "defending", "passing", "scoring", "goalkeeping")
+PROGRESSION_DRAWS = len(PROGRESSION_ATTRS) + 1  # one uniform per attribute, one for the value
+NEUTRAL_STAFF_MULT = {"gk": 1.0, "def": 1.0, "pass": 1.0, "shoot": 1.0, "fitness": 1.0}
+
+
+def progression_key_attrs(pos):
+    """Attributes that follow the player's CA growth closely."""
+    if pos == "GK":
+        return {"goalkeeping", "defending"}
+    if pos in ("CB", "LB", "RB", "CDM"):
+        return {"defending", "passing"}
+    if pos in ("CM", "LM", "RM", "CAM", "AM"):
+        return {"passing", "dribbling"}
+    return {"scoring", "dribbling"}  # forwards
+
+
+def progression_staff_group(pos):
+    """Which staff multiplier drives a position's growth (None: no staff effect)."""
+    if pos == "GK":
+        return "gk"
+    if pos in ("CB", "RB", "LB", "CDM"):
+        return "def"
+    if pos in ("CM", "CAM", "RM", "LM"):
+        return "pass"
+    if pos in ("ST", "CF", "FW", "LW", "RW"):
+        return "shoot"
+    return None
+
+
+def progress_players(cur, players, ages, draws):
+    """
+    Weekly progression of `players` (update_players_in_db rows) as NumPy
+    array operations. draws holds PROGRESSION_DRAWS uniforms in [0, 1) per
+    player, used exactly where the per-player rules call random.uniform.
+    Writes players_attr and players with one executemany each.
+    """
+    if not players:
+        return
+    cols = list(zip(*players))
+    player_ids = cols[0]
+    positions = cols[2]
+    club_ids = cols[3]
+    curr, pot, selfcont, honour, crazyness, working, sexatract = (
+        np.array(c, dtype=np.float64) for c in cols[4:11])
+    attrs = np.array(cols[11:17], dtype=np.float64).T  # PROGRESSION_ATTRS order
+    age = np.array(ages, dtype=np.int64)
+    draws = np.array(draws, dtype=np.float64)
+
+    staff_mult = staff_multipliers_by_club(cur)
+    club_mult = [staff_mult.get(cid, NEUTRAL_STAFF_MULT) for cid in club_ids]
+    growth_mult = np.array([
+        m[group] if group else 1.0
+        for m, group in zip(club_mult, map(progression_staff_group, positions))
+    ])
+    def_mult = np.array([m["def"] for m in club_mult])
+
+    def clamp(x, lo=100, hi=2000):
+        return np.maximum(lo, np.minimum(hi, np.round(x)))
+
+    # --- Base growth (slower) ---
+    dev_gap = np.maximum(0, pot - curr)
+    growth = np.select(
+        [age < 20, age < 23, age < 27, age < 30],
+        [dev_gap * 0.010, dev_gap * 0.008, dev_gap * 0.004, dev_gap * 0.001],
+        -curr * 0.0015,  # gentle decline
+    )
+    growth = growth * growth_mult
+
+    # --- Cap yearly ability change ---
+    raw_new_ca = np.maximum(100, np.minimum(curr + growth, pot))
+    cap_up = np.select([age < 20, age < 23, age < 27, age < 30], [8, 6, 4, 2], 0)
+    cap_down = np.where(age >= 30, -4, -2)
+    ca_delta = np.maximum(cap_down, np.minimum(raw_new_ca - curr, cap_up))
+    new_ca = np.round(curr + ca_delta)
+
+    # Relative growth factor for attributes
+    growth_factor = (new_ca - curr) / np.maximum(1, curr)
+
+    # --- Mental progression (guaranteed small steps) ---
+    def step_up(value, rate, max_step):
+        delta = np.maximum(1, np.minimum(max_step, (2000 - value) * rate))
+        return clamp(value + delta)
+
+    def step_down(value, rate, max_step):
+        delta = np.maximum(1, np.minimum(max_step, (value - 100) * rate))
+        return clamp(value - delta)
+
+    selfcont  = step_up(selfcont,   0.004, 5)              # +1..5
+    honour    = step_up(honour,     0.003, 4)              # +1..4
+    crazyness = step_down(crazyness, 0.002, 3)             # -1..3
+    working   = step_up(working,    0.004 * def_mult, 5)   # +1..5, staff helps
+    sexatract = step_down(sexatract, 0.003, 5)             # -1..5
+
+    # --- Technical / physical progression ---
+    key_rows = {pos: [name in progression_key_attrs(pos) for name in PROGRESSION_ATTRS]
+                for pos in set(positions)}
+    key = np.array([key_rows[pos] for pos in positions])
+    lo = np.where(key, 0.5, 0.1)
+    hi = np.where(key, 0.8, 0.3)
+    delta = attrs * growth_factor[:, None] * (lo + (hi - lo) * draws[:, :len(PROGRESSION_ATTRS)])
+    # Secondary attributes: aging drag after 30
+    drag = attrs * 0.0008 * (age - 30)[:, None]
+    secondary = np.maximum(-4, np.minimum(5, np.where((age > 30)[:, None], delta - drag, delta)))
+    delta = np.where(key, np.maximum(-5, np.minimum(8, delta)), secondary)
+    new_attrs = clamp(attrs + delta)
+
+    # Fame / value (calculate_player_value / calculate_player_fame per column)
+    club_fame = dict(cur.execute("SELECT id, fame FROM clubs").fetchall())
+    fame_val = np.array([club_fame.get(cid, 1000) if cid is not None else 1000 for cid in club_ids],
+                        dtype=np.float64)
+    ability_score = new_ca / 2000.0
+    value_age_mult = np.select([age < 20, age < 23, age < 28, age < 31, age < 34], [1.4, 1.2, 1.0, 0.7, 0.4], 0.2)
+    value = (ability_score ** 3) * 100_000_000 * value_age_mult * (0.8 + fame_val / 2000.0) \
+        * (0.85 + (1.15 - 0.85) * draws[:, -1])
+    value = np.maximum(50_000, np.minimum(value, 200_000_000)).astype(np.int64)
+    fame_age_mult = np.select([age < 20, age < 24, age < 30, age < 34], [0.4, 0.7, 1.0, 0.6], 0.3)
+    fame = 2000 * ability_score * fame_age_mult * (0.5 + fame_val / 4000.0)
+    fame = np.maximum(1, np.minimum(fame, 2000)).astype(np.int64)
+
+    new_ca = new_ca.astype(np.int64)
+    new_attrs = new_attrs.astype(np.int64)
+    cur.executemany("""
+        UPDATE players_attr SET
+            at_selfcont=?, at_honour=?, at_crazyness=?, at_working=?, at_sexatract=?,
+            at_speed=?, at_dribbling=?, at_defending=?, at_passing=?,
+            at_scoring=?, at_goalkeeping=?, at_curr_ability=?
+        WHERE player_id=?
+    """, zip(*(c.astype(np.int64).tolist() for c in (selfcont, honour, crazyness, working, sexatract)),
+             *(new_attrs[:, i].tolist() for i in range(len(PROGRESSION_ATTRS))),
+             new_ca.tolist(), player_ids))
+    cur.executemany("UPDATE players SET value=?, fame=? WHERE id=?",
+                    zip(value.tolist(), fame.tolist(), player_ids))
+    world = world_model.active()
+    if world is not None:
+        mirrored = {"at_curr_ability": new_ca.tolist(), "at_selfcont": selfcont.astype(np.int64).tolist()}
+        mirrored.update(("at_" + name, new_attrs[:, i].tolist()) for i, name in enumerate(PROGRESSION_ATTRS))
+        world.progress_players(player_ids, mirrored, value.tolist(), fame.tolist())
+
+    # Rescore only the players whose role-score inputs moved
+    changed = np.flatnonzero((new_ca != curr) | (new_attrs != attrs).any(axis=1))
+    if changed.size:
+        column = {"at_curr_ability": new_ca}
+        column.update(("at_" + name, new_attrs[:, i]) for i, name in enumerate(PROGRESSION_ATTRS))
+        ROLE_SCORES.update_many([player_ids[i] for i in changed.tolist()],
+                                np.column_stack([column[c][changed] for c in ROLE_ATTR_COLUMNS]))
+
+
+@perf.timed()
 def update_players_in_db(conn, game_date):
     cur = conn.cursor()
 
@@ -1132,210 +1423,17 @@ def update_players_in_db(conn, game_date):
     """)
     players = cur.fetchall()
 
-    staff_cache = {}
-
-    def clamp(x, lo=100, hi=2000):
-        return int(max(lo, min(hi, round(x))))
-
+    # Everyone draws their random numbers here (in the same order as a
+    # per-player pass would) and progresses in one vectorized step below.
+    ages, draws = [], []
     for player in players:
-        (player_id, birth_date, pos, club_id, curr_ability, pot_ability,
-         selfcont, honour, crazyness, working, sexatract,
-         speed, dribbling, defending, passing, scoring, goalkeeping) = player
+        ages.append(calculate_age(player[1], game_date))
+        draws.append([random.random() for _ in range(PROGRESSION_DRAWS)])
 
-        age = calculate_age(birth_date, game_date)
-
-        # Retirement at the end of the season only
-        if age > 34 and GAME_DATE.month == 8:
-            cur.execute("UPDATE players SET is_retired=1, value=0, club_id = null WHERE id=?", (player_id,))
-            maybe_convert_to_staff(conn, player_id)
-            
-                    
-        
-            # 3) Spawn regen: 50% same club, 50% free agent (no club)
-            same_club = (random.random() < 0.5)
-            regen_club_id = club_id if same_club else None
-        
-            # Keep pedigree in fame/value even if free: use former club's fame
-            row = cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,)).fetchone()
-            club_fame = row[0] if row else 1000
-        
-            youth, youth_attr, contract = generate_player(
-                GAME_DATE, fakers,
-                position=pos,
-                club_id=regen_club_id,     # None => free agent
-                club_fame=club_fame,
-                force_youth=True
-            )
-        
-            # players
-            cur.execute("""
-                INSERT INTO players (
-                    first_name, last_name, date_of_birth, nationality,
-                    position, club_id, value, fame, peak_fame
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, youth)
-            new_id = cur.lastrowid
-            
-            
-            # players_positions
-            positions, foot = random_positions_and_foot(pos)  # ← uses the primary 'pos' you passed to generate_player
-            for p in positions:
-                cur.execute("""
-                    INSERT OR IGNORE INTO players_positions (player_id, position, foot)
-                    VALUES (?, ?, ?)
-                """, (new_id, p, foot))
-
-        
-            # players_attr (incl. at_sexatract)
-            cur.execute("""
-                INSERT INTO players_attr (
-                    player_id,
-                    at_luck, at_selfcont, at_honour, at_crazyness, at_working,
-                    at_sexatract, at_friendship, at_speed, at_dribbling,
-                    at_goalkeeping, at_defending, at_passing, at_scoring,
-                    at_happiness, at_confidence, at_hope,
-                    at_curr_ability, at_pot_ability
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (new_id, *youth_attr))
-        
-            # players_contract only if the regen actually has a club
-            if contract[0] is not None:  # contract = (club_id, type, start, end, wage)
-                cur.execute("""
-                    INSERT INTO players_contract (
-                        player_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated
-                    ) VALUES (?, ?, ?, ?, ?, ?, 0)
-                """, (new_id, *contract))
-        
-            # done with this retired player
-            continue    
-
-
-        # --- Base growth (slower) ---
-        dev_gap = max(0, pot_ability - curr_ability)
-        if age < 20:
-            growth = dev_gap * 0.010
-        elif age < 23:
-            growth = dev_gap * 0.008
-        elif age < 27:
-            growth = dev_gap * 0.004
-        elif age < 30:
-            growth = dev_gap * 0.001
-        else:
-            growth = -curr_ability * 0.0015  # gentle decline
-
-        # Staff multipliers (cached)
-        if club_id not in staff_cache:
-            staff_cache[club_id] = compute_staff_multipliers(cur, club_id)
-        mult = staff_cache[club_id]
-
-        if pos == "GK":
-            growth *= mult["gk"]
-        elif pos in ("CB", "RB", "LB", "CDM"):
-            growth *= mult["def"]
-        elif pos in ("CM", "CAM", "RM", "LM"):
-            growth *= mult["pass"]
-        elif pos in ("ST", "CF", "FW", "LW", "RW"):
-            growth *= mult["shoot"]
-
-        # --- Cap yearly ability change ---
-        raw_new_ca = curr_ability + growth
-        raw_new_ca = max(100, min(raw_new_ca, pot_ability))
-        ca_delta = raw_new_ca - curr_ability
-
-        # Hard caps by age band to avoid spikes
-        if age < 20:
-            cap_up = 8
-        elif age < 23:
-            cap_up = 6
-        elif age < 27:
-            cap_up = 4
-        elif age < 30:
-            cap_up = 2
-        else:
-            cap_up = 0  # no growth after 30 (decline allowed)
-
-        cap_down = -4 if age >= 30 else -2
-        ca_delta = max(cap_down, min(ca_delta, cap_up))
-        new_curr_ability = int(round(curr_ability + ca_delta))
-
-        # Relative growth factor for attributes
-        growth_factor = (new_curr_ability - curr_ability) / max(1, curr_ability)
-
-        # --- Key attributes by position ---
-        if pos == "GK":
-            key_attrs = {"goalkeeping", "defending"}
-        elif pos in ("CB", "LB", "RB", "CDM"):
-            key_attrs = {"defending", "passing"}
-        elif pos in ("CM", "LM", "RM", "CAM", "AM"):
-            key_attrs = {"passing", "dribbling"}
-        else:  # forwards
-            key_attrs = {"scoring", "dribbling"}
-
-        # --- Mental progression (guaranteed small steps) ---
-        # Use % of headroom with min/max step so rounding never kills it.
-        def step_up(value, rate, max_step):
-            head = 2000 - value
-            delta = max(1, min(max_step, head * rate))
-            return clamp(value + delta)
-
-        def step_down(value, rate, max_step):
-            excess = value - 100
-            delta = max(1, min(max_step, excess * rate))
-            return clamp(value - delta)
-
-        selfcont   = step_up(selfcont,   0.004, 5)                 # +1..5
-        honour     = step_up(honour,     0.003, 4)                 # +1..4
-        crazyness  = step_down(crazyness,0.002, 3)                 # -1..3
-        working    = step_up(working,    0.004 * mult["def"], 5)   # +1..5, staff helps
-        sexatract  = step_down(sexatract,0.003, 5)                 # -1..5
-
-        # --- Technical / physical progression ---
-        attr_map = {
-            "speed": speed,
-            "dribbling": dribbling,
-            "defending": defending,
-            "passing": passing,
-            "scoring": scoring,
-            "goalkeeping": goalkeeping
-        }
-
-        new_attrs = {}
-        for name, value in attr_map.items():
-            if name in key_attrs:
-                # Follow CA growth but modestly; add small randomness
-                delta = value * growth_factor * random.uniform(0.5, 0.8)
-                delta = max(-5, min(8, delta))  # hard cap per year
-            else:
-                # Secondary slower
-                delta = value * growth_factor * random.uniform(0.1, 0.3)
-                # Aging drag on secondary after 30
-                if age > 30:
-                    delta -= value * 0.0008 * (age - 30)
-                delta = max(-4, min(5, delta))
-            new_attrs[name] = clamp(value + delta)
-
-        # Fame / value
-        club_fame = cur.execute("SELECT fame FROM clubs WHERE id=?", (club_id,)).fetchone()
-        fame_val = club_fame[0] if club_fame else 1000
-        value = calculate_player_value(new_curr_ability, pot_ability, age, fame=fame_val)
-        fame = calculate_player_fame(age, new_curr_ability, fame_val)
-
-        # Apply updates
-        cur.execute("""
-            UPDATE players_attr SET
-                at_selfcont=?, at_honour=?, at_crazyness=?, at_working=?, at_sexatract=?,
-                at_speed=?, at_dribbling=?, at_defending=?, at_passing=?,
-                at_scoring=?, at_goalkeeping=?, at_curr_ability=?
-            WHERE player_id=?
-        """, (
-            selfcont, honour, crazyness, working, sexatract,
-            new_attrs["speed"], new_attrs["dribbling"], new_attrs["defending"],
-            new_attrs["passing"], new_attrs["scoring"], new_attrs["goalkeeping"],
-            new_curr_ability, player_id
-        ))
-
-        cur.execute("UPDATE players SET value=?, fame=? WHERE id=?", (value, fame, player_id))
+    progress_players(cur, players, ages, draws)
 
+    # Attributes touched every squad
+    club_versions.bump_all(rosters=False)
     conn.commit()
 
 
@@ -1465,9 +1563,11 @@ def clean_player_situ():
 # -----------------------------
 # Game loop & date management
 # -----------------------------
-def update_game_date_db():
+def update_game_date_db(conn=None):
     global SEASON
-    conn = sqlite3.connect(DB_PATH)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Always update the GAME_DATE
@@ -1505,11 +1605,12 @@ def update_game_date_db():
         print(f"📅 Season rolled over → {new_season}")
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 def advance_game_day(current_date):
-    return current_date + relativedelta(days=1)
+    return current_date + timedelta(days=1)
 
 
 
@@ -1542,33 +1643,17 @@ def ensure_league_links_schema(cur):
     cur.execute("CREATE INDEX IF NOT EXISTS idx_movements_season    ON league_movements(season)")
 
 
-def get_sorted_table_for_league(cur, league_id: int):
+def get_sorted_table_for_league(cur, league_id: int, season=None):
     """
     Returns list of club_ids sorted by points DESC, goal_diff DESC, goals_for DESC.
-    Assumes competition_id == league_id for league fixtures.
+    Reads the standings table (latest season of the league unless `season` is given);
+    falls back to the league's current members by id if it has no standings yet.
     """
-    cur.execute("""
-        SELECT c.id AS club_id,
-               COALESCE(SUM(
-                 CASE
-                   WHEN f.home_club_id=c.id AND f.home_goals>f.away_goals THEN 3
-                   WHEN f.away_club_id=c.id AND f.away_goals>f.home_goals THEN 3
-                   WHEN f.home_goals=f.away_goals AND (f.home_club_id=c.id OR f.away_club_id=c.id) THEN 1
-                   ELSE 0
-                 END
-               ),0) AS pts,
-               COALESCE(SUM(CASE WHEN f.home_club_id=c.id THEN f.home_goals ELSE f.away_goals END),0) AS gf,
-               COALESCE(SUM(CASE WHEN f.home_club_id=c.id THEN f.away_goals ELSE f.home_goals END),0) AS ga
-        FROM clubs c
-        LEFT JOIN fixtures f
-               ON (f.home_club_id=c.id OR f.away_club_id=c.id)
-              AND f.competition_id=?
-              AND f.played=1
-        WHERE c.league_id=?
-        GROUP BY c.id
-        ORDER BY pts DESC, (gf-ga) DESC, gf DESC, c.id ASC
-    """, (league_id, league_id))
-    return [r[0] for r in cur.fetchall()]
+    table = decision_making.get_league_table(cur, league_id, season)
+    if not table:
+        cur.execute("SELECT id FROM clubs WHERE league_id=? ORDER BY id", (league_id,))
+        table = [r[0] for r in cur.fetchall()]
+    return table
 
 
 def apply_promotions_and_relegations(conn, season_str: str, apply_date: date):
@@ -1646,8 +1731,13 @@ def sync_clubs_competition(cur):
     ensure it has a row with competition_id == its current league_id.
     If a row already exists with the previous league, update it; if missing, insert it.
     """
-    # Clubs that have any league row in clubs_competition
-    cur.execute("SELECT club_id, competition_id FROM clubs_competition")
+    # Clubs that have any league row in clubs_competition (cup rows are left alone)
+    cur.execute("""
+        SELECT cc.club_id, cc.competition_id
+        FROM clubs_competition cc
+        JOIN competitions co ON co.id = cc.competition_id
+        WHERE COALESCE(co.is_league, 0) = 1
+    """)
     cc_map = {}
     for club_id, comp_id in cur.fetchall():
         cc_map.setdefault(club_id, set()).add(comp_id)
@@ -1659,32 +1749,30 @@ def sync_clubs_competition(cur):
         seen = cc_map.get(club_id, set())
         if league_id in seen:
             # already correct somewhere, but you may want to collapse duplicates:
-            cur.execute("""
-                DELETE FROM clubs_competition
-                WHERE club_id=? AND competition_id != ?
-            """, (club_id, league_id))
+            for dup in seen - {league_id}:
+                cur.execute("DELETE FROM clubs_competition WHERE club_id=? AND competition_id=?", (club_id, dup))
         else:
             # update one existing row if any; otherwise insert
             if seen:
-                old = next(iter(seen))
+                old = min(seen)
                 cur.execute("""
                     UPDATE clubs_competition
-                       SET competition_id=?
+                       SET competition_id=?, is_active=1
                      WHERE club_id=? AND competition_id=?
                 """, (league_id, club_id, old))
                 # cleanup other duplicates if they existed
-                cur.execute("""
-                    DELETE FROM clubs_competition
-                    WHERE club_id=? AND competition_id!=?
-                """, (club_id, league_id))
+                for dup in seen - {old}:
+                    cur.execute("DELETE FROM clubs_competition WHERE club_id=? AND competition_id=?", (club_id, dup))
             else:
                 cur.execute("""
                     INSERT INTO clubs_competition(club_id, competition_id)
                     VALUES (?, ?)
                 """, (club_id, league_id))
 
-def handle_promotion_relegation():
-    conn = sqlite3.connect(DB_PATH)
+def handle_promotion_relegation(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # 0) Ensure schema for link-driven promotions/relegations exists
@@ -1711,7 +1799,8 @@ def handle_promotion_relegation():
     sync_clubs_competition(cur)
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ Promotion/Relegation complete for season {last_season}")
 
 
@@ -1833,6 +1922,24 @@ def handle_promotion_relegation():
 #     print(f"✅ Promotion/Relegation complete for season {last_season}")
 
 
+def league_competition_ids(conn):
+    return [r[0] for r in conn.execute("SELECT id FROM competitions WHERE COALESCE(is_league, 0) = 1 ORDER BY id")]
+
+
+def cup_competition_ids(conn):
+    return [r[0] for r in conn.execute("SELECT id FROM competitions WHERE COALESCE(is_cup, 0) = 1 ORDER BY id")]
+
+
+def start_season_competitions(conn):
+    """New league fixtures and cup draws for every competition, in id order."""
+    for comp_id, is_league, is_cup in conn.execute(
+            "SELECT id, is_league, is_cup FROM competitions ORDER BY id").fetchall():
+        if is_league:
+            populate_fixtures(comp_id, conn)
+        elif is_cup:
+            cup_manage(comp_id, conn)
+
+
 def get_last_season(conn):
     """
     Return the most recent finished season string, e.g. '2025/26'.
@@ -1843,214 +1950,227 @@ def get_last_season(conn):
 
 
 
-def game_loop():
-    global GAME_DATE, LEAGUE_ATK_MEAN, LEAGUE_DEF_MEAN
-        
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+class DayTickEngine:
+    """
+    Drives the world one day at a time on a single long-lived connection.
 
-    cur.execute("SELECT COUNT(*) FROM global_val WHERE var_name='GAME_DATE'")
-    if cur.fetchone()[0] == 0:
-        cur.execute("INSERT INTO global_val (var_name, value_date) VALUES (?, ?)", ("GAME_DATE", GAME_DATE.isoformat()))
-        conn.commit()
+    Every subsystem receives the engine's connection, so a day no longer opens
+    and closes its own connections. The commit() calls inside the subsystems
+    are held and the engine commits once every `commit_every` days
+    (1 = one transaction per simulated day).
 
-    print(f"Game started on {GAME_DATE}. Press Enter to tick a day, M for a month, Y for a year, or Q to quit.")
-    while True:
-        user_input = input("Press Enter (1 day), M (1 month), Y (1 year), or Q to quit: ").strip().lower()
-        if user_input == "q":
-            print("Quitting the game...")
-            break
-        elif user_input == "m":
+    With world=True the engine also loads a world_model.WorldModel that serves
+    the transfer AI and match engine from memory; its write-behind rows are
+    flushed at every `world_flush` checkpoint ('day', 'week' or 'month').
 
-            
-          
-            
-            end_date = advance_game_month(GAME_DATE)
-            while GAME_DATE < end_date:
-            
-                if GAME_DATE.day == 1:
-                    process_monthly_finances(conn, GAME_DATE)  
-                    
-                if GAME_DATE.weekday() == 2:
-                    board_satisfaction_and_firing(conn, GAME_DATE)                     
-                    
-                update_game_date_db()
-                
-                # Every day we run the decision making for each club
-                decision_making.decision_making_func(GAME_DATE)
-                
-                
-                simulate_fixtures_for_day(conn, GAME_DATE)
-                if GAME_DATE.month == 8 and GAME_DATE.day == 31:
-                    
-                    # Screenshot of the tables once a year
-                    for table in SNAPSHOT_TABLES:
-                        if SNAPSHOT_TABLES_ACTIVE:
-                            snapshot_table(table, GAME_DATE)
-                        
-                    player_stats_summary_func(DB_PATH)
-                        
-                    # End-of-season board review
-
-                    season_end_board_adjustments(conn, SEASON)
-                    
-                    handle_promotion_relegation()
-                    print("📅 End of season! Resetting fixtures...")
-                    populate_fixtures(1)
-                    populate_fixtures(2)
-                    cup_manage(3)
-                    populate_fixtures(4)
-                    populate_fixtures(5)
-                    cup_manage(6)
-                    LEAGUE_ATK_MEAN = None
-                    LEAGUE_DEF_MEAN = None
-                    
-                    top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5)
-                    
-                    print("✅ New season fixtures generated!")
-                    
-                    renew_expired_contracts(conn, GAME_DATE)        # players
-                    renew_expired_staff_contracts(conn, GAME_DATE)  # staff
-                     
-   
-                if GAME_DATE.weekday() == 4:
-                    cup_manage(3)
-                    cup_manage(6)
-
-                GAME_DATE = advance_game_day(GAME_DATE)
-                cur.execute("UPDATE global_val SET value_date=? WHERE var_name='GAME_DATE'", (GAME_DATE.isoformat(),))
-                conn.commit()
-                if GAME_DATE.weekday() == 0:
-                    update_players_in_db(conn, GAME_DATE)
-                    update_staff_in_db(conn, GAME_DATE)
-                print(f"Game Date: {GAME_DATE}")
-        elif user_input == "y":
+    With sql_profile (or the BAG_SQL_PROFILE environment variable) set to a
+    path, every statement is counted and timed and the top offenders are
+    written there when the engine closes.
 
-            
-          
-            
-            end_date = advance_game_year(GAME_DATE)
-            while GAME_DATE < end_date:
-                if GAME_DATE.day == 1:
-                    process_monthly_finances(conn, GAME_DATE)    
-                
-                if GAME_DATE.weekday() == 2:
-                    board_satisfaction_and_firing(conn, GAME_DATE)  
-                
-                update_game_date_db()
-                
-                # Every day we run the decision making for each club
-                decision_making.decision_making_func(GAME_DATE)                
+    With match_workers > 1 each matchday's competitions are simulated in that
+    many worker processes (results are identical to the in-process run).
 
-                
-                simulate_fixtures_for_day(conn, GAME_DATE)
-                if GAME_DATE.month == 8 and GAME_DATE.day == 31:
-                    
-                    # Screenshot of the tables once a year
-                    for table in SNAPSHOT_TABLES:
-                        if SNAPSHOT_TABLES_ACTIVE:
-                            snapshot_table(table, GAME_DATE)
-                        
-                    player_stats_summary_func(DB_PATH)
-                    
-                    # End-of-season board review
-
-                    season_end_board_adjustments(conn, SEASON)
-                    
-                    handle_promotion_relegation()
-                    print("📅 End of season! Resetting fixtures...")
-                    populate_fixtures(1)
-                    populate_fixtures(2)
-                    cup_manage(3)
-                    populate_fixtures(4)
-                    populate_fixtures(5)
-                    cup_manage(6)
-                    LEAGUE_ATK_MEAN = None
-                    LEAGUE_DEF_MEAN = None
-                    
-                    top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5)
-                    
-                    print("✅ New season fixtures generated!")
-                    
-                    renew_expired_contracts(conn, GAME_DATE)        # players
-                    renew_expired_staff_contracts(conn, GAME_DATE)  # staff
-                    
-                if GAME_DATE.weekday() == 4:
-                    cup_manage(3)
-                    cup_manage(6)
-                    
-                GAME_DATE = advance_game_day(GAME_DATE)
-                cur.execute("UPDATE global_val SET value_date=? WHERE var_name='GAME_DATE'", (GAME_DATE.isoformat(),))
-                conn.commit()
-                if GAME_DATE.weekday() == 0:
-                    update_players_in_db(conn, GAME_DATE)
-                    update_staff_in_db(conn, GAME_DATE)
-                print(f"Game Date: {GAME_DATE}")
-        else:
+    With forecast_sims > 0 every new league season is forecast that many
+    times (season_forecast) and the boards judge their managers against the
+    forecast position instead of the fame rank.
+    """
+
+    def __init__(self, db_path=None, commit_every=1, world=False, world_flush="day", sql_profile=None,
+                 match_workers=0, forecast_sims=0):
+        self.db_path = db_path or DB_PATH
+        self.commit_every = max(1, int(commit_every))
+        self.sql_profile = sql_profile or os.environ.get("BAG_SQL_PROFILE") or None
+        self.profiler = QueryProfiler() if self.sql_profile else None
+        self.conn = open_connection(self.db_path, profiler=self.profiler)
+        self.conn.hold_commits = True
+        upgrade_save_schema(self.conn)
+        # Nothing cached in this process can be trusted against a freshly opened save
+        club_versions.bump_all()
+        self.days_ticked = 0
+        self.days_pending = 0
+        self.matches_played = 0
+        self.match_workers = match_workers
+        self.forecast_sims = forecast_sims
+
+        if world_flush not in world_model.FLUSH_CHECKPOINTS:
+            raise ValueError(f"world_flush must be one of {world_model.FLUSH_CHECKPOINTS}")
+        self.world_flush = world_flush
+        self.world = None
+
+        if perf.RECORDER.run_id is None:
+            perf.RECORDER.configure()  # BAG_PERF env var
+        perf.RECORDER.attach(self.conn)
+        if world:
+            self.world = world_model.WorldModel()
+            self.world.load(self.conn)
+            world_model.activate(self.world)
+
+    @contextlib.contextmanager
+    def outside_world(self, reload=False):
+        """
+        For stages that read and write SQLite directly: pending world rows are
+        written first. Stages that mirror their writes into the world (see
+        world_model) leave it as is; with reload=True it is loaded again
+        afterwards.
+        """
+        if self.world is None:
+            yield
+            return
+        self.world.flush(self.conn)
+        yield
+        if reload:
+            self.world.load(self.conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def ensure_game_date_row(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM global_val WHERE var_name='GAME_DATE'")
+        if cur.fetchone()[0] == 0:
+            cur.execute("INSERT INTO global_val (var_name, value_date) VALUES (?, ?)", ("GAME_DATE", GAME_DATE.isoformat()))
+            self.flush()
+
+    def tick(self):
+        """Simulate GAME_DATE and advance to the next day."""
+        global GAME_DATE
+        conn = self.conn
+        cur = conn.cursor()
+        perf.RECORDER.begin_day(GAME_DATE)
+        day_type = []
+        matches_before = self.matches_played
+        if decision_making.is_window(GAME_DATE):
+            day_type.append("window")
+
+        if GAME_DATE.day == 1:
+            day_type.append("month_start")
+            with self.outside_world():
+                process_monthly_finances(conn, GAME_DATE)
+
+        if GAME_DATE.weekday() == 2:
+            with self.outside_world():
+                board_satisfaction_and_firing(conn, GAME_DATE)
+
+        update_game_date_db(conn)
+
+        # Every day we run the decision making for each club
+        decision_making.decision_making_func(GAME_DATE, conn)
+
+        self.matches_played += simulate_fixtures_for_day(conn, GAME_DATE, workers=self.match_workers)
+        if GAME_DATE.month == 8 and GAME_DATE.day == 31:
+            day_type.append("season_end")
+            with self.outside_world(reload=True), perf.section("season_end"):
 
-            if GAME_DATE.day == 1:
-                process_monthly_finances(conn, GAME_DATE)            
-                
-            if GAME_DATE.weekday() == 2:
-                board_satisfaction_and_firing(conn, GAME_DATE)                 
-            
-            update_game_date_db()
-            
-            # Every day we run the decision making for each club
-            decision_making.decision_making_func(GAME_DATE)
-            
-            simulate_fixtures_for_day(conn, GAME_DATE)
-            if GAME_DATE.month == 8 and GAME_DATE.day == 31:
-                
                 # Screenshot of the tables once a year
                 for table in SNAPSHOT_TABLES:
                     if SNAPSHOT_TABLES_ACTIVE:
-                        snapshot_table(table, GAME_DATE)
-                    
-                player_stats_summary_func(DB_PATH)
-                
+                        snapshot_table(table, GAME_DATE, conn=conn)
+
+                player_stats_summary_func(DB_PATH, conn=conn)
+
                 # End-of-season board review
 
                 season_end_board_adjustments(conn, SEASON)
-                
-                handle_promotion_relegation()
+
+                handle_promotion_relegation(conn)
+
+                # Retirements and regens before the new season is set up and forecast
+                retire_players(conn, GAME_DATE)
+
                 print("📅 End of season! Resetting fixtures...")
-                populate_fixtures(1)
-                populate_fixtures(2)
-                cup_manage(3)
-                populate_fixtures(4)
-                populate_fixtures(5)
-                cup_manage(6)
-                LEAGUE_ATK_MEAN = None
-                LEAGUE_DEF_MEAN = None
-                
-                top_up_free_agents(DB_PATH, GAME_DATE, fakers, per_club=5)
-                
+                start_season_competitions(conn)
+                if self.forecast_sims:
+                    season_forecast.update_board_expectations(conn, self.forecast_sims)
+
+                top_up_free_agents(DB_PATH, GAME_DATE, names, per_club=5, conn=conn)
+
                 print("✅ New season fixtures generated!")
-                
+
                 renew_expired_contracts(conn, GAME_DATE)        # players
                 renew_expired_staff_contracts(conn, GAME_DATE)  # staff
-                
-            if GAME_DATE.weekday() == 4:
-                cup_manage(3)
-                cup_manage(6)
 
-            GAME_DATE = advance_game_day(GAME_DATE)
-            cur.execute("UPDATE global_val SET value_date=? WHERE var_name='GAME_DATE'", (GAME_DATE.isoformat(),))
-            conn.commit()
-            if GAME_DATE.weekday() == 0:
+        if GAME_DATE.weekday() == 4:
+            for cup_id in cup_competition_ids(conn):
+                cup_manage(cup_id, conn)
+
+        GAME_DATE = advance_game_day(GAME_DATE)
+        cur.execute("UPDATE global_val SET value_date=? WHERE var_name='GAME_DATE'", (GAME_DATE.isoformat(),))
+        if GAME_DATE.weekday() == 0:
+            day_type.append("monday")
+            with self.outside_world():
                 update_players_in_db(conn, GAME_DATE)
                 update_staff_in_db(conn, GAME_DATE)
-            print(f"Game Date: {GAME_DATE}")
+        print(f"Game Date: {GAME_DATE}")
+
+        if self.world is not None and world_model.is_checkpoint(self.world_flush, GAME_DATE - timedelta(days=1)):
+            with perf.section("world_flush"):
+                self.world.flush(conn)
+
+        if self.matches_played > matches_before:
+            day_type.insert(0, "matchday")
+        perf.RECORDER.end_day("+".join(day_type) or "quiet")
+
+        self.days_ticked += 1
+        self.days_pending += 1
+        if self.days_pending >= self.commit_every:
+            self.flush()
+
+    def run_until(self, end_date):
+        while GAME_DATE < end_date:
+            self.tick()
+        self.flush()
+
+    def flush(self):
+        """Commit every day simulated since the last flush."""
+        if perf.RECORDER.enabled:
+            perf.RECORDER.write(self.conn)
+        self.conn.flush()
+        self.days_pending = 0
+
+    def close(self):
+        if self.world is not None:
+            self.world.flush(self.conn)
+            world_model.deactivate()
+        self.flush()
+        self.conn.close()
+        shutdown_match_pool()
+        if self.profiler is not None:
+            self.profiler.write_report(self.sql_profile)
+
+
+def game_loop(commit_every=1):
+    global GAME_DATE
+
+    engine = DayTickEngine(commit_every=commit_every)
+    engine.ensure_game_date_row()
 
+    print(f"Game started on {GAME_DATE}. Press Enter to tick a day, M for a month, Y for a year, or Q to quit.")
+    while True:
+        user_input = input("Press Enter (1 day), M (1 month), Y (1 year), or Q to quit: ").strip().lower()
+        if user_input == "q":
+            print("Quitting the game...")
+            break
+        elif user_input == "m":
+            engine.run_until(advance_game_month(GAME_DATE))
+        elif user_input == "y":
+            engine.run_until(advance_game_year(GAME_DATE))
+        else:
+            engine.tick()
+            engine.flush()
 
-    conn.close()
+    engine.close()
 
 
 
 
-def populate_competition_clubs():
-    conn = sqlite3.connect(DB_PATH)
+def populate_competition_clubs(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # 0) Make linking idempotent
@@ -2077,52 +2197,24 @@ def populate_competition_clubs():
             WHERE c.league_id = ?
         """, (comp_id, comp_id))
 
-    # 2) FA Cup: include all English league clubs (from any English league)
-    cur.execute("SELECT id FROM competitions WHERE name = 'FA Cup'")
-    row = cur.fetchone()
-    if row:
-        fa_id = row[0]
-        # Get all English league competition IDs
-        cur.execute("""
-            SELECT id
-            FROM competitions
-            WHERE country='England' AND COALESCE(is_league,0)=1
-        """)
-        eng_league_ids = [r[0] for r in cur.fetchall()]
-
-        if eng_league_ids:
-            placeholders = ",".join("?" * len(eng_league_ids))
-            cur.execute(f"""
-                INSERT OR IGNORE INTO clubs_competition (club_id, competition_id, is_active, round)
-                SELECT c.id, ?, 1, NULL
-                FROM clubs c
-                WHERE c.league_id IN ({placeholders})
-            """, (fa_id, *eng_league_ids))
-            
-    # Copa del Rey
-    cur.execute("SELECT id FROM competitions WHERE name = 'Copa del Rey'")
-    row = cur.fetchone()
-    if row:
-        fa_id = row[0]
-        # Get all Spanish league competition IDs
+    # 2) Cups (FA Cup, Copa del Rey, ...): every club of a league in the cup's country
+    cur.execute("""
+        SELECT id, country
+        FROM competitions
+        WHERE COALESCE(is_cup, 0) = 1
+    """)
+    for cup_id, cup_country in cur.fetchall():
         cur.execute("""
-            SELECT id
-            FROM competitions
-            WHERE country='Spain' AND COALESCE(is_league,0)=1
-        """)
-        eng_league_ids = [r[0] for r in cur.fetchall()]
-
-        if eng_league_ids:
-            placeholders = ",".join("?" * len(eng_league_ids))
-            cur.execute(f"""
-                INSERT OR IGNORE INTO clubs_competition (club_id, competition_id, is_active, round)
-                SELECT c.id, ?, 1, NULL
-                FROM clubs c
-                WHERE c.league_id IN ({placeholders})
-            """, (fa_id, *eng_league_ids))
+            INSERT OR IGNORE INTO clubs_competition (club_id, competition_id, is_active, round)
+            SELECT c.id, ?, 1, NULL
+            FROM clubs c
+            JOIN competitions co ON co.id = c.league_id
+            WHERE co.country = ? AND COALESCE(co.is_league, 0) = 1
+        """, (cup_id, cup_country))
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print("✅ Clubs linked to competitions")
 
 
@@ -2130,9 +2222,12 @@ def populate_competition_clubs():
 
 
 
-def cup_manage(competition_id: int):
+@perf.timed()
+def cup_manage(competition_id: int, conn=None):
 
-    conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
     cur = conn.cursor()
 
     # # Reset cup at the beginning of the season
@@ -2421,13 +2516,16 @@ def cup_manage(competition_id: int):
                 print(f"Second leg for {round_name} created")
 
 
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 
 
-def populate_staff():
-    conn = sqlite3.connect(DB_PATH)
+def populate_staff(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # --- Clubs ---
@@ -2440,7 +2538,8 @@ def populate_staff():
 
     if not clubs:
         print("⚠️ No clubs found.")
-        conn.close()
+        if own_conn:
+            conn.close()
         return
 
     base_roles = ["Manager", "Assistant Coach", "Physio", "Medical", "Scout"]
@@ -2452,15 +2551,14 @@ def populate_staff():
         roles = base_roles + ["Goalkeeping Coach"] + ["Coach"] * 2
 
         for role in roles:
-            faker = Faker()
-            first_name = faker.first_name_male()
-            last_name = faker.last_name()
+            first_name = names.first_name()
+            last_name = names.last_name()
 
             # Nationality (90% local, 10% foreign)
             nationality = club_country if random.random() < 0.9 else random.choice(
                 ["England", "Argentina", "Spain", "Germany", "Netherlands", "France", "Italy"]
             )
-            second_nationality = faker.country() if random.random() < 0.1 else None
+            second_nationality = names.country() if random.random() < 0.1 else None
 
             # Age 30–55 (younger than before so they don’t all retire early)
             age = random.randint(30, 55)
@@ -2533,12 +2631,11 @@ def populate_staff():
 
     for _ in range(50):
         role = random.choice(roles_pool)
-        faker = Faker()
-        first_name = faker.first_name_male()
-        last_name = faker.last_name()
+        first_name = names.first_name()
+        last_name = names.last_name()
 
-        nationality = faker.country()
-        second_nationality = faker.country() if random.random() < 0.1 else None
+        nationality = names.country()
+        second_nationality = names.country() if random.random() < 0.1 else None
 
         age = random.randint(28, 55)
         date_of_birth = date(GAME_DATE.year - age,
@@ -2587,7 +2684,8 @@ def populate_staff():
     """, free_attrs_with_ids)
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
     print(f"✅ {len(free_staff_insert)} free agent staff generated")
 
 
@@ -2686,10 +2784,27 @@ def compute_staff_multipliers(cur, club_id):
         JOIN staff_attr sa ON sa.staff_id = s.id
         WHERE s.club_id = ?
     """, (club_id,))
-    rows = cur.fetchall()
+    return staff_multipliers(cur.fetchall())
+
 
+def staff_multipliers_by_club(cur):
+    """compute_staff_multipliers for every club with staff, in one query."""
+    rows_by_club = {}
+    for club_id, *row in cur.execute("""
+        SELECT s.club_id, s.role, sa.at_goalkeeping, sa.at_tackling, sa.at_passing,
+               sa.at_shooting, sa.at_physio, sa.at_medical, sa.at_scouting
+        FROM staff s
+        JOIN staff_attr sa ON sa.staff_id = s.id
+        WHERE s.club_id IS NOT NULL
+    """).fetchall():
+        rows_by_club.setdefault(club_id, []).append(row)
+    return {club_id: staff_multipliers(rows) for club_id, rows in rows_by_club.items()}
+
+
+def staff_multipliers(rows):
+    """Growth multipliers from a club's (role, goalkeeping, tackling, passing, shooting, physio, medical, scouting) rows."""
     if not rows:
-        return { "gk": 1.0, "def": 1.0, "pass": 1.0, "shoot": 1.0, "fitness": 1.0 }
+        return dict(NEUTRAL_STAFF_MULT)
 
     gk = sum(r[1] for r in rows) / len(rows)
     tackling = sum(r[2] for r in rows) / len(rows)
@@ -2710,6 +2825,8 @@ def compute_staff_multipliers(cur, club_id):
     }
 
 def advance_game_month(current_date):
+    from dateutil.relativedelta import relativedelta
+
     # Advance to the same day next month, or last day if not possible
     try:
         return current_date + relativedelta(months=1)
@@ -2722,6 +2839,8 @@ def advance_game_month(current_date):
 
 
 def advance_game_year(current_date):
+    from dateutil.relativedelta import relativedelta
+
     # Advance to the same day next year, or last day if not possible
     try:
         return current_date + relativedelta(years=1)
@@ -2756,12 +2875,14 @@ def create_histo_table(base_table, db_path=DB_PATH):
     conn.close()
 
 
-def snapshot_table(base_table, game_date, db_path=DB_PATH):
+def snapshot_table(base_table, game_date, db_path=DB_PATH, conn=None):
     """
     Append rows from base_table into base_table_histo
     with GAME_DATE stamped into screenshot_day.
     """
-    conn = sqlite3.connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
     cur = conn.cursor()
 
     histo_table = f"{base_table}_histo"
@@ -2780,7 +2901,8 @@ def snapshot_table(base_table, game_date, db_path=DB_PATH):
     cur.executemany(insert_sql, rows_with_date)
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 import sqlite3
@@ -2824,36 +2946,184 @@ def get_game_date_and_season():
     return game_date, season_str
 
 
+def bootstrap_world(conn, seed=None, size=None):
+    """
+    Build a new game on `conn`: every "new game" stage (schema, clubs,
+    balances, boards, competitions, players, fixtures, cups, staff) on this
+    one connection, with PRAGMA synchronous=OFF and journal_mode=MEMORY
+    while it runs (both are restored afterwards). GAME_DATE must already be
+    the start date.
+
+    seed reseeds `random` (and the name pool) first; SQL RANDOM(), used by
+    the cup draws, is up to the caller's connection. size=(countries,
+    divisions, clubs_per_division) builds synthetic leagues instead of the
+    bundled clubs. Prints and returns the seconds spent per stage.
+    """
+    import time
+
+    if seed is not None:
+        random.seed(seed)
+        names.reset()
+        if size:
+            from faker import Faker
+            Faker.seed(seed)  # synthetic club names
+
+    cur = conn.cursor()
+    conn.commit()  # journal_mode cannot change inside a transaction
+    synchronous = cur.execute("PRAGMA synchronous").fetchone()[0]
+    journal_mode = cur.execute("PRAGMA journal_mode").fetchone()[0]
+    cur.execute("PRAGMA synchronous=OFF")
+    cur.execute("PRAGMA journal_mode=MEMORY").fetchone()
+
+    timings = {}
+
+    @contextlib.contextmanager
+    def stage(name):
+        t0 = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - t0
+
+    try:
+        with stage("init_db"):
+            init_db(DB_PATH, GAME_DATE, conn=conn)
+        with stage("clubs"):
+            if size:
+                populate_synthetic_world(DB_PATH, *size, conn=conn)
+            else:
+                populate_clubs(conn)
+        with stage("club_balances"):
+            initialize_club_balances(conn)
+        with stage("clubs_board"):
+            populate_clubs_board(conn)
+        with stage("competition_clubs"):
+            populate_competition_clubs(conn)
+            update_game_date_db(conn)       # keep GAME_DATE in DB in sync
+        with stage("players"):
+            populate_all_players(DB_PATH, GAME_DATE, names, conn=conn)
+        with stage("fixtures"):
+            depopulate_fixtures(conn)
+            for league_id in league_competition_ids(conn):
+                populate_fixtures(league_id, conn)
+        with stage("cups"):
+            for cup_id in cup_competition_ids(conn):
+                cup_manage(cup_id, conn)
+        with stage("staff"):
+            populate_staff(conn)
+        with stage("cleanup"):
+            depopulate_match_scorers(conn)
+            depopulate_transfers_log(conn)
+    finally:
+        conn.commit()
+        cur.execute(f"PRAGMA journal_mode={journal_mode}").fetchone()
+        cur.execute(f"PRAGMA synchronous={synchronous}")
+    club_versions.bump_all()
+
+    stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    print(f"⏱️ World built in {sum(timings.values()):.2f}s ({stages})")
+    return timings
+
+
+def simulate_headless(seasons=1, days=None, commit_every=30, quiet=False, world=False, world_flush="day",
+                      perf_enabled=None, perf_csv=None, sql_profile=None, match_workers=0,
+                      forecast_sims=0):
+    """
+    Run the world without any input() prompt, starting from the saved
+    GAME_DATE/SEASON. Simulates `seasons` years (or exactly `days` days),
+    prints a throughput summary and returns the final GAME_DATE.
+    """
+    import contextlib
+    import time
+    global GAME_DATE, SEASON
+
+    GAME_DATE, SEASON = get_game_date_and_season()
+    start_date = GAME_DATE
+    if perf_enabled or perf_csv:
+        perf.RECORDER.configure(perf_enabled, perf_csv)
+    if days is not None:
+        end_date = GAME_DATE + timedelta(days=days)
+    else:
+        end_date = GAME_DATE
+        for _ in range(seasons):
+            end_date = advance_game_year(end_date)
+
+    print(f"Simulating {start_date} → {end_date} ({SEASON}) on {DB_PATH}")
+    t0 = time.perf_counter()
+    with DayTickEngine(commit_every=commit_every, world=world, world_flush=world_flush,
+                       sql_profile=sql_profile, match_workers=match_workers,
+                       forecast_sims=forecast_sims) as engine:
+        engine.ensure_game_date_row()
+        if quiet:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                engine.run_until(end_date)
+        else:
+            engine.run_until(end_date)
+        days_done, matches = engine.days_ticked, engine.matches_played
+        report_path = engine.sql_profile
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+
+    print(f"Simulated {days_done} days, {matches} matches in {elapsed:.1f}s "
+          f"({days_done / elapsed:.2f} days/s, {matches / elapsed:.2f} matches/s)")
+    print(f"Final GAME_DATE: {GAME_DATE} (season {SEASON})")
+    if perf.RECORDER.enabled:
+        print(perf.RECORDER.summary())
+        print(f"Per-day timings written to {perf.RECORDER.csv_path or 'perf_log'} (run {perf.RECORDER.run_id})")
+    if report_path:
+        print(f"SQL profile written to {report_path}")
+    return GAME_DATE
+
+
+def parse_cli_args(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BallsAndGlory world simulation")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sim = sub.add_parser("simulate", help="run N seasons headless from the saved game date")
+    sim.add_argument("--seasons", type=int, default=1, help="number of seasons (years) to simulate")
+    sim.add_argument("--days", type=int, default=None, help="simulate exactly this many days instead of whole seasons")
+    sim.add_argument("--db", default=None, help="save file to run on (default: db/fm_database.sqlite)")
+    sim.add_argument("--commit-every", type=int, default=30, help="days per transaction")
+    sim.add_argument("--quiet", action="store_true", help="silence the per-day log while simulating")
+    sim.add_argument("--world", action="store_true", help="serve reads from the in-memory world model")
+    sim.add_argument("--world-flush", choices=world_model.FLUSH_CHECKPOINTS, default="day",
+                     help="how often the world model writes pending rows back (with --world)")
+    sim.add_argument("--perf", action="store_true", help="record per-subsystem timings into the perf_log table")
+    sim.add_argument("--perf-csv", default=None, help="record per-subsystem timings into this CSV instead")
+    sim.add_argument("--sql-profile", default=None, metavar="PATH",
+                     help="count and time every SQL statement and write the top offenders to PATH")
+    sim.add_argument("--match-workers", type=int, default=0, metavar="N",
+                     help="simulate each matchday's competitions in N worker processes")
+    sim.add_argument("--forecast-sims", type=int, default=0, metavar="N",
+                     help="forecast each new season N times and use it as the boards' expectations")
+    return parser.parse_args(argv)
+
+
 
 # -----------------------------
 # Main
 # -----------------------------
 if __name__ == "__main__":
 
- 
+    if len(sys.argv) > 1:
+        args = parse_cli_args(sys.argv[1:])
+        if args.db:
+            DB_PATH = os.path.abspath(args.db)
+            decision_making.DB_PATH = DB_PATH
+        simulate_headless(args.seasons, args.days, args.commit_every, args.quiet, args.world, args.world_flush,
+                          args.perf, args.perf_csv, args.sql_profile, args.match_workers,
+                          args.forecast_sims)
+        sys.exit(0)
 
     user_input = input("Press N for normal start, C to continue last save: ").strip().lower()
     if user_input == "n":
        
         # Normal start       
 
-        init_db(DB_PATH, GAME_DATE)
-        populate_clubs()
-        initialize_club_balances()
-        populate_clubs_board()
-        populate_competition_clubs()
-        update_game_date_db()           # keep GAME_DATE in DB in sync
-        populate_all_players(DB_PATH, GAME_DATE, fakers)
-        depopulate_fixtures()
-        populate_fixtures(1)
-        populate_fixtures(2)
-        populate_fixtures(4)
-        populate_fixtures(5)
-        cup_manage(3)
-        cup_manage(6)
-        populate_staff()
-        depopulate_match_scorers()
-        depopulate_transfers_log()
+        conn = open_connection(DB_PATH)
+        try:
+            bootstrap_world(conn)
+        finally:
+            conn.close()
     
         # Create historical tables    
         for table in SNAPSHOT_TABLES:
@@ -0,0 +1,104 @@
+"""
+Player and staff names without a Faker instance per name.
+
+    names = NamePool(cache_path="db/name_pool.json")
+    names.first_name("Spain"), names.last_name("Spain")
+    names.country()       # a random country name (Faker's default locale)
+
+Building a Faker instance takes tens of milliseconds and every
+first_name_male() / last_name() call goes through its provider machinery.
+NamePool reads the same name lists (and weights) straight from Faker's
+locale providers, each locale on its first name, and draws names from the
+shared `random` in batches of `batch` with random.choices. With a
+cache_path the lists are kept in a local JSON file, so later runs do not
+import Faker at all. Nothing is loaded until the first name is drawn.
+
+Seeding `random` alone does not make names reproducible while drawn batches
+are still buffered: call reset() after seeding.
+"""
+import importlib
+import itertools
+import json
+import os
+import random
+
+# Nationality label -> Faker locale ("Random" is Faker()'s default locale)
+NATIONALITY_LOCALES = {
+    "England": "en_GB",
+    "Argentina": "es_AR",
+    "Spain": "es_ES",
+    "Germany": "de_DE",
+    "Netherlands": "nl_NL",
+    "France": "fr_FR",
+    "Italy": "it_IT",
+    "Random": "en_US",
+}
+DEFAULT_NATIONALITY = "Random"
+COUNTRIES_LOCALE = "en_US"
+
+
+def _weighted(elements):
+    """(names, cumulative weights or None) from a Faker provider tuple or OrderedDict."""
+    if isinstance(elements, dict):
+        return list(elements), list(itertools.accumulate(elements.values()))
+    return list(elements), None
+
+
+def faker_list(locale, kind):
+    """(names, cum_weights) of a Faker locale: male first names, last names or countries."""
+    if kind == "country":
+        return _weighted(importlib.import_module(f"faker.providers.address.{locale}").Provider.countries)
+    provider = importlib.import_module(f"faker.providers.person.{locale}").Provider
+    if kind == "first":
+        return _weighted(getattr(provider, "first_names_male", None) or provider.first_names)
+    return _weighted(provider.last_names)
+
+
+class NamePool:
+
+    def __init__(self, locales=None, cache_path=None, batch=256):
+        self.locales = dict(locales or NATIONALITY_LOCALES)
+        self.cache_path = cache_path
+        self.batch = batch
+        self.lists = {}        # "locale:kind" -> (names, cum_weights)
+        self.cache_read = False
+        self.buffers = {}      # (locale, kind) -> names drawn ahead
+
+    def choices(self, locale, kind):
+        """(names, cum_weights) for a locale and kind, from the cache file or else from Faker."""
+        key = f"{locale}:{kind}"
+        if key not in self.lists and self.cache_path and not self.cache_read:
+            self.cache_read = True
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, encoding="utf-8") as f:
+                    self.lists.update(json.load(f))
+        if key not in self.lists:
+            self.lists[key] = faker_list(locale, kind)
+            if self.cache_path:
+                with open(self.cache_path, "w", encoding="utf-8") as f:
+                    json.dump(self.lists, f, ensure_ascii=False)
+        return self.lists[key]
+
+    def reset(self):
+        """Drop the names drawn ahead (after reseeding `random`)."""
+        self.buffers.clear()
+
+    def locale(self, nationality):
+        return self.locales.get(nationality, self.locales[DEFAULT_NATIONALITY])
+
+    def _draw(self, locale, kind):
+        buffer = self.buffers.get((locale, kind))
+        if not buffer:
+            names, cum_weights = self.choices(locale, kind)
+            buffer = self.buffers[locale, kind] = random.choices(names, cum_weights=cum_weights, k=self.batch)
+        return buffer.pop()
+
+    def first_name(self, nationality=DEFAULT_NATIONALITY):
+        return self._draw(self.locale(nationality), "first")
+
+    def last_name(self, nationality=DEFAULT_NATIONALITY):
+        return self._draw(self.locale(nationality), "last")
+
+    def country(self):
+        return self._draw(COUNTRIES_LOCALE, "country")
+
@@ -0,0 +1,152 @@
+"""
+Per-subsystem timing for the daily tick.
+
+    with perf.section("simulate_fixtures_for_day"):
+        ...
+
+    @perf.timed("update_players_in_db")
+    def update_players_in_db(...): ...
+
+Each section records wall time, SQL statements run and rows changed on the
+attached connection. Recording is off unless the BAG_PERF environment variable
+is set (or `main_loop.py simulate --perf` / `--perf-csv` is used). Disabled
+sections cost one attribute check.
+
+BAG_PERF=1          -> rows go to the perf_log table of the save
+BAG_PERF=<file.csv> -> rows are appended to that CSV instead
+"""
+import csv
+import functools
+import os
+import time
+from datetime import datetime
+
+PERF_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS perf_log (
+        run_id TEXT NOT NULL,
+        game_date DATE NOT NULL,
+        day_type TEXT,
+        section TEXT NOT NULL,
+        seconds REAL,
+        statements INTEGER,
+        rows_changed INTEGER
+    )
+"""
+
+PERF_COLUMNS = ("run_id", "game_date", "day_type", "section", "seconds", "statements", "rows_changed")
+
+
+class PerfRecorder:
+
+    def __init__(self):
+        self.enabled = False
+        self.csv_path = None
+        self.conn = None
+        self.run_id = None
+        self.game_date = None
+        self.day_rows = []     # sections of the day being simulated
+        self.pending = []      # finished rows not written yet
+        self.totals = {}       # (day_type, section) -> [days, seconds, statements, rows]
+
+    def configure(self, enabled=None, csv_path=None):
+        """Enable from arguments, or from BAG_PERF when both are None."""
+        if enabled is None and csv_path is None:
+            env = os.environ.get("BAG_PERF", "").strip()
+            if env.lower().endswith(".csv"):
+                csv_path = env
+            enabled = bool(env) and env != "0"
+        self.enabled = bool(enabled or csv_path)
+        self.csv_path = csv_path
+        self.run_id = datetime.now().isoformat(timespec="seconds")
+        return self.enabled
+
+    def attach(self, conn):
+        """Measure statements/rows on `conn` (a db_connection.SimConnection)."""
+        self.conn = conn
+        if self.enabled and conn is not None:
+            conn.count_statements(True)
+
+    def begin_day(self, game_date):
+        self.game_date = game_date
+        self.day_rows = []
+
+    def end_day(self, day_type):
+        """Label the day's sections (e.g. 'matchday+window') and queue them for writing."""
+        for section, seconds, statements, rows in self.day_rows:
+            self.pending.append((self.run_id, self.game_date.isoformat(), day_type, section, seconds, statements, rows))
+            tot = self.totals.setdefault((day_type, section), [0, 0.0, 0, 0])
+            tot[0] += 1
+            tot[1] += seconds
+            tot[2] += statements
+            tot[3] += rows
+        self.day_rows = []
+
+    def record(self, section, seconds, statements, rows):
+        self.day_rows.append((section, seconds, statements, rows))
+
+    def write(self, conn=None):
+        """Write queued rows to the CSV or to perf_log on `conn` (default: the attached connection)."""
+        if not self.pending:
+            return
+        if self.csv_path:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="") as fh:
+                writer = csv.writer(fh)
+                if new_file:
+                    writer.writerow(PERF_COLUMNS)
+                writer.writerows(self.pending)
+        else:
+            conn = conn or self.conn
+            conn.execute(PERF_LOG_DDL)
+            conn.executemany(f"INSERT INTO perf_log ({', '.join(PERF_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             self.pending)
+        self.pending = []
+
+    def summary(self):
+        """Average cost per day of each section, grouped by day type."""
+        lines = [f"{'day type':<28}{'section':<30}{'days':>6}{'ms/day':>10}{'stmts/day':>11}{'rows/day':>10}"]
+        for (day_type, section), (days, secs, stmts, rows) in sorted(self.totals.items()):
+            lines.append(f"{day_type:<28}{section:<30}{days:>6}{secs * 1000 / days:>10.1f}"
+                         f"{stmts / days:>11.0f}{rows / days:>10.0f}")
+        return "\n".join(lines)
+
+
+RECORDER = PerfRecorder()
+
+
+class section:
+    """Context manager recording one subsystem run into RECORDER."""
+    __slots__ = ("name", "t0", "s0", "r0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if RECORDER.enabled:
+            conn = RECORDER.conn
+            self.s0 = conn.statements if conn is not None else 0
+            self.r0 = conn.total_changes if conn is not None else 0
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if RECORDER.enabled:
+            elapsed = time.perf_counter() - self.t0
+            conn = RECORDER.conn
+            statements = conn.statements - self.s0 if conn is not None else 0
+            rows = conn.total_changes - self.r0 if conn is not None else 0
+            RECORDER.record(self.name, elapsed, statements, rows)
+        return False
+
+
+def timed(name=None):
+    """Decorator form of `section`; defaults to the function name."""
+    def wrap(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with section(label):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
@@ -0,0 +1,104 @@
+"""
+Role scores for the transfer AI: how good a player is in a position.
+
+    score = 60% current ability + 40% average of the position's key attributes
+
+There are only four sets of key attributes (goalkeepers, defenders,
+midfielders, everyone else), so ROLE_SCORES keeps four scores per player.
+They are loaded in bulk on first use and after that only recomputed for the
+players the weekly progression pass changes (update_players_in_db).
+Per-club depth charts built from these scores live in the club's tactical
+profile (club_tactics).
+"""
+import numpy as np
+
+import club_versions
+
+ATTR_COLUMNS = ("at_curr_ability", "at_goalkeeping", "at_defending", "at_passing",
+                "at_dribbling", "at_scoring", "at_speed")
+
+KEY_ATTRS = (
+    ("at_goalkeeping", "at_defending"),          # GK
+    ("at_defending", "at_passing"),              # CB, RB, LB
+    ("at_passing", "at_dribbling"),              # CM, RM, LM
+    ("at_scoring", "at_dribbling", "at_speed"),  # forwards / wingers (and the rest)
+)
+SCORE_GROUP = {"GK": 0, "CB": 1, "RB": 1, "LB": 1, "CM": 2, "RM": 2, "LM": 2}
+OTHER_GROUP = 3
+
+
+def score_group(pos):
+    return SCORE_GROUP.get(pos, OTHER_GROUP)
+
+
+def key_attrs_for_pos(pos):
+    """Return the list of key attribute column names for a position."""
+    return list(KEY_ATTRS[score_group(pos)])
+
+
+def role_scores(attrs):
+    """The four group scores of one player, from a {column: value} mapping."""
+    ca = attrs["at_curr_ability"]
+    scores = []
+    for keys in KEY_ATTRS:
+        key_avg = sum(attrs[a] for a in keys) / len(keys)
+        scores.append(int(0.60 * ca + 0.40 * key_avg))
+    return tuple(scores)
+
+
+def score_table(table):
+    """role_scores for many players at once: an (n, ATTR_COLUMNS) array in, (n, 4) ints out."""
+    col = {name: table[:, i] for i, name in enumerate(ATTR_COLUMNS)}
+    groups = []
+    for keys in KEY_ATTRS:
+        key_avg = sum(col[a] for a in keys) / len(keys)
+        groups.append((0.60 * col["at_curr_ability"] + 0.40 * key_avg).astype(np.int64))
+    return np.column_stack(groups)
+
+
+class RoleScoreCache:
+
+    def __init__(self):
+        self.scores = {}  # player_id -> score per KEY_ATTRS group
+        self.epoch = None
+
+    def ensure_loaded(self, cur):
+        # A fresh save (club_versions.bump_all()) invalidates every score
+        if self.epoch != club_versions.roster_epoch():
+            self.load(cur)
+
+    def load(self, cur):
+        """Score every player with attributes in one query."""
+        cur.execute(f"SELECT player_id, {', '.join(ATTR_COLUMNS)} FROM players_attr")
+        rows = cur.fetchall()
+        self.scores = {}
+        if rows:
+            table = np.array(rows, dtype=np.int64)
+            self.update_many(table[:, 0].tolist(), table[:, 1:])
+        self.epoch = club_versions.roster_epoch()
+
+    def update(self, player_id, attrs):
+        """Rescore a player whose attributes changed ({column: value}, every ATTR_COLUMNS entry)."""
+        self.scores[player_id] = role_scores(attrs)
+
+    def update_many(self, player_ids, table):
+        """Rescore players from an (n, ATTR_COLUMNS) array of their new attributes."""
+        self.scores.update(zip(player_ids, map(tuple, score_table(table).tolist())))
+
+    def forget(self, player_id):
+        """Drop a player (retired, or new and scored on first use)."""
+        self.scores.pop(player_id, None)
+
+    def score(self, cur, player_id, pos):
+        self.ensure_loaded(cur)
+        scores = self.scores.get(player_id)
+        if scores is None:
+            row = cur.execute(f"SELECT {', '.join(ATTR_COLUMNS)} FROM players_attr WHERE player_id=?",
+                              (player_id,)).fetchone()
+            if not row:
+                return 0
+            scores = self.scores[player_id] = role_scores(dict(zip(ATTR_COLUMNS, row)))
+        return scores[score_group(pos)]
+
+
+ROLE_SCORES = RoleScoreCache()
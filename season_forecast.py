@@ -0,0 +1,284 @@
+"""
+Monte Carlo forecast of how a league season ends.
+
+    fc = forecast_league(conn, league_id, sims=10000)
+    fc.title_probs()         # per club, same order as fc.club_ids
+    fc.relegation_probs()
+    fc.position_probs        # [club, position] probabilities
+    print(fc.report(names))
+
+The remaining fixtures are played `sims` times at once: the expected goals
+come from the match engine's model (base_expected_goals with the clubs'
+cached strengths, formation, fame and form as they are now), the goals from
+sample_goals, and every simulated table is ranked like get_league_table
+(points, goal difference, goals scored, club id).
+
+update_board_expectations() stores a forecast per league in the
+board_expectations table, which the board then uses as the club's expected
+position instead of its fame rank.
+
+    python season_forecast.py [--league ID] [--sims N] [--db PATH]
+"""
+import random
+from dataclasses import dataclass
+
+import numpy as np
+
+import fixture_calculation as fc
+from db_population import BOARD_EXPECTATIONS_DDL
+
+DEFAULT_SIMS = 10000
+SIMS_PER_CHUNK = 2000  # simulated seasons held in memory at once
+
+
+@dataclass
+class LeagueForecast:
+    competition_id: int
+    season: str
+    club_ids: list              # ascending id, the order of every array below
+    position_probs: np.ndarray  # [club, position - 1]
+    expected_points: np.ndarray
+    promotion_slots: int
+    relegation_slots: int
+    sims: int
+
+    def title_probs(self):
+        return self.position_probs[:, 0]
+
+    def promotion_probs(self):
+        return self.position_probs[:, :self.promotion_slots].sum(axis=1)
+
+    def relegation_probs(self):
+        if not self.relegation_slots:
+            return np.zeros(len(self.club_ids))
+        return self.position_probs[:, -self.relegation_slots:].sum(axis=1)
+
+    def mean_positions(self):
+        return self.position_probs @ np.arange(1, len(self.club_ids) + 1)
+
+    def expected_positions(self):
+        """{club_id: 1..n}, clubs ranked by mean finishing position (ties: more points first)."""
+        order = np.lexsort((-self.expected_points, self.mean_positions()))
+        return {self.club_ids[i]: pos + 1 for pos, i in enumerate(order)}
+
+    def rows(self):
+        """(club_id, expected position, mean position, points, title, promotion, relegation), best first."""
+        expected = self.expected_positions()
+        mean_pos, title = self.mean_positions(), self.title_probs()
+        promo, releg = self.promotion_probs(), self.relegation_probs()
+        rows = [
+            (cid, expected[cid], float(mean_pos[i]), float(self.expected_points[i]),
+             float(title[i]), float(promo[i]), float(releg[i]))
+            for i, cid in enumerate(self.club_ids)
+        ]
+        return sorted(rows, key=lambda r: r[1])
+
+    def report(self, names=None):
+        names = names or {}
+        lines = [f"📈 Forecast for competition {self.competition_id} ({self.season}), {self.sims} simulations",
+                 f"{'pos':>4}  {'club':<28}{'avg pos':>8}{'pts':>7}{'title':>8}"
+                 f"{'promo':>8}{'releg':>8}"]
+        for cid, pos, mean_pos, pts, title, promo, releg in self.rows():
+            lines.append(f"{pos:>4}  {str(names.get(cid, cid))[:27]:<28}{mean_pos:>8.1f}{pts:>7.1f}"
+                         f"{title:>8.1%}{promo:>8.1%}{releg:>8.1%}")
+        return "\n".join(lines)
+
+
+def league_slots(cur, league_id):
+    """(promotion, relegation) places of a league according to league_links."""
+    promo = cur.execute("""
+        SELECT COALESCE(SUM(promote_automatic), 0) FROM league_links
+        WHERE child_league_id = ? AND is_active = 1
+    """, (league_id,)).fetchone()[0]
+    releg = cur.execute("""
+        SELECT COALESCE(SUM(relegate_automatic), 0) FROM league_links
+        WHERE parent_league_id = ? AND is_active = 1
+    """, (league_id,)).fetchone()[0]
+    return promo, releg
+
+
+def load_league_state(cur, league_id, season=None):
+    """
+    (season, club_ids, points, goals_for, goals_against, remaining) from the
+    standings table (latest season unless given); remaining is a list of
+    (home_id, away_id) for the unplayed fixtures.
+    """
+    if season is None:
+        season = cur.execute("SELECT MAX(season) FROM standings WHERE competition_id = ?",
+                             (league_id,)).fetchone()[0]
+    cur.execute("""
+        SELECT club_id, points, goals_for, goals_against
+        FROM standings
+        WHERE competition_id = ? AND season = ?
+        ORDER BY club_id
+    """, (league_id, season))
+    table = cur.fetchall()
+    cur.execute("""
+        SELECT home_club_id, away_club_id
+        FROM fixtures
+        WHERE competition_id = ? AND season = ? AND played = 0
+        ORDER BY fixture_date, id
+    """, (league_id, season))
+    remaining = cur.fetchall()
+    club_ids = [r[0] for r in table]
+    points = np.array([r[1] for r in table], dtype=np.float64)
+    goals_for = np.array([r[2] for r in table], dtype=np.float64)
+    goals_against = np.array([r[3] for r in table], dtype=np.float64)
+    return season, club_ids, points, goals_for, goals_against, remaining
+
+
+def fixture_rates(conn, league_id, club_ids, remaining):
+    """Noise-free (home, away) expected goals of each remaining fixture, as two arrays."""
+    cur = conn.cursor()
+    fc.STRENGTH_CACHE.ensure_fresh(cur, club_ids)
+    attack, defense, fame, form = {}, {}, {}, {}
+    for cid in club_ids:
+        atk, dfn = fc.team_strengths(cur, cid)
+        atk_mult, def_mult = fc.formation_modifiers(cur, cid)
+        attack[cid], defense[cid] = atk * atk_mult, dfn * def_mult
+        fame[cid] = fc.fame_effect(fc.get_club_fame(cur, cid))
+        form[cid] = fc.get_team_form(cur, cid)
+    atk_mean, def_mean = fc.compute_comp_strength_baselines(conn, league_id)
+
+    home = [h for h, _a in remaining]
+    away = [a for _h, a in remaining]
+
+    def column(values, ids):
+        return np.array([values[c] for c in ids], dtype=np.float64)
+
+    home_rate = fc.base_expected_goals(column(attack, home), column(defense, away), column(fame, home),
+                                       column(form, home), True, atk_mean, def_mean)
+    away_rate = fc.base_expected_goals(column(attack, away), column(defense, home), column(fame, away),
+                                       column(form, away), False, atk_mean, def_mean)
+    return home_rate, away_rate
+
+
+def forecast_league(conn, league_id, season=None, sims=DEFAULT_SIMS, seed=None):
+    """
+    Simulate the rest of a league season `sims` times; returns a
+    LeagueForecast (None if the league has no standings). Without a seed the
+    generator is seeded from `random`, so a seeded game forecasts the same.
+    """
+    cur = conn.cursor()
+    season, club_ids, points, goals_for, goals_against, remaining = load_league_state(cur, league_id, season)
+    n = len(club_ids)
+    if not n:
+        return None
+    promo, releg = league_slots(cur, league_id)
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+    index = {cid: i for i, cid in enumerate(club_ids)}
+    remaining = [(h, a) for h, a in remaining if h in index and a in index]
+    # One-hot fixture -> club matrices: per-fixture numbers @ H gives per-club totals
+    home_onehot = np.zeros((len(remaining), n))
+    away_onehot = np.zeros((len(remaining), n))
+    for k, (h, a) in enumerate(remaining):
+        home_onehot[k, index[h]] = 1.0
+        away_onehot[k, index[a]] = 1.0
+    if remaining:
+        home_rate, away_rate = fixture_rates(conn, league_id, club_ids, remaining)
+
+    counts = np.zeros(n * n, dtype=np.int64)
+    points_total = np.zeros(n)
+    positions = np.arange(n)
+    done = 0
+    while done < sims:
+        size = min(SIMS_PER_CHUNK, sims - done)
+        pts = np.broadcast_to(points, (size, n))
+        gf = np.broadcast_to(goals_for, (size, n))
+        ga = np.broadcast_to(goals_against, (size, n))
+        if remaining:
+            # Same noise and clamp as expected_goals_local, per simulated match
+            home_lam = np.clip(home_rate * rng.uniform(0.97, 1.03, (size, len(remaining))), 0.3, 1.8)
+            away_lam = np.clip(away_rate * rng.uniform(0.97, 1.03, (size, len(remaining))), 0.3, 1.8)
+            hg = fc.sample_goals(home_lam, rng)
+            ag = fc.sample_goals(away_lam, rng)
+            home_pts = 3.0 * (hg > ag) + (hg == ag)
+            away_pts = 3.0 * (ag > hg) + (hg == ag)
+            pts = pts + home_pts @ home_onehot + away_pts @ away_onehot
+            gf = gf + hg @ home_onehot + ag @ away_onehot
+            ga = ga + ag @ home_onehot + hg @ away_onehot
+        # Rank like get_league_table; lexsort is stable, so ties stay in club id order
+        order = np.lexsort((-gf, -(gf - ga), -pts), axis=-1)
+        counts += np.bincount((order * n + positions).ravel(), minlength=n * n)
+        points_total += pts.sum(axis=0)
+        done += size
+
+    return LeagueForecast(
+        competition_id=league_id,
+        season=season,
+        club_ids=club_ids,
+        position_probs=counts.reshape(n, n) / sims,
+        expected_points=points_total / sims,
+        promotion_slots=promo,
+        relegation_slots=releg,
+        sims=sims,
+    )
+
+
+def forecast_all_leagues(conn, sims=DEFAULT_SIMS, seed=None):
+    """{league_id: LeagueForecast} for every league competition with standings."""
+    league_ids = [r[0] for r in conn.execute("SELECT id FROM competitions WHERE is_league = 1 ORDER BY id")]
+    rng = random.Random(seed) if seed is not None else random
+    forecasts = {}
+    for league_id in league_ids:
+        forecast = forecast_league(conn, league_id, sims=sims, seed=rng.getrandbits(64))
+        if forecast is not None:
+            forecasts[league_id] = forecast
+    return forecasts
+
+
+def store_board_expectations(conn, forecasts):
+    """Write LeagueForecasts to board_expectations (one row per club, replacing the season's rows)."""
+    conn.execute(BOARD_EXPECTATIONS_DDL)
+    rows = []
+    for forecast in forecasts:
+        for cid, pos, mean_pos, pts, title, promo, releg in forecast.rows():
+            rows.append((forecast.season, forecast.competition_id, cid, pos, mean_pos, pts,
+                         title, promo, releg, forecast.sims))
+    conn.executemany("""
+        INSERT OR REPLACE INTO board_expectations (
+            season, competition_id, club_id, expected_position, mean_position,
+            expected_points, title_prob, promotion_prob, relegation_prob, sims
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+
+def update_board_expectations(conn, sims=DEFAULT_SIMS, seed=None):
+    """Forecast every league and store the result as the boards' expectations."""
+    forecasts = forecast_all_leagues(conn, sims, seed)
+    store_board_expectations(conn, forecasts.values())
+    print(f"📈 Board expectations updated for {len(forecasts)} leagues ({sims} simulations each)")
+    return forecasts
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import decision_making
+    from db_connection import open_connection
+
+    parser = argparse.ArgumentParser(description="Monte Carlo forecast of the current league seasons")
+    parser.add_argument("--league", type=int, default=None, help="competition id (default: every league)")
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db", default=decision_making.DB_PATH)
+    args = parser.parse_args()
+
+    conn = open_connection(args.db)
+    try:
+        names = dict(conn.execute("SELECT id, name FROM clubs"))
+        t0 = time.perf_counter()
+        if args.league is None:
+            forecasts = list(forecast_all_leagues(conn, args.sims, args.seed).values())
+        else:
+            forecasts = [f for f in [forecast_league(conn, args.league, sims=args.sims, seed=args.seed)] if f]
+        elapsed = time.perf_counter() - t0
+        for forecast in forecasts:
+            print(forecast.report(names))
+            print()
+        print(f"{len(forecasts)} leagues forecast in {elapsed:.2f}s")
+    finally:
+        conn.close()
@@ -0,0 +1,269 @@
+"""
+Day snapshot of the player market for the transfer AI.
+
+decision_making_func loads one TransferMarket on transfer-window days instead
+of querying per club and per candidate. The snapshot holds, for every active
+player, club, positions, attributes, value, active contract end and transfer
+history, plus club fame, balance and squad counts, and two
+indexes built once per day:
+
+  - per listed position, the players at clubs sorted by current ability and
+    split into seller-fame bands, so sale_candidates() only merges the bands a
+    buyer may shop in;
+  - per position, the free agents sorted by current ability.
+
+Signings and transfers are queued on the market (its counts, squads and
+balances follow them straight away) and written to SQLite in bulk by apply().
+"""
+import heapq
+from collections import Counter, defaultdict
+
+import club_versions
+
+FAME_BAND = 100  # seller fame per sale-index band
+NO_CONTRACT_END = "9999-12-31"
+
+ATTR_COLUMNS = ("at_curr_ability", "at_goalkeeping", "at_defending", "at_passing",
+                "at_dribbling", "at_scoring", "at_speed")
+
+
+class TransferMarket:
+
+    def __init__(self, today, cutoff):
+        self.today = today.isoformat()
+        self.cutoff = cutoff            # last move must be before this to be for sale
+        self.club = {}                  # player_id -> club_id (None = free agent)
+        self.info = {}                  # player_id -> (first_name, last_name, position, value, date_of_birth)
+        self.attrs = {}                 # player_id -> {attr column: value}
+        self.listed = {}                # player_id -> players_positions entries
+        self.roles = {}                 # player_id -> COALESCE(pp.position, p.position) values
+        self.contract_end = {}          # player_id -> latest active contract end (None = open ended)
+        self.last_move = {}             # player_id -> (ts, from_club_id, to_club_id)
+        self.moves = Counter()          # player_id -> lifetime transfers_log rows
+        self.fame = {}
+        self.balance = {}
+        self.squads = defaultdict(set)
+        self.in_role = defaultdict(set)             # (club_id, pos) -> player ids
+        self.position_counts = defaultdict(Counter)  # club_id -> players.position counts
+        self.listed_counts = defaultdict(Counter)    # club_id -> players_positions counts
+        self.for_sale = {}              # pos -> [(fame band, [(-ability, player_id)])]
+        self.free_agents = {}           # pos -> [(-ability, player_id)]
+
+        # queued writes, see apply()
+        self.moved = []                 # (player_id, old_club_id, new_club_id)
+        self.terminations = []          # player_id of transfers (old contract ends)
+        self.contracts = []             # players_contract rows
+        self.log = []                   # transfers_log rows
+        self.balance_deltas = Counter()
+
+    @classmethod
+    def load(cls, cur, today, cutoff, world=None):
+        """Snapshot the market; club fame comes from `world` when one is active (its fame is write-behind)."""
+        market = cls(today, cutoff)
+
+        cur.execute(f"""
+            SELECT p.id, p.club_id, p.first_name, p.last_name, p.position, p.value, p.date_of_birth,
+                   {", ".join("pa." + c for c in ATTR_COLUMNS)}
+            FROM players p
+            LEFT JOIN players_attr pa ON pa.player_id = p.id
+            WHERE p.is_retired = 0
+        """)
+        for pid, club_id, fn, ln, position, value, dob, *attrs in cur.fetchall():
+            market.club[pid] = club_id
+            market.info[pid] = (fn, ln, position, value, dob)
+            if attrs[0] is not None:
+                market.attrs[pid] = dict(zip(ATTR_COLUMNS, attrs))
+            market.listed[pid] = []
+
+        cur.execute("""
+            SELECT pp.player_id, pp.position
+            FROM players_positions pp
+            JOIN players p ON p.id = pp.player_id
+            WHERE p.is_retired = 0
+        """)
+        for pid, pos in cur.fetchall():
+            if pos not in market.listed[pid]:
+                market.listed[pid].append(pos)
+        for pid, listed in market.listed.items():
+            market.roles[pid] = tuple(listed) or (market.info[pid][2],)
+
+        cur.execute("""
+            SELECT player_id, MAX(COALESCE(contract_end, ?))
+            FROM players_contract
+            WHERE is_terminated = 0
+            GROUP BY player_id
+        """, (NO_CONTRACT_END,))
+        for pid, end in cur.fetchall():
+            market.contract_end[pid] = None if end == NO_CONTRACT_END else end
+
+        cur.execute("""
+            SELECT tl.player_id, last.moves, tl.ts, tl.from_club_id, tl.to_club_id
+            FROM (SELECT player_id, COUNT(*) AS moves, MAX(ts) AS ts
+                  FROM transfers_log GROUP BY player_id) last
+            JOIN transfers_log tl ON tl.player_id = last.player_id AND tl.ts = last.ts
+        """)
+        for pid, moves, ts, from_cid, to_cid in cur.fetchall():
+            market.moves[pid] = moves
+            market.last_move[pid] = (ts, from_cid, to_cid)
+
+        cur.execute("SELECT id, fame, current_balance_EUR FROM clubs")
+        for cid, fame, balance in cur.fetchall():
+            market.fame[cid] = world.club_fame(cid) if world is not None else fame
+            market.balance[cid] = balance or 0
+
+        for pid, club_id in market.club.items():
+            if club_id is not None:
+                market._add_to_club(pid, club_id)
+        market._build_indexes()
+        return market
+
+    def _add_to_club(self, pid, club_id):
+        self.squads[club_id].add(pid)
+        for pos in self.roles[pid]:
+            self.in_role[club_id, pos].add(pid)
+        self.position_counts[club_id][self.info[pid][2]] += 1
+        self.listed_counts[club_id].update(self.listed[pid])
+
+    def _remove_from_club(self, pid, club_id):
+        self.squads[club_id].discard(pid)
+        for pos in self.roles[pid]:
+            self.in_role[club_id, pos].discard(pid)
+        self.position_counts[club_id][self.info[pid][2]] -= 1
+        self.listed_counts[club_id].subtract(self.listed[pid])
+
+    def _build_indexes(self):
+        bands = defaultdict(lambda: defaultdict(list))
+        free = defaultdict(list)
+        for pid, club_id in self.club.items():
+            attrs = self.attrs.get(pid)
+            ability = attrs["at_curr_ability"] if attrs else -1
+            if club_id is None:
+                for pos in self.roles[pid]:
+                    free[pos].append((-ability, pid))
+            elif attrs is not None:
+                band = self.fame.get(club_id, 0) // FAME_BAND
+                for pos in self.listed[pid]:
+                    bands[pos][band].append((-ability, pid))
+        self.for_sale = {
+            pos: sorted((band, sorted(entries)) for band, entries in by_band.items())
+            for pos, by_band in bands.items()
+        }
+        self.free_agents = {pos: sorted(entries) for pos, entries in free.items()}
+
+    # -----------------------
+    # Reads
+    # -----------------------
+    def squad_count(self, club_id):
+        return len(self.squads.get(club_id, ()))
+
+    def players_in_pos(self, club_id, pos):
+        return self.in_role.get((club_id, pos), set())
+
+    def last_transfer(self, pid):
+        return self.last_move.get(pid, (None, None, None))
+
+    def last_transfer_ts(self, pid):
+        return self.last_move.get(pid, (None,))[0]
+
+    def sale_candidates(self, pos, buyer_id, max_seller_fame, limit=24):
+        """
+        Up to `limit` (player_id, seller_id, first, last, pos, value, ability, seller_fame, dob),
+        best ability first: players listed at `pos` at another club with fame <= max_seller_fame
+        whose last move was before the cutoff.
+        """
+        eligible = [entries for band, entries in self.for_sale.get(pos, ())
+                    if band * FAME_BAND <= max_seller_fame]
+        pool = []
+        for neg_ability, pid in heapq.merge(*eligible):
+            seller_id = self.club[pid]
+            if seller_id is None or seller_id == buyer_id:
+                continue
+            if self.fame.get(seller_id, 0) > max_seller_fame:
+                continue
+            last_ts = self.last_transfer_ts(pid)
+            if last_ts is not None and last_ts >= self.cutoff:
+                continue
+            fn, ln, _position, value, dob = self.info[pid]
+            pool.append((pid, seller_id, fn, ln, pos, value, -neg_ability, self.fame[seller_id], dob))
+            if len(pool) >= limit:
+                break
+        return pool
+
+    def free_agent_candidates(self, pos, limit=40):
+        """Up to `limit` (player_id, first, last, pos, value) unattached players for `pos`, best first."""
+        pool = []
+        for _neg_ability, pid in self.free_agents.get(pos, ()):
+            if self.club[pid] is not None:
+                continue
+            fn, ln, _position, value, _dob = self.info[pid]
+            pool.append((pid, fn, ln, pos, value))
+            if len(pool) >= limit:
+                break
+        return pool
+
+    # -----------------------
+    # Queued writes
+    # -----------------------
+    def _move(self, pid, new_club_id, kind, from_club_id, fee, wage, contract_end):
+        old_club_id = self.club[pid]
+        if old_club_id is not None:
+            self._remove_from_club(pid, old_club_id)
+        self.club[pid] = new_club_id
+        self._add_to_club(pid, new_club_id)
+        self.moved.append((pid, old_club_id, new_club_id))
+        self.contracts.append((pid, new_club_id, "Professional" if kind == "free" else "Transfer",
+                               self.today, contract_end, wage))
+        self.contract_end[pid] = contract_end
+        self.log.append((self.today, kind, from_club_id, new_club_id, pid, fee, wage, contract_end))
+        self.last_move[pid] = (self.today, from_club_id, new_club_id)
+        self.moves[pid] += 1
+
+    def sign_free_agent(self, pid, club_id, wage, contract_end):
+        self._move(pid, club_id, "free", None, 0, wage, contract_end)
+
+    def transfer(self, pid, seller_id, buyer_id, fee, wage, contract_end):
+        self.terminations.append(pid)
+        self._move(pid, buyer_id, "transfer", seller_id, fee, wage, contract_end)
+        for club_id, delta in ((seller_id, fee), (buyer_id, -fee)):
+            self.balance[club_id] += delta
+            self.balance_deltas[club_id] += delta
+
+    def apply(self, cur, world=None):
+        """Write the queued moves (and mirror them into `world`); returns how many players moved."""
+        if not self.moved:
+            return 0
+        # Old contracts end before the new ones are inserted
+        cur.executemany("""
+            UPDATE players_contract
+               SET is_terminated=1
+             WHERE player_id=? AND is_terminated=0
+               AND (contract_end IS NULL OR contract_end >= ?)
+        """, [(pid, self.today) for pid in self.terminations])
+        cur.executemany("UPDATE players SET club_id=?, last_transfer_ts=? WHERE id=?",
+                        [(new_cid, self.today, pid) for pid, _old, new_cid in self.moved])
+        cur.executemany("""
+            INSERT INTO players_contract (player_id, club_id, contract_type, contract_start, contract_end, wage, is_terminated)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+        """, self.contracts)
+        cur.executemany("""
+            INSERT OR IGNORE INTO transfers_log (ts, type, from_club_id, to_club_id, player_id, fee, wage, contract_end)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, self.log)
+        cur.executemany("UPDATE clubs SET current_balance_EUR = current_balance_EUR + ? WHERE id=?",
+                        [(delta, cid) for cid, delta in self.balance_deltas.items() if delta])
+
+        terminated = set(self.terminations)
+        for pid, old_cid, new_cid in self.moved:
+            club_versions.bump_squad(old_cid, new_cid)
+            if world is not None:
+                world.move_player(pid, new_cid)
+                world.sign_contract(pid, self.contract_end[pid],
+                                    terminate_from=self.today if pid in terminated else None)
+        if world is not None:
+            for cid, delta in self.balance_deltas.items():
+                world.add_balance(cid, delta)
+
+        moved = len(self.moved)
+        self.moved, self.terminations, self.contracts, self.log = [], [], [], []
+        self.balance_deltas = Counter()
+        return moved
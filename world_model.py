@@ -0,0 +1,346 @@
+"""
+Optional in-memory copy of the world (clubs, players, attributes, contracts, staff).
+
+A DayTickEngine started with world=True loads one WorldModel and activates it.
+The transfer AI and the match engine then check `world_model.active()` and read
+from memory instead of issuing per-club SELECTs.
+
+Writes come in two kinds:
+  - structural changes (transfers, signings, contracts, staff hires, balances)
+    still go to SQLite immediately, and the caller mirrors them here;
+  - match fame changes are write-behind: they only touch memory and are
+    written by flush() at the engine's checkpoints (day / week / month).
+
+Stages that work on SQLite directly run after a flush(), see
+DayTickEngine.outside_world(). The frequent ones (monthly finances, board
+firings, weekly progression) mirror their writes here like the transfer AI
+does; the season end changes too much of the world and is followed by a
+full load().
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+
+FLUSH_CHECKPOINTS = ("day", "week", "month")
+
+PLAYER_ATTRS = ("at_curr_ability", "at_pot_ability", "at_scoring", "at_speed", "at_passing",
+                "at_dribbling", "at_defending", "at_goalkeeping", "at_selfcont")
+
+
+@dataclass(slots=True)
+class ClubRow:
+    id: int
+    name: str
+    league_id: Optional[int]
+    fame: int
+    balance: int
+
+
+@dataclass(slots=True)
+class PlayerAttrs:
+    at_curr_ability: int
+    at_pot_ability: int
+    at_scoring: int
+    at_speed: int
+    at_passing: int
+    at_dribbling: int
+    at_defending: int
+    at_goalkeeping: int
+    at_selfcont: int
+
+
+@dataclass(slots=True)
+class PlayerRow:
+    id: int
+    first_name: str
+    last_name: str
+    club_id: Optional[int]
+    position: str
+    primary_position: str
+    value: int
+    fame: int
+    positions: tuple            # players_positions entries (may be empty)
+    attrs: PlayerAttrs
+    contract_ends: list = field(default_factory=list)  # contract_end of each non-terminated contract (None = open)
+
+
+@dataclass(slots=True)
+class StaffRow:
+    id: int
+    club_id: Optional[int]
+    role: str
+    fame: int
+    preferred_formation: Optional[str]
+
+
+class WorldModel:
+
+    def __init__(self):
+        self.clubs = {}          # club_id -> ClubRow
+        self.players = {}        # player_id -> PlayerRow (non-retired only)
+        self.staff = {}          # staff_id -> StaffRow (non-retired only)
+        self.squads = {}         # club_id -> set(player_id)
+        self.staff_by_club = {}  # club_id -> set(staff_id)
+        self.dirty_players = set()
+        self.dirty_staff = set()
+
+    # -----------------------
+    # Load / persist
+    # -----------------------
+    def load(self, conn):
+        cur = conn.cursor()
+        self.clubs = {
+            cid: ClubRow(cid, name, league_id, fame or 0, balance or 0)
+            for cid, name, league_id, fame, balance in cur.execute(
+                "SELECT id, name, league_id, fame, current_balance_EUR FROM clubs")
+        }
+
+        positions = {}
+        for pid, pos in cur.execute("""
+            SELECT pp.player_id, pp.position
+            FROM players_positions pp
+            JOIN players p ON p.id = pp.player_id
+            WHERE p.is_retired = 0
+            ORDER BY pp.player_id, pp.position
+        """):
+            positions.setdefault(pid, []).append(pos)
+
+        contracts = {}
+        for pid, end in cur.execute("""
+            SELECT pc.player_id, pc.contract_end
+            FROM players_contract pc
+            JOIN players p ON p.id = pc.player_id
+            WHERE p.is_retired = 0 AND pc.is_terminated = 0
+        """):
+            contracts.setdefault(pid, []).append(end)
+
+        self.players = {}
+        self.squads = {}
+        for row in cur.execute(f"""
+            SELECT p.id, p.first_name, p.last_name, p.club_id, p.position, p.primary_position,
+                   p.value, p.fame, {", ".join("pa." + a for a in PLAYER_ATTRS)}
+            FROM players p
+            JOIN players_attr pa ON pa.player_id = p.id
+            WHERE p.is_retired = 0
+        """):
+            pid, fn, ln, cid, pos, primary, value, fame = row[:8]
+            self.players[pid] = PlayerRow(
+                pid, fn, ln, cid, pos, primary or pos or "CM", value or 0, fame or 0,
+                tuple(positions.get(pid, ())), PlayerAttrs(*row[8:]), contracts.get(pid, []),
+            )
+            if cid is not None:
+                self.squads.setdefault(cid, set()).add(pid)
+
+        self.staff = {}
+        self.staff_by_club = {}
+        for sid, cid, role, fame, formation in cur.execute("""
+            SELECT id, club_id, role, fame, preferred_formation
+            FROM staff
+            WHERE is_retired = 0
+        """):
+            self.staff[sid] = StaffRow(sid, cid, role, fame or 0, formation)
+            if cid is not None:
+                self.staff_by_club.setdefault(cid, set()).add(sid)
+
+        self.dirty_players.clear()
+        self.dirty_staff.clear()
+
+    def flush(self, conn):
+        """Write the pending (write-behind) rows. Returns how many rows were written."""
+        cur = conn.cursor()
+        cur.executemany("UPDATE players SET fame=? WHERE id=?",
+                        [(self.players[pid].fame, pid) for pid in self.dirty_players if pid in self.players])
+        cur.executemany("UPDATE staff SET fame=? WHERE id=?",
+                        [(self.staff[sid].fame, sid) for sid in self.dirty_staff if sid in self.staff])
+        written = len(self.dirty_players) + len(self.dirty_staff)
+        self.dirty_players.clear()
+        self.dirty_staff.clear()
+        return written
+
+    def reload(self, conn):
+        self.flush(conn)
+        self.load(conn)
+
+    # -----------------------
+    # Reads
+    # -----------------------
+    def club_fame(self, club_id, default=1000):
+        club = self.clubs.get(club_id)
+        return club.fame if club else default
+
+    def club_balance(self, club_id):
+        club = self.clubs.get(club_id)
+        return club.balance if club else 0
+
+    def squad(self, club_id):
+        """Player ids of a club, in id order."""
+        return sorted(self.squads.get(club_id, ()))
+
+    def squad_count(self, club_id):
+        return len(self.squads.get(club_id, ()))
+
+    def position_counts(self, club_id):
+        """{players.position: count} for the club."""
+        counts = {}
+        for pid in self.squads.get(club_id, ()):
+            pos = self.players[pid].position
+            counts[pos] = counts.get(pos, 0) + 1
+        return counts
+
+    def listed_position_counts(self, club_id):
+        """{players_positions.position: count} for the club (a player counts once per listed position)."""
+        counts = {}
+        for pid in self.squads.get(club_id, ()):
+            for pos in self.players[pid].positions:
+                counts[pos] = counts.get(pos, 0) + 1
+        return counts
+
+    def players_in_pos(self, club_id, pos):
+        """Players who list `pos` (or have it as players.position when they list nothing)."""
+        out = []
+        for pid in self.squad(club_id):
+            p = self.players[pid]
+            if pos in (p.positions or (p.position,)):
+                out.append(pid)
+        return out
+
+    def player_club(self, player_id):
+        p = self.players.get(player_id)
+        return p.club_id if p else None
+
+    def player_attrs(self, player_id):
+        p = self.players.get(player_id)
+        return p.attrs if p else None
+
+    def best_players(self, club_id, limit=None):
+        """Squad sorted by current ability (best first)."""
+        squad = sorted((self.players[pid] for pid in self.squads.get(club_id, ())),
+                       key=lambda p: (-p.attrs.at_curr_ability, p.id))
+        return squad[:limit] if limit else squad
+
+    def manager(self, club_id, by="fame"):
+        """The club's manager: most famous one (by='fame') or the newest row (by='id')."""
+        managers = [self.staff[sid] for sid in self.staff_by_club.get(club_id, ())
+                    if self.staff[sid].role == "Manager"]
+        if not managers:
+            return None
+        if by == "id":
+            return max(managers, key=lambda s: s.id)
+        return max(managers, key=lambda s: (s.fame, -s.id))
+
+    def staff_role_counts(self, club_id):
+        counts = {}
+        for sid in self.staff_by_club.get(club_id, ()):
+            role = self.staff[sid].role
+            counts[role] = counts.get(role, 0) + 1
+        return counts
+
+    def active_contract_end(self, player_id):
+        """Latest end of a non-terminated contract; None if open-ended or no contract."""
+        p = self.players.get(player_id)
+        if not p or not p.contract_ends or None in p.contract_ends:
+            return None
+        return max(p.contract_ends)
+
+    # -----------------------
+    # Mirrors of write-through changes
+    # -----------------------
+    def move_player(self, player_id, new_club_id):
+        p = self.players.get(player_id)
+        if not p:
+            return
+        if p.club_id is not None:
+            self.squads.get(p.club_id, set()).discard(player_id)
+        p.club_id = new_club_id
+        if new_club_id is not None:
+            self.squads.setdefault(new_club_id, set()).add(player_id)
+
+    def sign_contract(self, player_id, contract_end, terminate_from=None):
+        """Add a contract; with terminate_from (ISO date) drop contracts still running on that date."""
+        p = self.players.get(player_id)
+        if not p:
+            return
+        if terminate_from is not None:
+            p.contract_ends = [e for e in p.contract_ends if e is not None and e < terminate_from]
+        p.contract_ends.append(contract_end)
+
+    def add_balance(self, club_id, delta):
+        club = self.clubs.get(club_id)
+        if club:
+            club.balance += delta
+
+    def set_balance(self, club_id, balance):
+        club = self.clubs.get(club_id)
+        if club:
+            club.balance = balance
+
+    def assign_staff(self, staff_id, club_id):
+        s = self.staff.get(staff_id)
+        if not s:
+            return
+        if s.club_id is not None:
+            self.staff_by_club.get(s.club_id, set()).discard(staff_id)
+        s.club_id = club_id
+        if club_id is not None:
+            self.staff_by_club.setdefault(club_id, set()).add(staff_id)
+
+    def retire_staff(self, staff_id):
+        self.assign_staff(staff_id, None)
+        self.staff.pop(staff_id, None)
+        self.dirty_staff.discard(staff_id)
+
+    def progress_players(self, player_ids, columns, values, fames):
+        """Weekly progression: {attr: new values} (aligned with player_ids), values and fames."""
+        for i, pid in enumerate(player_ids):
+            p = self.players.get(pid)
+            if not p:
+                continue
+            for attr, new in columns.items():
+                setattr(p.attrs, attr, new[i])
+            p.value = values[i]
+            p.fame = fames[i]
+
+    # -----------------------
+    # Write-behind
+    # -----------------------
+    def apply_fame_deltas(self, deltas):
+        """Same rules as fixture_calculation.apply_fame_deltas, applied in memory."""
+        for club_id, (player_delta, staff_delta, manager_delta) in deltas.items():
+            if player_delta:
+                for pid in self.squads.get(club_id, ()):
+                    p = self.players[pid]
+                    p.fame = max(1, min(2000, p.fame + player_delta))
+                    self.dirty_players.add(pid)
+            for sid in self.staff_by_club.get(club_id, ()):
+                s = self.staff[sid]
+                delta = manager_delta if s.role == "Manager" else staff_delta
+                if delta:
+                    s.fame = max(1, min(2000, s.fame + delta))
+                    self.dirty_staff.add(sid)
+
+
+_ACTIVE = None
+
+
+def activate(world):
+    global _ACTIVE
+    _ACTIVE = world
+
+
+def deactivate():
+    global _ACTIVE
+    _ACTIVE = None
+
+
+def active():
+    """The WorldModel serving reads for this process, or None (read SQLite)."""
+    return _ACTIVE
+
+
+def is_checkpoint(flush_every, day):
+    """True if `day` closes a flush period ('day', 'week' ends Sunday, 'month' ends on its last day)."""
+    if flush_every == "week":
+        return day.weekday() == 6
+    if flush_every == "month":
+        return (day + timedelta(days=1)).month != day.month
+    return True